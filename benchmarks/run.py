@@ -0,0 +1,375 @@
+"""Benchmarks for pydantic-sqs.
+
+Runs encode/decode microbenchmarks for a few model shapes, end-to-end send/receive/delete throughput, and handling
+latency at several producer concurrencies. By default everything runs against the in-process MemoryTransport, so the
+numbers measure the library rather than the network. Pass --endpoint-url to run against a local SQS stand-in such as
+moto_server or ElasticMQ instead.
+
+Results are printed as a table and, with --output, written as JSON. Pass --compare with an earlier JSON file to see
+the change of every benchmark, and --fail-on-regression to exit with an error if any got worse by more than that many
+percent::
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --compare before.json --fail-on-regression 15
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from datetime import timezone
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from pydantic import BaseModel
+from pydantic_sqs import MemoryTransport
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs import Worker
+
+try:
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import version
+except ImportError:  # pragma: no cover - python 3.7
+    from importlib_metadata import PackageNotFoundError  # type: ignore
+    from importlib_metadata import version  # type: ignore
+
+
+class Flat(SQSModel):
+    id: int
+    name: str
+    active: bool
+    score: float
+
+
+class Item(BaseModel):
+    sku: str
+    quantity: int
+    price: float
+
+
+class Nested(SQSModel):
+    id: int
+    customer: str
+    items: List[Item]
+
+
+class Large(SQSModel):
+    id: int
+    values: List[int]
+    text: str
+
+
+class Timed(SQSModel):
+    id: int
+    sent_at: float
+    created: datetime
+
+
+SHAPES: Dict[str, Callable[[int], SQSModel]] = {
+    "flat": lambda index: Flat(id=index, name=f"name-{index}", active=index % 2 == 0, score=index / 3),
+    "nested": lambda index: Nested(
+        id=index,
+        customer=f"customer-{index}",
+        items=[Item(sku=f"sku-{item}", quantity=item, price=item * 1.5) for item in range(20)],
+    ),
+    "large": lambda index: Large(id=index, values=list(range(5000)), text="x" * 20000),
+    "timed": lambda index: Timed(id=index, sent_at=time.perf_counter(), created=datetime.now(timezone.utc)),
+}
+
+MODELS = (Flat, Nested, Large, Timed)
+
+
+class Results:
+    """Collects benchmark results and prints them as they come in"""
+
+    def __init__(self) -> None:
+        self.results: List[Dict[str, Any]] = []
+
+    def add(self, name: str, metrics: Dict[str, float], **params: Any) -> None:
+        self.results.append({"name": name, "params": params, "metrics": metrics})
+        shown = ", ".join(f"{key}={value:,.2f}" for key, value in metrics.items())
+        print(f"{name:<40} {shown}", flush=True)
+
+
+def measure(func: Callable[[], Any], iterations: int, rounds: int = 5) -> Dict[str, float]:
+    """Time func over several rounds and report the median round"""
+    for _ in range(max(1, iterations // 10)):
+        func()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        timings.append(time.perf_counter() - start)
+    elapsed = statistics.median(timings)
+    return {"ops_per_second": iterations / elapsed, "mean_us": elapsed / iterations * 1e6}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+async def make_queue(args: argparse.Namespace, **queue_kwargs: Any) -> SQSQueue:
+    """A new, empty queue with every benchmark model registered"""
+    name = f"bench-{uuid.uuid4().hex[:12]}"
+    if args.endpoint_url is None:
+        transport = MemoryTransport()
+        response = await transport.create_queue(QueueName=name)
+        queue = SQSQueue(response["QueueUrl"], transport=transport, **queue_kwargs)
+    else:
+        use_ssl = args.endpoint_url.startswith("https")
+        queue = SQSQueue("", endpoint_url=args.endpoint_url, use_ssl=use_ssl, **queue_kwargs)
+        async with queue.client() as client:
+            response = await client.create_queue(QueueName=name)
+        queue.queue_url = response["QueueUrl"]
+    for model_class in MODELS:
+        queue.register_model(model_class)
+    return queue
+
+
+async def delete_queue(queue: SQSQueue) -> None:
+    await queue.close()
+    async with queue.client() as client:
+        await client.delete_queue(QueueUrl=queue.queue_url)
+
+
+async def bench_codec(args: argparse.Namespace, results: Results) -> None:
+    """Encode and decode microbenchmarks for every model shape"""
+    queue = await make_queue(args)
+    codec = queue.codec_for(Flat)
+    for shape, build in SHAPES.items():
+        model = build(1)
+        iterations = max(10, args.iterations // (50 if shape == "large" else 1))
+        results.add(f"encode/{shape}", measure(model._send_entry, iterations), iterations=iterations)
+
+        body = model._send_entry()["MessageBody"]
+        decoder = queue._decoder(model.__class__)
+
+        def decode() -> None:
+            message = codec.decode(body)["message"]
+            decoder.decode(message, message_id="id", receipt_handle="handle", attributes=None)
+
+        results.add(f"decode/{shape}", measure(decode, iterations), iterations=iterations)
+    await delete_queue(queue)
+
+
+async def bench_throughput(args: argparse.Namespace, results: Results) -> None:
+    """Send, receive and delete every message with the batch APIs, timing each phase"""
+    for shape in ("flat", "nested"):
+        queue = await make_queue(args)
+        await queue.open()
+        models = [SHAPES[shape](index) for index in range(args.messages)]
+
+        start = time.perf_counter()
+        sent = await queue.send_batch(models)
+        send_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        received = 0
+        while received < len(sent.successful):
+            batch = await queue.from_sqs(max_messages=10, wait_time_seconds=1, ignore_empty=True)
+            await queue.delete_batch(batch)
+            received += len(batch)
+        receive_elapsed = time.perf_counter() - start
+
+        results.add(
+            f"throughput/send_batch/{shape}",
+            {"messages_per_second": len(sent.successful) / send_elapsed},
+            messages=args.messages,
+        )
+        results.add(
+            f"throughput/receive_delete/{shape}",
+            {"messages_per_second": received / receive_elapsed},
+            messages=args.messages,
+        )
+        await delete_queue(queue)
+
+
+async def bench_worker(args: argparse.Namespace, results: Results) -> None:
+    """Consume a pre-filled queue with a Worker at several concurrencies"""
+    for concurrency in args.concurrency:
+        queue = await make_queue(args)
+        await queue.open()
+        await queue.send_batch([SHAPES["flat"](index) for index in range(args.messages)])
+        handled = 0
+        done = asyncio.Event()
+
+        @queue.handler(Flat)
+        async def handle(message: Flat) -> None:
+            nonlocal handled
+            handled += 1
+            if handled >= args.messages:
+                done.set()
+
+        worker = Worker(queue, pollers=max(1, concurrency // 10), max_in_flight=concurrency, wait_time_seconds=1)
+        start = time.perf_counter()
+        run = asyncio.ensure_future(worker.run())
+        await done.wait()
+        elapsed = time.perf_counter() - start
+        worker.stop()
+        await run
+        results.add(
+            f"worker/consume/c{concurrency}",
+            {"messages_per_second": handled / elapsed},
+            concurrency=concurrency,
+            messages=args.messages,
+        )
+        await delete_queue(queue)
+
+
+async def bench_latency(args: argparse.Namespace, results: Results) -> None:
+    """Time from to_sqs to the handler starting, with concurrent producers and a Worker consuming"""
+    for concurrency in args.concurrency:
+        queue = await make_queue(args)
+        await queue.open()
+        latencies: List[float] = []
+        per_producer = max(1, args.messages // concurrency)
+        total = per_producer * concurrency
+        done = asyncio.Event()
+
+        @queue.handler(Timed)
+        async def handle(message: Timed) -> None:
+            latencies.append(time.perf_counter() - message.sent_at)
+            if len(latencies) >= total:
+                done.set()
+
+        async def produce(producer: int) -> None:
+            for index in range(per_producer):
+                await SHAPES["timed"](producer * per_producer + index).to_sqs()
+
+        worker = Worker(
+            queue, pollers=max(1, concurrency // 10), max_in_flight=max(10, concurrency), wait_time_seconds=1
+        )
+        run = asyncio.ensure_future(worker.run())
+        start = time.perf_counter()
+        await asyncio.gather(*(produce(producer) for producer in range(concurrency)))
+        await done.wait()
+        elapsed = time.perf_counter() - start
+        worker.stop()
+        await run
+        results.add(
+            f"latency/to_sqs_to_handler/c{concurrency}",
+            {
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "messages_per_second": total / elapsed,
+            },
+            concurrency=concurrency,
+            messages=total,
+        )
+        await delete_queue(queue)
+
+
+BENCHMARKS = {
+    "codec": bench_codec,
+    "throughput": bench_throughput,
+    "worker": bench_worker,
+    "latency": bench_latency,
+}
+
+# Metrics where lower is better, every other metric is better when higher
+LOWER_IS_BETTER = ("mean_us", "p50_ms", "p99_ms")
+
+
+def compare(baseline_path: str, results: List[Dict[str, Any]]) -> float:
+    """Print the change of every metric against a baseline file and return the worst regression in percent"""
+    with open(baseline_path) as baseline_file:
+        baseline = {result["name"]: result["metrics"] for result in json.load(baseline_file)["results"]}
+    worst = 0.0
+    print(f"\nCompared to {baseline_path}:")
+    for result in results:
+        before = baseline.get(result["name"])
+        if before is None:
+            continue
+        for metric, value in result["metrics"].items():
+            if not before.get(metric):
+                continue
+            change = (value - before[metric]) / before[metric] * 100
+            regression = change if metric in LOWER_IS_BETTER else -change
+            worst = max(worst, regression)
+            marker = "  REGRESSION" if regression > 0 else ""
+            name = f"{result['name']}/{metric}"
+            print(f"{name:<55} {before[metric]:>14,.2f} -> {value:>14,.2f} {change:+7.1f}%{marker}")
+    return worst
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run: {', '.join(BENCHMARKS)}. Default all")
+    parser.add_argument("--endpoint-url", help="Run against this SQS compatible endpoint instead of MemoryTransport")
+    parser.add_argument("--iterations", type=int, default=2000, help="Iterations per codec round. Default 2000")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per end-to-end run. Default 2000")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Concurrencies to run. Default 1 10 50"
+    )
+    parser.add_argument("--quick", action="store_true", help="Use few iterations and messages, for smoke tests")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare the results to an earlier JSON file")
+    parser.add_argument(
+        "--fail-on-regression",
+        type=float,
+        help="With --compare, exit with status 1 if any metric got worse by more than this many percent",
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    if args.quick:
+        args.iterations = 100
+        args.messages = 100
+        args.concurrency = [1, 10]
+    return args
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = Results()
+    for name in args.benchmarks or BENCHMARKS:
+        await BENCHMARKS[name](args, results)
+    return results.results
+
+
+def package_version() -> str:
+    try:
+        return version("pydantic_sqs")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "pydantic_sqs": package_version(),
+                "transport": args.endpoint_url or "memory",
+                "iterations": args.iterations,
+                "messages": args.messages,
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare:
+        worst = compare(args.compare, results)
+        if args.fail_on_regression is not None and worst > args.fail_on_regression:
+            print(f"\nWorst regression {worst:.1f}% exceeds {args.fail_on_regression}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
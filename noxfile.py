@@ -155,6 +155,14 @@ def tests(session: Session) -> None:
     session.run("poetry", "run", "pytest", *session.posargs)
 
 
+@session(python=python_versions[0])
+def benchmarks(session: Session) -> None:
+    """Run the benchmark suite against the in-memory SQS transport."""
+    args = session.posargs or ["--output", "benchmark-results.json"]
+    session.install(".")
+    session.run("python", "benchmarks/run.py", *args)
+
+
 @session(python=python_versions)
 def typeguard(session: Session) -> None:
     """Runtime type checking using Typeguard."""
@@ -1,3 +1,21 @@
 """Entry point for pydantic-sqs"""
+from .batch import BatchFailure  # noqa: F401
+from .batch import BatchResult  # noqa: F401
+from .claim_check import BlobStore  # noqa: F401
+from .claim_check import FileBlobStore  # noqa: F401
+from .claim_check import MemoryBlobStore  # noqa: F401
+from .claim_check import S3BlobStore  # noqa: F401
+from .envelope import SQSEnvelope  # noqa: F401
+from .memory import MemoryTransport  # noqa: F401
+from .metrics import MemoryMetrics  # noqa: F401
+from .metrics import Metrics  # noqa: F401
+from .metrics import PrometheusMetrics  # noqa: F401
+from .metrics import StatsDMetrics  # noqa: F401
 from .model import SQSModel  # noqa: F401
+from .poll import PollController  # noqa: F401
 from .queue import SQSQueue  # noqa: F401
+from .scaling import BacklogScaler  # noqa: F401
+from .serialization import Codec  # noqa: F401
+from .transport import AioBotocoreTransport  # noqa: F401
+from .transport import Transport  # noqa: F401
+from .worker import Worker  # noqa: F401
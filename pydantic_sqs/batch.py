@@ -0,0 +1,252 @@
+"""Module containing helpers for the SQS batch APIs"""
+import asyncio
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pydantic import BaseModel
+
+# SQS accepts at most 10 entries per batch request
+MAX_BATCH_ENTRIES = 10
+
+# SQS accepts at most 256 KiB per message and per batch request, counting bodies and message attributes
+MAX_BATCH_BYTES = 262144
+
+# Base delay (in seconds) before retrying failed entries, doubled on every attempt
+RETRY_BACKOFF = 0.05
+
+
+class BatchFailure(BaseModel):
+    """A single entry that failed in a batch request"""
+
+    model: Any
+    code: str
+    message: Optional[str] = None
+    sender_fault: bool = False
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class BatchResult(BaseModel):
+    """The result of a batch request, split into the models that succeeded and the ones that failed"""
+
+    successful: List[Any] = []
+    failed: List[BatchFailure] = []
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def ok(self) -> bool:
+        """True if every entry in the batch succeeded"""
+        return len(self.failed) == 0
+
+
+def entry_size(entry: Dict[str, Any]) -> int:
+    """
+    The size of a batch entry as counted against the SQS size limits
+
+    Args:
+        entry (dict[str, Any]): A batch request entry
+
+    Returns:
+        int: The size of the entry's body and message attributes in bytes
+    """
+    size = len(entry.get("MessageBody", "").encode("utf-8"))
+    for name, attribute in entry.get("MessageAttributes", {}).items():
+        size += len(name.encode("utf-8")) + len(attribute["DataType"].encode("utf-8"))
+        if "StringValue" in attribute:
+            size += len(attribute["StringValue"].encode("utf-8"))
+        else:
+            size += len(attribute.get("BinaryValue", b""))
+    return size
+
+
+def chunk_entries(
+    entries: Iterable[Tuple[Dict[str, Any], Any]],
+    max_entries: int = MAX_BATCH_ENTRIES,
+    max_bytes: int = MAX_BATCH_BYTES,
+) -> Iterator[List[Tuple[Dict[str, Any], Any]]]:
+    """
+    Pack entries into batches that respect the SQS entry count and aggregate size limits
+
+    Args:
+        entries (Iterable[tuple[dict[str, Any], Any]]): (entry, item) pairs to pack
+        max_entries (int, optional): The maximum entries per batch. Defaults to MAX_BATCH_ENTRIES.
+        max_bytes (int, optional): The maximum aggregate size per batch. Defaults to MAX_BATCH_BYTES.
+
+    Yields:
+        list[tuple[dict[str, Any], Any]]: A batch of (entry, item) pairs
+    """
+    chunk: List[Tuple[Dict[str, Any], Any]] = []
+    chunk_bytes = 0
+    for entry, item in entries:
+        size = entry_size(entry)
+        if chunk and (len(chunk) >= max_entries or chunk_bytes + size > max_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append((entry, item))
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+_Chunk = List[Tuple[Dict[str, Any], Any]]
+_Successful = List[Tuple[Any, Dict[str, Any]]]
+_ChunkFailures = List[Tuple[Dict[str, Any], Any, BatchFailure]]
+
+
+def _oversized(item: Any) -> BatchFailure:
+    """The failure of an entry that is larger than SQS accepts, which is never sent"""
+    return BatchFailure(
+        model=item,
+        code="MessageTooLong",
+        message=f"Message is larger than {MAX_BATCH_BYTES} bytes",
+        sender_fault=True,
+    )
+
+
+def _entry_failure(result: Dict[str, Any], item: Any) -> BatchFailure:
+    """The failure of an entry reported in the Failed list of a batch response"""
+    return BatchFailure(
+        model=item,
+        code=result.get("Code", "Unknown"),
+        message=result.get("Message"),
+        sender_fault=result.get("SenderFault", False),
+    )
+
+
+async def _send_chunk(
+    queue: Any,
+    method: str,
+    chunk: _Chunk,
+    semaphore: asyncio.Semaphore,
+    request_kwargs: Dict[str, Any],
+) -> Tuple[_Successful, _ChunkFailures]:
+    """
+    Send a single batch request
+
+    A request that raises fails every entry in it, without a sender fault, so they are retried.
+
+    Returns:
+        tuple[list[tuple[Any, dict[str, Any]]], list[tuple[dict[str, Any], Any, BatchFailure]]]: (item, successful
+            response entry) pairs and (entry, item, failure) triples
+    """
+    by_id = {}
+    request_entries = []
+    for index, (entry, item) in enumerate(chunk):
+        entry = dict(entry, Id=str(index))
+        by_id[entry["Id"]] = (entry, item)
+        request_entries.append(entry)
+
+    try:
+        async with semaphore:
+            async with queue.client() as client:
+                response = await getattr(client, method)(
+                    QueueUrl=queue.queue_url, Entries=request_entries, **request_kwargs
+                )
+    except Exception as exc:
+        return [], [
+            (entry, item, BatchFailure(model=item, code=exc.__class__.__name__, message=str(exc)))
+            for entry, item in chunk
+        ]
+
+    successful = [(by_id[result["Id"]][1], result) for result in response.get("Successful", [])]
+    failed = []
+    for result in response.get("Failed", []):
+        entry, item = by_id[result["Id"]]
+        failed.append((entry, item, _entry_failure(result, item)))
+    return successful, failed
+
+
+def _classify(failures: _ChunkFailures, attempt: int, retries: int) -> Tuple[List[BatchFailure], _Chunk]:
+    """
+    Split failed entries into final failures and entries to retry
+
+    Entries that fail with a sender fault are not retried, as resending them would fail the same way.
+
+    Returns:
+        tuple[list[BatchFailure], list[tuple[dict[str, Any], Any]]]: The final failures and the (entry, item) pairs
+            to retry
+    """
+    failed = []
+    retry = []
+    for entry, item, failure in failures:
+        if failure.sender_fault or attempt >= retries:
+            failed.append(failure)
+        else:
+            retry.append((entry, item))
+    return failed, retry
+
+
+async def _send_with_retries(
+    queue: Any,
+    method: str,
+    pending: _Chunk,
+    retries: int,
+    semaphore: asyncio.Semaphore,
+    request_kwargs: Dict[str, Any],
+) -> Tuple[_Successful, List[BatchFailure]]:
+    """Send entries in concurrent batches, retrying the failed ones with exponential backoff, see run_batches"""
+    successful: _Successful = []
+    failed: List[BatchFailure] = []
+    attempt = 0
+    while pending:
+        results = await asyncio.gather(
+            *[_send_chunk(queue, method, chunk, semaphore, request_kwargs) for chunk in chunk_entries(pending)]
+        )
+        pending = []
+        for chunk_successful, chunk_failed in results:
+            successful.extend(chunk_successful)
+            final, retry = _classify(chunk_failed, attempt, retries)
+            failed.extend(final)
+            pending.extend(retry)
+        if pending:
+            await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+            attempt += 1
+    return successful, failed
+
+
+async def run_batches(
+    queue: Any,
+    method: str,
+    entries: Iterable[Tuple[Dict[str, Any], Any]],
+    retries: int = 2,
+    max_concurrency: int = 10,
+    **request_kwargs: Any,
+) -> Tuple[List[Tuple[Any, Dict[str, Any]]], List[BatchFailure]]:
+    """
+    Send entries through a SQS batch API, sending batches concurrently and retrying only the failed entries
+
+    Entries that fail with a sender fault are not retried, as resending them would fail the same way.
+
+    Args:
+        queue (SQSQueue): The queue to send the batches to
+        method (str): The name of the client's batch method, e.g. "send_message_batch"
+        entries (Iterable[tuple[dict[str, Any], Any]]): (entry, item) pairs. Entry Ids are assigned here
+        retries (int, optional): How many times to retry failed entries. Defaults to 2.
+        max_concurrency (int, optional): The maximum number of batch requests in flight. Defaults to 10.
+        request_kwargs: Extra kwargs passed to every batch request
+
+    Returns:
+        tuple[list[tuple[Any, dict[str, Any]]], list[BatchFailure]]: (item, successful response entry) pairs and
+            the failures left after retrying
+    """
+    failed: List[BatchFailure] = []
+    pending: _Chunk = []
+    for entry, item in entries:
+        if entry_size(entry) > MAX_BATCH_BYTES:
+            failed.append(_oversized(item))
+        else:
+            pending.append((entry, item))
+
+    successful, retried_failed = await _send_with_retries(
+        queue, method, pending, retries, asyncio.Semaphore(max_concurrency), request_kwargs
+    )
+    return successful, failed + retried_failed
@@ -0,0 +1,238 @@
+"""Module containing buffers that coalesce single calls into SQS batch requests"""
+import asyncio
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from pydantic_sqs import exceptions
+from pydantic_sqs.batch import entry_size
+from pydantic_sqs.batch import MAX_BATCH_BYTES
+from pydantic_sqs.batch import MAX_BATCH_ENTRIES
+from pydantic_sqs.batch import run_batches
+
+# Buffered entries with a deadline are flushed at least this many seconds before it
+DEADLINE_MARGIN = 1.0
+
+
+class _BatchBuffer:
+    """
+    Collects single entries and sends them as one batch request once the batch is full or the oldest entry
+    has waited for the linger time.
+
+    Each submitted entry gets its own awaitable that resolves with that entry's result from the batch response.
+    """
+
+    # The client batch method used to flush the buffer
+    method: str = ""
+
+    def __init__(
+        self,
+        queue: Any,
+        linger: float,
+        max_entries: int = MAX_BATCH_ENTRIES,
+        max_bytes: int = MAX_BATCH_BYTES,
+        retries: int = 2,
+    ):
+        """
+        Args:
+            queue (SQSQueue): The queue to flush to
+            linger (float): The maximum time (in seconds) an entry waits in the buffer before it is sent
+            max_entries (int, optional): The number of entries that triggers a flush. Defaults to MAX_BATCH_ENTRIES.
+            max_bytes (int, optional): The aggregate entry size that triggers a flush. Defaults to MAX_BATCH_BYTES.
+            retries (int, optional): How many times to retry entries that failed. Defaults to 2.
+        """
+        self.queue = queue
+        self.linger = linger
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.loop = asyncio.get_running_loop()
+        self._pending: List[Tuple[Dict[str, Any], Any, "asyncio.Future[Dict[str, Any]]", float]] = []
+        self._pending_bytes = 0
+        self._flush_at: Optional[float] = None
+        self._timer: Optional["asyncio.TimerHandle"] = None
+        self._inflight: Set["asyncio.Task[None]"] = set()
+        self._last_send: Optional["asyncio.Task[None]"] = None
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def ordered(self) -> bool:
+        """Whether batches have to be sent one after the other, in the order they were flushed"""
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters describing this buffer
+
+        Returns:
+            dict[str, Any]: pending entries, flushes, flushed entries, and the last and longest time (in seconds) an
+                entry waited between being submitted and its batch being answered
+        """
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_entries": self.flushed_entries,
+            "last_wait": self.last_wait,
+            "max_wait": self.max_wait,
+        }
+
+    async def submit(self, entry: Dict[str, Any], item: Any, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Add an entry to the buffer and wait for it to be sent
+
+        Args:
+            entry (dict[str, Any]): The batch entry, without an Id
+            item (Any): The object the entry was built from
+            deadline (float, optional): A time.monotonic() time the entry must be sent before. The buffer is flushed
+                DEADLINE_MARGIN seconds before it, even if the linger time has not passed. Defaults to None.
+
+        Raises:
+            BatchEntryError: Raised if SQS rejected this entry
+
+        Returns:
+            dict[str, Any]: This entry's successful result from the batch response
+        """
+        size = entry_size(entry)
+        if self._pending and self._pending_bytes + size > self.max_bytes:
+            self._flush()
+
+        future = self.loop.create_future()
+        now = self.loop.time()
+        self._pending.append((entry, item, future, now))
+        self._pending_bytes += size
+
+        if len(self._pending) >= self.max_entries or self._pending_bytes >= self.max_bytes:
+            self._flush()
+        else:
+            flush_at = now + self.linger
+            if deadline is not None:
+                flush_at = min(flush_at, now + deadline - time.monotonic() - DEADLINE_MARGIN)
+            self._schedule(flush_at)
+        return await future
+
+    def _schedule(self, flush_at: float) -> None:
+        """Make sure the buffer is flushed no later than flush_at (in loop time)"""
+        if self._flush_at is not None and self._flush_at <= flush_at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._flush_at = flush_at
+        self._timer = self.loop.call_at(flush_at, self._flush)
+
+    def _flush(self) -> None:
+        """Send everything in the buffer in the background"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._flush_at = None
+        if not self._pending:
+            return
+        pending, self._pending, self._pending_bytes = self._pending, [], 0
+        self.flushes += 1
+        self.flushed_entries += len(pending)
+        previous = self._last_send if self.ordered else None
+        task = self._last_send = self.loop.create_task(self._send(pending, previous))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(
+        self,
+        pending: List[Tuple[Dict[str, Any], Any, "asyncio.Future[Dict[str, Any]]", float]],
+        previous: Optional["asyncio.Task[None]"] = None,
+    ) -> None:
+        """Send one batch and resolve the awaitable of every entry in it, after the previous batch if it is ordered"""
+        try:
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+            successful, failed = await run_batches(
+                self.queue,
+                self.method,
+                [(entry, index) for index, (entry, _, _, _) in enumerate(pending)],
+                retries=self.retries,
+            )
+        except Exception as exc:
+            for _, _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self.last_wait = self.loop.time() - pending[0][3]
+            self.max_wait = max(self.max_wait, self.last_wait)
+
+        for index, result in successful:
+            future = pending[index][2]
+            if not future.done():
+                future.set_result(result)
+        for failure in failed:
+            _, item, future, _ = pending[failure.model]
+            failure = failure.copy(update={"model": item})
+            if not future.done():
+                future.set_exception(
+                    exceptions.BatchEntryError(
+                        f"{self.method} failed for {str(item)}: {failure.code} {failure.message}",
+                        failure=failure,
+                    )
+                )
+
+    async def flush(self) -> None:
+        """Send everything in the buffer now and wait for every batch in flight to finish"""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+
+class SendBuffer(_BatchBuffer):
+    """
+    Buffers SQSModel.to_sqs calls and sends them with SendMessageBatch, in the style of Kafka's linger.ms.
+
+    Enabled by setting SQSQueue.send_linger_seconds. On FIFO queues batches are sent one after the other, so messages
+    keep the order they were submitted in.
+    """
+
+    method = "send_message_batch"
+
+    @property
+    def ordered(self) -> bool:
+        return self.queue.fifo
+
+
+class AckBuffer(_BatchBuffer):
+    """
+    Coalesces SQSModel.delete_from_queue calls into DeleteMessageBatch requests.
+
+    Every buffered receipt handle is deleted before its message's visibility timeout runs out, and everything left is
+    deleted when the queue is flushed or closed. Enabled by setting SQSQueue.ack_linger_seconds.
+    """
+
+    method = "delete_message_batch"
+
+
+def _get_buffer(queue: Any, attribute: str, buffer_class: type, linger: float) -> _BatchBuffer:
+    """
+    Get a queue's buffer, creating it for the running event loop if needed
+
+    Args:
+        queue (SQSQueue): The queue that owns the buffer
+        attribute (str): The name of the queue's private attribute holding the buffer
+        buffer_class (type): The buffer class to create
+        linger (float): The linger time of the buffer
+
+    Returns:
+        _BatchBuffer: The buffer
+    """
+    buffer = getattr(queue, attribute)
+    if buffer is None or buffer.loop is not asyncio.get_running_loop():
+        buffer = buffer_class(queue, linger=linger)
+        setattr(queue, attribute, buffer)
+    buffer.linger = linger
+    return buffer
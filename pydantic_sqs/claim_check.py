@@ -0,0 +1,170 @@
+"""Module containing the blob stores used to offload large message bodies"""
+import asyncio
+import re
+import uuid
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Union
+
+from aiobotocore.session import AioSession
+from aiobotocore.session import get_session
+from pydantic_sqs.serialization import MESSAGE_ATTRIBUTE_PREFIX
+
+# Message attribute holding the key of a message body that was offloaded to the queue's blob store
+CLAIM_CHECK_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "claim_check"
+
+# Bodies larger than this many bytes are offloaded by default. It leaves room below the 256 KiB SQS limit for
+# message attributes
+DEFAULT_CLAIM_CHECK_THRESHOLD = 256 * 1024 - 8 * 1024
+
+_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def new_claim_check_key() -> str:
+    """A new random blob key"""
+    return uuid.uuid4().hex
+
+
+class BlobStore:
+    """
+    Stores the bodies of messages too large to send through SQS, see SQSQueue.blob_store.
+
+    Keys come from received messages, so stores must not trust them beyond looking them up.
+    """
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Store data under key"""
+        raise NotImplementedError
+
+    async def get(self, key: str) -> bytes:
+        """
+        Get the data stored under key
+
+        Raises:
+            KeyError: Raised if nothing is stored under key
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Delete the data stored under key. Deleting a missing key does nothing"""
+        raise NotImplementedError
+
+
+class MemoryBlobStore(BlobStore):
+    """Keeps blobs in a dict. Only useful when producers and consumers share a process, like in tests"""
+
+    def __init__(self) -> None:
+        self.blobs: Dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self.blobs)
+
+    async def put(self, key: str, data: bytes) -> None:
+        self.blobs[key] = data
+
+    async def get(self, key: str) -> bytes:
+        return self.blobs[key]
+
+    async def delete(self, key: str) -> None:
+        self.blobs.pop(key, None)
+
+
+class FileBlobStore(BlobStore):
+    """Keeps blobs as files in a directory, for example on a shared volume. File operations run in a thread"""
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Args:
+            directory (str | Path): The directory to keep blobs in. It is created if it does not exist
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        if not _KEY_PATTERN.fullmatch(key):
+            raise KeyError(key)
+        return self.directory / key
+
+    async def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        await asyncio.get_running_loop().run_in_executor(None, path.write_bytes, data)
+
+    async def get(self, key: str) -> bytes:
+        path = self._path(key)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, path.read_bytes)
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    async def delete(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, path.unlink)
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BlobStore):
+    """
+    Keeps blobs as objects in an S3 (or S3 compatible) bucket.
+
+    One client is created on first use and kept until close is called.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        session: Optional[AioSession] = None,
+        **client_kwargs: Any,
+    ):
+        """
+        Args:
+            bucket (str): The bucket to keep blobs in
+            prefix (str, optional): Prepended to every key. Defaults to "".
+            session (AioSession, optional): The session to create the client with. Defaults to None, which creates
+                one.
+            client_kwargs: Passed on to create_client, like region_name or endpoint_url
+        """
+        self.bucket = bucket
+        self.prefix = prefix
+        self.session = session if session is not None else get_session()
+        self.client_kwargs = client_kwargs
+        self._client_context: Any = None
+        self._client: Any = None
+        self._opening: Optional[asyncio.Lock] = None
+
+    async def _get_client(self) -> Any:
+        if self._client is None:
+            if self._opening is None:
+                self._opening = asyncio.Lock()
+            async with self._opening:
+                if self._client is None:
+                    self._client_context = self.session.create_client("s3", **self.client_kwargs)
+                    self._client = await self._client_context.__aenter__()
+        return self._client
+
+    async def close(self) -> None:
+        """Close the client"""
+        if self._client_context is not None:
+            context, self._client_context, self._client = self._client_context, None, None
+            await context.__aexit__(None, None, None)
+
+    async def put(self, key: str, data: bytes) -> None:
+        client = await self._get_client()
+        await client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    async def get(self, key: str) -> bytes:
+        client = await self._get_client()
+        try:
+            response = await client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except client.exceptions.NoSuchKey:
+            raise KeyError(key) from None
+        async with response["Body"] as stream:
+            return await stream.read()
+
+    async def delete(self, key: str) -> None:
+        client = await self._get_client()
+        await client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
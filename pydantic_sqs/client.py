@@ -0,0 +1,105 @@
+"""Module containing the shared aiobotocore client pool"""
+import asyncio
+import weakref
+from typing import Any
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+
+from aiobotocore.session import AioSession
+
+
+class _SharedClient:
+    """A long-lived aiobotocore client and the number of queues currently using it"""
+
+    def __init__(self, session: AioSession, client_kwargs: Dict[str, Any]):
+        # hold a reference to the session so it lives as long as the client that was built from it
+        self.session = session
+        self.context = session.create_client("sqs", **client_kwargs)
+        self.ready: Optional["asyncio.Future[Any]"] = None
+        self.refcount = 0
+
+
+class ClientPool:
+    """
+    A registry of long-lived aiobotocore SQS clients.
+
+    Clients are keyed by the session, the event loop and the client kwargs that built them, so every queue
+    opened with the same settings shares one client and its underlying connection pool instead of paying for
+    client construction, credential lookup and a fresh TLS handshake on every call.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[Hashable, _SharedClient] = {}
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def acquire(self, key: Hashable, session: AioSession, client_kwargs: Dict[str, Any]) -> Any:
+        """
+        Get the shared client for key, creating it if this is the first user
+
+        Args:
+            key (Hashable): The key identifying the client. Queues with the same key share a client
+            session (AioSession): The session used to create the client if it does not exist yet
+            client_kwargs (dict[str, Any]): kwargs used to create the client if it does not exist yet
+
+        Returns:
+            The aiobotocore SQS client
+        """
+        entry = self._clients.get(key)
+        if entry is None:
+            entry = _SharedClient(session, client_kwargs)
+            entry.ready = asyncio.ensure_future(entry.context.__aenter__())
+            self._clients[key] = entry
+        entry.refcount += 1
+        try:
+            return await asyncio.shield(entry.ready)
+        except BaseException:
+            entry.refcount -= 1
+            if entry.refcount == 0 and self._clients.get(key) is entry:
+                del self._clients[key]
+            raise
+
+    async def release(self, key: Hashable) -> None:
+        """
+        Release one use of the shared client for key, closing it once nothing is using it
+
+        Args:
+            key (Hashable): The key identifying the client
+        """
+        entry = self._clients.get(key)
+        if entry is None:
+            return
+        entry.refcount -= 1
+        if entry.refcount > 0:
+            return
+        del self._clients[key]
+        await entry.context.__aexit__(None, None, None)
+
+
+# CLIENT_POOL is shared by every SQSQueue in this process
+CLIENT_POOL = ClientPool()
+
+# Sessions SQSQueue created because it was not given one. They are configured alike, from the environment, so a client
+# built from any of them serves every queue using one of them
+_DEFAULT_SESSIONS: "weakref.WeakSet[AioSession]" = weakref.WeakSet()
+
+
+def mark_default_session(session: AioSession) -> AioSession:
+    """Remember a session SQSQueue created because it was not given one, see session_key"""
+    _DEFAULT_SESSIONS.add(session)
+    return session
+
+
+def session_key(session: AioSession) -> Hashable:
+    """
+    The part of a client pool key identifying the session a client is built from
+
+    Args:
+        session (AioSession): The queue's session
+
+    Returns:
+        Hashable: The same key for every default session, so queues created without a session share clients
+    """
+    return "default" if session in _DEFAULT_SESSIONS else id(session)
@@ -0,0 +1,158 @@
+"""Module containing the message body compressors"""
+import base64
+import zlib
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+from pydantic_sqs.serialization import MESSAGE_ATTRIBUTE_PREFIX
+
+# Message attribute naming the compressor of a message body. Messages without it are not compressed
+COMPRESSION_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "compression"
+
+
+class Compressor:
+    """Compresses message bodies. Compressed bodies are base64 encoded so they stay valid SQS text"""
+
+    name: str
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Raises:
+            ValueError: Raised if data was not compressed by this compressor
+        """
+        raise NotImplementedError
+
+
+class ZlibCompressor(Compressor):
+    """zlib from the standard library"""
+
+    name = "zlib"
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as exc:
+            raise ValueError(str(exc)) from exc
+
+
+class ZstdCompressor(Compressor):
+    """Zstandard. Requires the zstandard package"""
+
+    name = "zstd"
+
+    def __init__(self) -> None:
+        import zstandard
+
+        self._zstd = zstandard
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zstd.ZstdCompressor().compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return self._zstd.ZstdDecompressor().decompress(data)
+        except self._zstd.ZstdError as exc:
+            raise ValueError(str(exc)) from exc
+
+
+class Lz4Compressor(Compressor):
+    """LZ4 frames. Requires the lz4 package"""
+
+    name = "lz4"
+
+    def __init__(self) -> None:
+        import lz4.frame
+
+        self._lz4 = lz4.frame
+
+    def compress(self, data: bytes) -> bytes:
+        return self._lz4.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return self._lz4.decompress(data)
+        except RuntimeError as exc:
+            raise ValueError(str(exc)) from exc
+
+
+COMPRESSORS: Dict[str, Type[Compressor]] = {
+    ZlibCompressor.name: ZlibCompressor,
+    ZstdCompressor.name: ZstdCompressor,
+    Lz4Compressor.name: Lz4Compressor,
+}
+
+_COMPRESSOR_PACKAGES = {ZstdCompressor.name: "zstandard", Lz4Compressor.name: "lz4"}
+
+_compressors: Dict[str, Compressor] = {}
+
+
+def get_compressor(name: str) -> Compressor:
+    """
+    Get a compressor by name
+
+    Args:
+        name (str): One of "zlib", "zstd" or "lz4"
+
+    Raises:
+        ValueError: Raised if there is no compressor with that name
+        ImportError: Raised if the compressor's package is not installed
+
+    Returns:
+        Compressor: The compressor. Compressors are created once and shared
+    """
+    compressor = _compressors.get(name)
+    if compressor is not None:
+        return compressor
+    try:
+        compressor_class = COMPRESSORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown compression {name}, choose one of {', '.join(COMPRESSORS)}") from None
+    try:
+        compressor = compressor_class()
+    except ImportError as exc:
+        package = _COMPRESSOR_PACKAGES.get(name, name)
+        raise ImportError(f"The {name} compression requires the {package} package, pip install {package}") from exc
+    _compressors[name] = compressor
+    return compressor
+
+
+def compress_body(body: str, compressor: Compressor, threshold: int) -> Tuple[str, Optional[str]]:
+    """
+    Compress a message body if that makes it smaller
+
+    Bodies shorter than threshold characters are returned as they are without being looked at. Larger bodies are
+    compressed, and the compressed body is used only if it is smaller than the original after base64 encoding.
+
+    Args:
+        body (str): The message body
+        compressor (Compressor): The compressor to use
+        threshold (int): The shortest body that is compressed
+
+    Returns:
+        tuple[str, str]: The body to send and the name of the compressor, or None if the body was not compressed
+    """
+    if len(body) < threshold:
+        return body, None
+    data = body.encode("utf-8")
+    compressed = base64.b64encode(compressor.compress(data)).decode("ascii")
+    if len(compressed) >= len(data):
+        return body, None
+    return compressed, compressor.name
+
+
+def decompress_body(body: str, compressor: Compressor) -> str:
+    """
+    Reverse compress_body
+
+    Raises:
+        ValueError: Raised if body was not compressed by compressor
+    """
+    return compressor.decompress(base64.b64decode(body, validate=True)).decode("utf-8")
@@ -0,0 +1,99 @@
+"""Module containing the per-model demultiplexer of received messages"""
+import time
+from collections import deque
+from typing import Any
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+
+# Parked messages are only handed out while more than this many seconds of their visibility timeout are left
+PARKED_DEADLINE_MARGIN = 1.0
+
+
+class Demultiplexer:
+    """
+    Keeps received messages that the caller did not ask for, so they can be handed to the next caller that wants them.
+
+    SQSQueue.from_sqs(model_class=...) receives messages of every model in the queue. Instead of leaving the messages
+    of other models invisible until their visibility timeout runs out, the queue parks them here, per model, and
+    serves them to the next from_sqs call or stream for their model. Parked messages are not kept invisible by the
+    heartbeat: once their visibility timeout is about to run out they are dropped, and SQS redelivers them.
+    """
+
+    def __init__(self, max_messages: int):
+        """
+        Args:
+            max_messages (int): The most messages kept at once
+        """
+        self.max_messages = max_messages
+        self._parked: Dict[type, Deque[Any]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def park(self, message: Any, model_class: type) -> bool:
+        """
+        Keep a received message or envelope for a later caller
+
+        Args:
+            message (SQSModel | SQSEnvelope): The received message
+            model_class (SQSModel): The message's model
+
+        Returns:
+            bool: False if there is no room left, in which case the message is not kept
+        """
+        if self._count >= self.max_messages:
+            self._expire()
+            if self._count >= self.max_messages:
+                return False
+        self._parked.setdefault(model_class, deque()).append(message)
+        self._count += 1
+        return True
+
+    def take(self, model_class: Optional[type], count: int) -> List[Any]:
+        """
+        Take up to count parked messages, oldest first
+
+        Args:
+            model_class (SQSModel, optional): Only take messages of this model or its subclasses. None takes any model
+            count (int): The most messages to take
+
+        Returns:
+            list[SQSModel | SQSEnvelope]: The messages, all with enough of their visibility timeout left to be handled
+        """
+        taken: List[Any] = []
+        if not self._count:
+            return taken
+        cutoff = time.monotonic() + PARKED_DEADLINE_MARGIN
+        for parked_class, parked in list(self._parked.items()):
+            if model_class is not None and not issubclass(parked_class, model_class):
+                continue
+            while parked and len(taken) < count:
+                message = parked.popleft()
+                self._count -= 1
+                if message._visibility_deadline > cutoff and not message.deleted:
+                    taken.append(message)
+            if not parked:
+                del self._parked[parked_class]
+            if len(taken) >= count:
+                break
+        return taken
+
+    def drain(self, model_class: Optional[type] = None) -> List[Any]:
+        """Take every parked message of a model, or of every model if model_class is None, that is still invisible"""
+        return self.take(model_class, self._count)
+
+    def _expire(self) -> None:
+        """Drop parked messages whose visibility timeout is about to run out"""
+        cutoff = time.monotonic() + PARKED_DEADLINE_MARGIN
+        for parked_class, parked in list(self._parked.items()):
+            kept = deque(
+                message for message in parked if message._visibility_deadline > cutoff and not message.deleted
+            )
+            self._count -= len(parked) - len(kept)
+            if kept:
+                self._parked[parked_class] = kept
+            else:
+                del self._parked[parked_class]
@@ -0,0 +1,154 @@
+"""Module containing lazily decoded received messages"""
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from pydantic_sqs import exceptions
+from pydantic_sqs import latency
+
+
+class SQSEnvelope:
+    """
+    A received message whose body is only decoded into its model when it is needed, returned by
+    SQSQueue.from_sqs(lazy=True).
+
+    The message id, receipt handle, attributes and raw body can be read without parsing or validating anything, and
+    the message can be deleted or released without ever being decoded. Call hydrate to get the model. Envelopes are
+    kept invisible by the queue's heartbeat like models are.
+    """
+
+    __slots__ = (
+        "queue",
+        "model_class",
+        "_message",
+        "_model",
+        "_deleted",
+        "_received_at",
+        "_visibility_deadline",
+        "_claim_check",
+        "_dwell_seconds",
+    )
+
+    def __init__(
+        self,
+        queue: Any,
+        message: Dict[str, Any],
+        model_class: Optional[type],
+        received_at: float,
+        visibility_deadline: float,
+        claim_check: Optional[str] = None,
+    ):
+        """
+        Args:
+            queue (SQSQueue): The queue the message was received from
+            message (dict[str, Any]): The message as returned by ReceiveMessage
+            model_class (SQSModel, optional): The model from the message's model attribute, None if it has none
+            received_at (float): The time.monotonic() time the message was received
+            visibility_deadline (float): The time.monotonic() time the message's visibility timeout runs out
+            claim_check (str, optional): The blob store key of the message's body. Defaults to None.
+        """
+        self.queue = queue
+        self.model_class = model_class
+        self._message = message
+        self._model: Any = None
+        self._deleted = False
+        self._received_at = received_at
+        self._visibility_deadline = visibility_deadline
+        self._claim_check = claim_check
+        self._dwell_seconds: Optional[float] = None
+
+    def __repr__(self) -> str:
+        model_name = self.model_class.__qualname__ if self.model_class is not None else None
+        return f"SQSEnvelope(message_id={self.message_id!r}, model={model_name})"
+
+    @property
+    def message_id(self) -> str:
+        return self._message["MessageId"]
+
+    @property
+    def receipt_handle(self) -> str:
+        return self._message["ReceiptHandle"]
+
+    @property
+    def attributes(self) -> Optional[Dict[str, str]]:
+        """The SQS system attributes of the message"""
+        return self._message.get("Attributes", None)
+
+    @property
+    def message_sent_at(self) -> Optional[float]:
+        """The time.time() the message was sent at, see SQSModel.message_sent_at"""
+        return latency.sent_at(self._message)
+
+    @property
+    def message_dwell_seconds(self) -> Optional[float]:
+        """How long (in seconds) the message waited in the queue, see SQSModel.message_dwell_seconds"""
+        return self._dwell_seconds
+
+    @property
+    def message_trace_id(self) -> Optional[str]:
+        """The trace id the message was sent with"""
+        return latency.trace_id(self._message)
+
+    @property
+    def body(self) -> str:
+        """The raw message body. For claim checked messages this is the blob store key"""
+        return self._message["Body"]
+
+    @property
+    def deleted(self) -> bool:
+        if self._model is not None:
+            return self._model.deleted
+        return self._deleted
+
+    @deleted.setter
+    def deleted(self, value: bool) -> None:
+        self._deleted = value
+        if self._model is not None:
+            self._model.deleted = value
+
+    @property
+    def hydrated(self) -> bool:
+        """Whether hydrate has decoded the message"""
+        return self._model is not None
+
+    async def hydrate(self) -> Any:
+        """
+        Decode the message into its model. The model is cached, so later calls return the same object
+
+        Raises:
+            InvalidMessageInQueueError: Raised if the message cannot be decoded into a registered model
+
+        Returns:
+            SQSModel: The model. From then on, the model and this envelope share their deleted state
+        """
+        if self._model is None:
+            self._model = await self.queue._hydrate(self)
+        return self._model
+
+    async def delete_from_queue(self) -> None:
+        """
+        Delete this message from SQS, without decoding it. See SQSModel.delete_from_queue
+
+        Raises:
+            MessageNotInQueueError: Raised when the message has already been deleted
+        """
+        if self._model is not None:
+            await self._model.delete_from_queue()
+            return
+        if self._deleted:
+            raise exceptions.MessageNotInQueueError(f"{self!r} has already been deleted")
+        await self.queue._delete_message(self)
+
+    async def release(self, visibility_timeout: int = 0) -> None:
+        """
+        Give this message back to SQS without deleting or decoding it. See SQSModel.release
+
+        Raises:
+            MessageNotInQueueError: Raised when the message has already been deleted
+        """
+        if self._model is not None:
+            await self._model.release(visibility_timeout=visibility_timeout)
+            return
+        if self._deleted:
+            raise exceptions.MessageNotInQueueError(f"{self!r} has already been deleted")
+        await self.queue._release_message(self, visibility_timeout=visibility_timeout)
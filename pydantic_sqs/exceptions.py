@@ -20,3 +20,9 @@ class InvalidMessageInQueueError(PydanticSQSError):
 
 class ModelAlreadyRegisteredError(PydanticSQSError):
     pass
+
+
+class BatchEntryError(PydanticSQSError):
+    def __init__(self, *args, failure=None):
+        super().__init__(*args)
+        self.failure = failure
@@ -0,0 +1,61 @@
+"""Module containing the message group and deduplication ids of FIFO queues"""
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import Union
+
+# The SQS system attributes requested for messages received from FIFO queues
+FIFO_SYSTEM_ATTRIBUTES = ["MessageGroupId"]
+
+# How a model's message group or deduplication id is found: the name of one of its fields, or a callable that takes
+# the model and returns the id
+IdSource = Union[str, Callable[[Any], Any]]
+
+
+def is_fifo(queue_url: str) -> bool:
+    """Whether a queue is a FIFO queue, which SQS requires to be named with a .fifo suffix"""
+    return queue_url.rstrip("/").endswith(".fifo")
+
+
+def check_id_source(model_class: type, source: Optional[IdSource], name: str) -> None:
+    """
+    Make sure a message group or deduplication id source can be used with a model
+
+    Args:
+        model_class (SQSModel): The model the source is for
+        source (str | Callable, optional): The field name or callable
+        name (str): The name of the argument the source was passed as, for the error message
+
+    Raises:
+        ValueError: Raised if the source is neither one of the model's fields nor a callable
+    """
+    if source is None or callable(source):
+        return
+    if not isinstance(source, str) or source not in model_class.__fields__:
+        raise ValueError(f"{name} must be a field of {model_class.__qualname__} or a callable, not {source!r}")
+
+
+def resolve_id(source: IdSource, model: Any) -> str:
+    """
+    The message group or deduplication id of a model
+
+    Args:
+        source (str | Callable): The field name or callable the id comes from
+        model (SQSModel): The model being sent
+
+    Raises:
+        ValueError: Raised if the id is empty
+
+    Returns:
+        str: The id
+    """
+    value = source(model) if callable(source) else getattr(model, source)
+    value = str(value) if value is not None else ""
+    if not value:
+        raise ValueError(f"{model.__class__.__qualname__} has an empty message group or deduplication id")
+    return value
+
+
+def message_group_id(model: Any) -> Optional[str]:
+    """The message group id of a model or envelope received from a FIFO queue, None if it has none"""
+    return (model.attributes or {}).get("MessageGroupId")
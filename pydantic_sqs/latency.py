@@ -0,0 +1,68 @@
+"""Module containing the send stamps and trace ids used to track message latency, see SQSQueue.track_latency"""
+import time
+import uuid
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from pydantic_sqs.serialization import MESSAGE_ATTRIBUTE_PREFIX
+
+# The message attribute holding the time.time() a message was sent at, with microseconds
+SENT_AT_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "sent_at"
+# The message attribute holding the trace id of a message
+TRACE_ID_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "trace_id"
+
+# The SQS system attributes requested for received messages when latency is tracked
+LATENCY_SYSTEM_ATTRIBUTES = ["SentTimestamp"]
+
+
+def new_trace_id() -> str:
+    """A new random trace id"""
+    return uuid.uuid4().hex
+
+
+def stamp(message_attributes: Dict[str, Any], trace_id: str) -> None:
+    """
+    Add the send time and trace id to the message attributes of a message that is about to be sent
+
+    Args:
+        message_attributes (dict[str, Any]): The message attributes, changed in place
+        trace_id (str): The trace id of the message
+    """
+    message_attributes[SENT_AT_ATTRIBUTE] = {"DataType": "Number", "StringValue": f"{time.time():.6f}"}
+    message_attributes[TRACE_ID_ATTRIBUTE] = {"DataType": "String", "StringValue": trace_id}
+
+
+def sent_at(msg: Dict[str, Any]) -> Optional[float]:
+    """
+    The time.time() a received message was sent at
+
+    Uses the time stamped by the producer if there is one, which is more precise but taken from the producer's clock,
+    otherwise the SentTimestamp system attribute.
+
+    Returns:
+        float: The send time in seconds since the epoch, None if the message carries neither
+    """
+    attribute = msg.get("MessageAttributes", {}).get(SENT_AT_ATTRIBUTE)
+    if attribute is not None:
+        try:
+            return float(attribute["StringValue"])
+        except (KeyError, ValueError):
+            pass
+    sent_timestamp = (msg.get("Attributes") or {}).get("SentTimestamp")
+    if sent_timestamp is not None:
+        return int(sent_timestamp) / 1000
+    return None
+
+
+def trace_id(msg: Dict[str, Any]) -> Optional[str]:
+    """The trace id of a received message, None if it was sent without one"""
+    attribute = msg.get("MessageAttributes", {}).get(TRACE_ID_ATTRIBUTE)
+    return attribute.get("StringValue") if attribute is not None else None
+
+
+def dwell_seconds(sent: Optional[float], received: float) -> Optional[float]:
+    """How long a message waited in the queue, never negative even if the producer's clock is ahead"""
+    if sent is None:
+        return None
+    return max(0.0, received - sent)
@@ -0,0 +1,138 @@
+"""Module containing the visibility timeout heartbeat"""
+import asyncio
+import logging
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long (in seconds) the heartbeat waits before retrying extensions that failed without a sender fault
+HEARTBEAT_ERROR_BACKOFF = 1.0
+
+
+class LeaseManager:
+    """
+    Keeps received messages invisible while they are being handled.
+
+    Every tracked message has its visibility timeout extended with ChangeMessageVisibilityBatch shortly before it runs
+    out, until the message is deleted, untracked, or has been held for max_lifetime seconds. This lets queues use short
+    visibility timeouts, so messages from a crashed consumer come back quickly, without slow messages being delivered
+    twice. Enabled by setting SQSQueue.heartbeat_seconds.
+    """
+
+    def __init__(self, queue: Any, extension: int, max_lifetime: Optional[float] = None):
+        """
+        Args:
+            queue (SQSQueue): The queue the messages were received from
+            extension (int): The visibility timeout (in seconds) set on every extension
+            max_lifetime (float, optional): The longest time (in seconds) a message is kept invisible after it was
+                received. Defaults to None, which keeps extending until the message is deleted or untracked.
+        """
+        self.queue = queue
+        self.extension = extension
+        self.max_lifetime = max_lifetime
+        self.loop = asyncio.get_running_loop()
+        self._leases: Dict[int, Any] = {}
+        self._changed = asyncio.Event()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.extensions = 0
+
+    @property
+    def lead(self) -> float:
+        """A message is extended once less than this many seconds of its visibility timeout are left"""
+        return min(max(1.0, self.extension / 3), self.extension / 2)
+
+    def __len__(self) -> int:
+        return len(self._leases)
+
+    def __contains__(self, model: Any) -> bool:
+        return id(model) in self._leases
+
+    def track(self, model: Any) -> None:
+        """Start extending a received model's visibility timeout"""
+        self._leases[id(model)] = model
+        self._changed.set()
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._run())
+
+    def untrack(self, model: Any) -> None:
+        """Stop extending a model's visibility timeout. It becomes visible again once its current timeout runs out"""
+        self._leases.pop(id(model), None)
+
+    async def stop(self) -> None:
+        """Stop extending every tracked model"""
+        self._leases.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _partition(self, now: float) -> Tuple[List[Any], float]:
+        """
+        Drop the leases that are done and find the ones due for an extension
+
+        Args:
+            now (float): The current monotonic time
+
+        Returns:
+            tuple[list[SQSModel], float]: The models due for an extension, and the seconds until the next one is due
+        """
+        due = []
+        next_due = float(self.extension)
+        for key, model in list(self._leases.items()):
+            if model.deleted or model._visibility_deadline is None:
+                del self._leases[key]
+            elif self.max_lifetime is not None and now + self.extension - model._received_at > self.max_lifetime:
+                # let the message's current visibility timeout run out
+                del self._leases[key]
+            elif model._visibility_deadline - now <= self.lead:
+                due.append(model)
+            else:
+                next_due = min(next_due, model._visibility_deadline - now - self.lead)
+        return due, next_due
+
+    async def _extend(self, due: List[Any]) -> float:
+        """
+        Extend the visibility timeout of due models
+
+        A model that fails with a sender fault, e.g. because its receipt handle expired, can never be extended and is
+        untracked. Any other failure is retried after HEARTBEAT_ERROR_BACKOFF seconds.
+
+        Args:
+            due (list[SQSModel]): The models to extend
+
+        Returns:
+            float: The seconds until an extension is next due
+        """
+        result = await self.queue.change_visibility_batch(due, visibility_timeout=self.extension)
+        self.extensions += len(result.successful)
+        next_due = float(self.extension - self.lead)
+        for failure in result.failed:
+            if failure.sender_fault:
+                self.untrack(failure.model)
+            else:
+                next_due = min(next_due, HEARTBEAT_ERROR_BACKOFF)
+        if result.failed:
+            logger.warning(
+                "Extending visibility of %d messages on %s failed", len(result.failed), self.queue.queue_url
+            )
+        return next_due
+
+    async def _run(self) -> None:
+        """Extend leases as they come due until nothing is tracked"""
+        while self._leases:
+            due, next_due = self._partition(time.monotonic())
+            if due:
+                next_due = min(next_due, await self._extend(due))
+
+            if not self._leases:
+                break
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=next_due)
+            except asyncio.TimeoutError:
+                pass
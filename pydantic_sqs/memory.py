@@ -0,0 +1,728 @@
+"""Module containing the in-memory SQS transport"""
+import asyncio
+import hashlib
+import heapq
+import json
+import re
+import time
+import uuid
+from collections import deque
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import AsyncIterator
+from typing import Deque
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from botocore.exceptions import ClientError
+from pydantic_sqs.batch import entry_size
+from pydantic_sqs.batch import MAX_BATCH_BYTES
+from pydantic_sqs.batch import MAX_BATCH_ENTRIES
+from pydantic_sqs.transport import Transport
+
+# The limits SQS enforces on requests
+MAX_VISIBILITY_TIMEOUT = 43200
+MAX_DELAY_SECONDS = 900
+MAX_WAIT_TIME_SECONDS = 20
+MAX_MESSAGE_ATTRIBUTES = 10
+
+# How long (in seconds) FIFO queues remember the deduplication ids of sent messages
+DEDUPLICATION_INTERVAL = 300
+
+DEFAULT_QUEUE_ATTRIBUTES = {
+    "VisibilityTimeout": "30",
+    "DelaySeconds": "0",
+    "ReceiveMessageWaitTimeSeconds": "0",
+    "MaximumMessageSize": str(MAX_BATCH_BYTES),
+}
+
+_RECEIPT_HANDLE_PREFIX = "memory-"
+_BATCH_ENTRY_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,80}")
+_QUEUE_NAME_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,80}")
+
+
+def _client_error(code: str, message: str, operation: str) -> ClientError:
+    """A ClientError like the ones botocore raises for a failed SQS call"""
+    return ClientError(
+        {"Error": {"Code": code, "Message": message, "Type": "Sender"}, "ResponseMetadata": {"HTTPStatusCode": 400}},
+        operation,
+    )
+
+
+class _Message:
+    """A message kept by a _MemoryQueue"""
+
+    __slots__ = (
+        "message_id",
+        "body",
+        "md5",
+        "message_attributes",
+        "sent_timestamp",
+        "first_received_timestamp",
+        "receive_count",
+        "visible_at",
+        "receipt_handles",
+        "group_id",
+        "deduplication_id",
+        "sequence_number",
+        "deleted",
+        "scheduled",
+    )
+
+    def __init__(self, body: str, message_attributes: Dict[str, Any], visible_at: float):
+        self.message_id = str(uuid.uuid4())
+        self.body = body
+        self.md5 = hashlib.md5(body.encode("utf-8")).hexdigest()
+        self.message_attributes = message_attributes
+        self.sent_timestamp = int(time.time() * 1000)
+        self.first_received_timestamp: Optional[int] = None
+        self.receive_count = 0
+        self.visible_at = visible_at
+        self.receipt_handles: List[str] = []
+        self.group_id: Optional[str] = None
+        self.deduplication_id: Optional[str] = None
+        self.sequence_number: Optional[str] = None
+        self.deleted = False
+        # The heap entry of a standard queue's message that is delayed or in flight, older entries are out of date
+        self.scheduled = 0
+
+    def in_flight(self, now: float) -> bool:
+        return self.receive_count > 0 and self.visible_at > now
+
+    def system_attributes(self) -> Dict[str, str]:
+        attributes = {
+            "SenderId": "memory",
+            "SentTimestamp": str(self.sent_timestamp),
+            "ApproximateReceiveCount": str(self.receive_count),
+            "ApproximateFirstReceiveTimestamp": str(self.first_received_timestamp),
+        }
+        if self.group_id is not None:
+            attributes["MessageGroupId"] = self.group_id
+            attributes["MessageDeduplicationId"] = self.deduplication_id
+            attributes["SequenceNumber"] = self.sequence_number
+        return attributes
+
+
+class _MemoryQueue:
+    """The messages and attributes of one in-memory queue"""
+
+    def __init__(self, name: str, url: str, arn: str, attributes: Dict[str, str]):
+        self.name = name
+        self.url = url
+        self.arn = arn
+        self.attributes = attributes
+        self.fifo = attributes.get("FifoQueue", "false").lower() == "true"
+        self.messages: Dict[str, _Message] = {}
+        self.sequence = 0
+        self.waiters: List["asyncio.Future[None]"] = []
+        # Standard queues: messages that can be received, and a heap of (visible_at, sequence, message) for the
+        # ones that are delayed or in flight. Entries that are not their message's latest are skipped
+        self.ready: Deque[_Message] = deque()
+        self.waiting: List[Tuple[float, int, _Message]] = []
+        # FIFO queues: the messages of every group, in the order they were sent
+        self.groups: "OrderedDict[str, Deque[_Message]]" = OrderedDict()
+        self.deduplication: Dict[str, Tuple[float, _Message]] = {}
+
+    def attribute(self, name: str) -> int:
+        return int(self.attributes.get(name, DEFAULT_QUEUE_ATTRIBUTES.get(name, "0")))
+
+    def notify(self) -> None:
+        """Wake up the receive calls waiting for messages"""
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def schedule(self, message: _Message) -> None:
+        """Put a standard queue's message where it will be received from once it is visible"""
+        if self.fifo:
+            return
+        self.sequence += 1
+        message.scheduled = self.sequence
+        heapq.heappush(self.waiting, (message.visible_at, self.sequence, message))
+
+    def add(self, message: _Message, now: float) -> None:
+        self.messages[message.message_id] = message
+        if self.fifo:
+            self.groups.setdefault(message.group_id, deque()).append(message)
+        elif message.visible_at <= now:
+            self.ready.append(message)
+        else:
+            self.schedule(message)
+
+    def remove(self, message: _Message) -> None:
+        message.deleted = True
+        self.messages.pop(message.message_id, None)
+        if self.fifo:
+            group = self.groups.get(message.group_id)
+            if group is not None:
+                try:
+                    group.remove(message)
+                except ValueError:
+                    pass
+                if not group:
+                    del self.groups[message.group_id]
+
+    def next_visible(self) -> Optional[float]:
+        """When the earliest delayed or in flight message becomes visible, or None if there is none"""
+        if not self.fifo:
+            while self.waiting and not self._current(self.waiting[0]):
+                heapq.heappop(self.waiting)
+            return self.waiting[0][0] if self.waiting else None
+        times = [message.visible_at for message in self.messages.values() if message.visible_at > time.monotonic()]
+        return min(times) if times else None
+
+    @staticmethod
+    def _current(entry: Tuple[float, int, _Message]) -> bool:
+        return not entry[2].deleted and entry[2].scheduled == entry[1]
+
+    def take(self, count: int, now: float) -> List[_Message]:
+        """Take up to count visible messages, honouring FIFO message groups"""
+        if self.fifo:
+            return self._take_fifo(count, now)
+        while self.waiting and self.waiting[0][0] <= now:
+            entry = heapq.heappop(self.waiting)
+            if self._current(entry):
+                entry[2].scheduled = 0
+                self.ready.append(entry[2])
+        taken = []
+        while self.ready and len(taken) < count:
+            message = self.ready.popleft()
+            if not message.deleted and message.visible_at <= now:
+                taken.append(message)
+        return taken
+
+    def _take_fifo(self, count: int, now: float) -> List[_Message]:
+        taken: List[_Message] = []
+        for group in self.groups.values():
+            if any(message.in_flight(now) for message in group):
+                continue
+            for message in group:
+                if message.visible_at > now or len(taken) >= count:
+                    break
+                taken.append(message)
+            if len(taken) >= count:
+                break
+        return taken
+
+
+class MemoryTransport(Transport):
+    """
+    Keeps queues in memory, so queues can be used without SQS or localstack, like in tests and benchmarks.
+
+    Its clients have the same methods, kwargs and responses as the aiobotocore SQS client for creating, purging and
+    deleting queues, queue attributes and sending, receiving, deleting and changing the visibility of messages, one at
+    a time and in batches. Failed calls raise botocore's ClientError with the code SQS uses.
+
+    Visibility timeouts, long polling, delays, receive counts, redrive policies, the batch entry count and size limits,
+    and FIFO queues with message groups and deduplication are modelled. Permissions, encryption, tags and message
+    retention are not.
+    """
+
+    def __init__(self, region: str = "us-east-1", account_id: str = "000000000000"):
+        """
+        Args:
+            region (str, optional): The region in queue ARNs. Defaults to "us-east-1".
+            account_id (str, optional): The account id in queue urls and ARNs. Defaults to "000000000000".
+        """
+        self.region = region
+        self.account_id = account_id
+        self._queues: Dict[str, _MemoryQueue] = {}
+        self._queues_by_arn: Dict[str, _MemoryQueue] = {}
+
+    @asynccontextmanager
+    async def client(self, queue: Any = None) -> AsyncIterator["MemoryTransport"]:
+        yield self
+
+    async def acquire(self, queue: Any) -> Tuple["MemoryTransport", Hashable]:
+        return self, None
+
+    async def release(self, key: Hashable) -> None:
+        pass
+
+    def _queue(self, queue_url: str, operation: str) -> _MemoryQueue:
+        queue = self._queues.get(queue_url)
+        if queue is None:
+            raise _client_error(
+                "AWS.SimpleQueueService.NonExistentQueue", "The specified queue does not exist.", operation
+            )
+        return queue
+
+    # Queues
+
+    async def create_queue(self, QueueName: str, Attributes: Optional[Dict[str, str]] = None, **kwargs: Any) -> Dict:
+        attributes = dict(Attributes or {})
+        base_name = QueueName[: -len(".fifo")] if QueueName.endswith(".fifo") else QueueName
+        if not _QUEUE_NAME_PATTERN.fullmatch(base_name):
+            raise _client_error("InvalidParameterValue", f"Invalid queue name {QueueName}", "CreateQueue")
+        if QueueName.endswith(".fifo") != (attributes.get("FifoQueue", "false").lower() == "true"):
+            raise _client_error(
+                "InvalidParameterValue", "FIFO queue names must end in .fifo and set FifoQueue", "CreateQueue"
+            )
+        url = f"memory://{self.region}/{self.account_id}/{QueueName}"
+        existing = self._queues.get(url)
+        if existing is not None:
+            if any(existing.attributes.get(name) != value for name, value in attributes.items()):
+                raise _client_error(
+                    "QueueAlreadyExists", f"A queue named {QueueName} exists with other attributes", "CreateQueue"
+                )
+            return {"QueueUrl": url}
+        arn = f"arn:aws:sqs:{self.region}:{self.account_id}:{QueueName}"
+        queue = _MemoryQueue(QueueName, url, arn, attributes)
+        self._queues[url] = queue
+        self._queues_by_arn[arn] = queue
+        return {"QueueUrl": url}
+
+    async def get_queue_url(self, QueueName: str, **kwargs: Any) -> Dict:
+        url = f"memory://{self.region}/{self.account_id}/{QueueName}"
+        return {"QueueUrl": self._queue(url, "GetQueueUrl").url}
+
+    async def list_queues(self, QueueNamePrefix: str = "", **kwargs: Any) -> Dict:
+        urls = [queue.url for queue in self._queues.values() if queue.name.startswith(QueueNamePrefix)]
+        return {"QueueUrls": urls} if urls else {}
+
+    async def delete_queue(self, QueueUrl: str, **kwargs: Any) -> Dict:
+        queue = self._queue(QueueUrl, "DeleteQueue")
+        del self._queues[QueueUrl]
+        del self._queues_by_arn[queue.arn]
+        return {}
+
+    async def purge_queue(self, QueueUrl: str, **kwargs: Any) -> Dict:
+        queue = self._queue(QueueUrl, "PurgeQueue")
+        for message in list(queue.messages.values()):
+            queue.remove(message)
+        queue.ready.clear()
+        queue.waiting.clear()
+        return {}
+
+    async def get_queue_attributes(
+        self, QueueUrl: str, AttributeNames: Optional[List[str]] = None, **kwargs: Any
+    ) -> Dict:
+        queue = self._queue(QueueUrl, "GetQueueAttributes")
+        now = time.monotonic()
+        visible = delayed = in_flight = 0
+        for message in queue.messages.values():
+            if message.in_flight(now):
+                in_flight += 1
+            elif message.visible_at > now:
+                delayed += 1
+            else:
+                visible += 1
+        attributes = dict(DEFAULT_QUEUE_ATTRIBUTES, **queue.attributes)
+        attributes.update(
+            QueueArn=queue.arn,
+            ApproximateNumberOfMessages=str(visible),
+            ApproximateNumberOfMessagesNotVisible=str(in_flight),
+            ApproximateNumberOfMessagesDelayed=str(delayed),
+        )
+        names = AttributeNames or []
+        if "All" not in names:
+            attributes = {name: value for name, value in attributes.items() if name in names}
+        return {"Attributes": attributes} if attributes else {}
+
+    async def set_queue_attributes(self, QueueUrl: str, Attributes: Dict[str, str], **kwargs: Any) -> Dict:
+        queue = self._queue(QueueUrl, "SetQueueAttributes")
+        if "FifoQueue" in Attributes:
+            raise _client_error("InvalidAttributeName", "FifoQueue cannot be changed", "SetQueueAttributes")
+        queue.attributes.update(Attributes)
+        return {}
+
+    # Sending
+
+    def _new_message(self, queue: _MemoryQueue, entry: Dict[str, Any], now: float) -> Tuple[_Message, bool]:
+        """
+        Validate a send entry and build its message
+
+        Raises:
+            ClientError: Raised if the entry is invalid. Its operation name is left for the caller to fill in
+
+        Returns:
+            tuple[_Message, bool]: The message, and whether it is a new message rather than a deduplicated resend
+        """
+        body = entry.get("MessageBody")
+        if not body:
+            raise _client_error("MissingParameter", "The request must contain the parameter MessageBody.", "")
+        message_attributes = entry.get("MessageAttributes") or {}
+        if len(message_attributes) > MAX_MESSAGE_ATTRIBUTES:
+            raise _client_error(
+                "InvalidParameterValue", f"Number of message attributes exceeds {MAX_MESSAGE_ATTRIBUTES}", ""
+            )
+        if entry_size(entry) > queue.attribute("MaximumMessageSize"):
+            raise _client_error(
+                "InvalidParameterValue",
+                "One or more parameters are invalid. Reason: Message must be shorter than "
+                + f"{queue.attribute('MaximumMessageSize')} bytes.",
+                "",
+            )
+        delay = entry.get("DelaySeconds")
+        if delay is not None and (queue.fifo or not 0 <= delay <= MAX_DELAY_SECONDS):
+            raise _client_error("InvalidParameterValue", f"Value {delay} for parameter DelaySeconds is invalid.", "")
+        if delay is None:
+            delay = queue.attribute("DelaySeconds")
+
+        message = _Message(body, message_attributes, now + delay)
+        if not queue.fifo:
+            if "MessageGroupId" in entry or "MessageDeduplicationId" in entry:
+                raise _client_error(
+                    "InvalidParameterValue", "MessageGroupId is only supported by FIFO queues", ""
+                )
+            return message, True
+        return self._deduplicate(queue, entry, message, now)
+
+    @staticmethod
+    def _deduplicate(
+        queue: _MemoryQueue, entry: Dict[str, Any], message: _Message, now: float
+    ) -> Tuple[_Message, bool]:
+        """
+        Assign a FIFO queue's message its group, deduplication id and sequence number, or find the message it
+        duplicates
+
+        Raises:
+            ClientError: Raised if the entry has no group id, or no deduplication id while the queue does not use
+                content-based deduplication
+
+        Returns:
+            tuple[_Message, bool]: The message, and whether it is a new message rather than a deduplicated resend
+        """
+        group_id = entry.get("MessageGroupId")
+        if not group_id:
+            raise _client_error("MissingParameter", "The request must contain the parameter MessageGroupId.", "")
+        deduplication_id = entry.get("MessageDeduplicationId")
+        if deduplication_id is None:
+            if queue.attributes.get("ContentBasedDeduplication", "false").lower() != "true":
+                raise _client_error(
+                    "InvalidParameterValue",
+                    "The queue should either have ContentBasedDeduplication enabled or MessageDeduplicationId "
+                    + "provided explicitly",
+                    "",
+                )
+            deduplication_id = hashlib.sha256(message.body.encode("utf-8")).hexdigest()
+        while queue.deduplication:
+            oldest = next(iter(queue.deduplication))
+            if queue.deduplication[oldest][0] > now:
+                break
+            del queue.deduplication[oldest]
+        duplicate = queue.deduplication.get(deduplication_id)
+        if duplicate is not None:
+            return duplicate[1], False
+        queue.sequence += 1
+        message.group_id = group_id
+        message.deduplication_id = deduplication_id
+        message.sequence_number = str(queue.sequence).zfill(20)
+        queue.deduplication[deduplication_id] = (now + DEDUPLICATION_INTERVAL, message)
+        return message, True
+
+    @staticmethod
+    def _send_result(message: _Message) -> Dict[str, Any]:
+        result = {"MessageId": message.message_id, "MD5OfMessageBody": message.md5}
+        if message.sequence_number is not None:
+            result["SequenceNumber"] = message.sequence_number
+        return result
+
+    async def send_message(self, QueueUrl: str, **entry: Any) -> Dict:
+        queue = self._queue(QueueUrl, "SendMessage")
+        now = time.monotonic()
+        try:
+            message, new = self._new_message(queue, entry, now)
+        except ClientError as exc:
+            exc.operation_name = "SendMessage"
+            raise
+        if new:
+            queue.add(message, now)
+            queue.notify()
+        return self._send_result(message)
+
+    def _check_batch(self, entries: List[Dict[str, Any]], operation: str) -> None:
+        """Raise the errors SQS raises for a whole batch request"""
+        if not entries:
+            raise _client_error(
+                "AWS.SimpleQueueService.EmptyBatchRequest", "There should be at least one entry.", operation
+            )
+        if len(entries) > MAX_BATCH_ENTRIES:
+            raise _client_error(
+                "AWS.SimpleQueueService.TooManyEntriesInBatchRequest",
+                f"Maximum number of entries per request are {MAX_BATCH_ENTRIES}. You have sent {len(entries)}.",
+                operation,
+            )
+        ids = [entry.get("Id", "") for entry in entries]
+        for entry_id in ids:
+            if not _BATCH_ENTRY_ID_PATTERN.fullmatch(entry_id):
+                raise _client_error(
+                    "AWS.SimpleQueueService.InvalidBatchEntryId", f"Invalid batch entry id {entry_id!r}", operation
+                )
+        if len(set(ids)) != len(ids):
+            raise _client_error(
+                "AWS.SimpleQueueService.BatchEntryIdsNotDistinct",
+                "Two or more batch entries in the request have the same Id.",
+                operation,
+            )
+
+    @staticmethod
+    def _failure(entry_id: str, exc: ClientError) -> Dict[str, Any]:
+        return {
+            "Id": entry_id,
+            "SenderFault": True,
+            "Code": exc.response["Error"]["Code"],
+            "Message": exc.response["Error"]["Message"],
+        }
+
+    async def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]], **kwargs: Any) -> Dict:
+        queue = self._queue(QueueUrl, "SendMessageBatch")
+        self._check_batch(Entries, "SendMessageBatch")
+        total = sum(entry_size(entry) for entry in Entries)
+        if total > MAX_BATCH_BYTES:
+            raise _client_error(
+                "AWS.SimpleQueueService.BatchRequestTooLong",
+                f"Batch requests cannot be longer than {MAX_BATCH_BYTES} bytes. You have sent {total} bytes.",
+                "SendMessageBatch",
+            )
+        now = time.monotonic()
+        successful = []
+        failed = []
+        for entry in Entries:
+            fields = {name: value for name, value in entry.items() if name != "Id"}
+            try:
+                message, new = self._new_message(queue, fields, now)
+            except ClientError as exc:
+                failed.append(self._failure(entry["Id"], exc))
+                continue
+            if new:
+                queue.add(message, now)
+            successful.append(dict(self._send_result(message), Id=entry["Id"]))
+        if successful:
+            queue.notify()
+        return {"Successful": successful, "Failed": failed}
+
+    # Receiving
+
+    def _dead_letter(self, queue: _MemoryQueue, message: _Message, now: float) -> bool:
+        """Move a message past its queue's maxReceiveCount to the dead-letter queue. Returns whether it was moved"""
+        policy = queue.attributes.get("RedrivePolicy")
+        if not policy:
+            return False
+        policy = json.loads(policy)
+        if message.receive_count < int(policy["maxReceiveCount"]):
+            return False
+        target = self._queues_by_arn.get(policy["deadLetterTargetArn"])
+        queue.remove(message)
+        if target is not None:
+            message.deleted = False
+            message.visible_at = now
+            message.receive_count = 0
+            message.receipt_handles = []
+            if target.fifo and message.group_id is None:
+                message.group_id = message.deduplication_id = message.message_id
+            target.add(message, now)
+            target.notify()
+        return True
+
+    @staticmethod
+    def _selected(names: List[str], available: Dict[str, Any]) -> Dict[str, Any]:
+        """The entries of available selected by AttributeNames-style names, including "All" and "prefix.*" names"""
+        if "All" in names or ".*" in names:
+            return dict(available)
+        selected = {}
+        for name in names:
+            if name.endswith(".*"):
+                prefix = name[:-1]
+                selected.update((key, value) for key, value in available.items() if key.startswith(prefix))
+            elif name in available:
+                selected[name] = available[name]
+        return selected
+
+    async def _wait_for_messages(
+        self, queue_url: str, queue: _MemoryQueue, max_messages: int, wait_time_seconds: int
+    ) -> Tuple[List[_Message], float]:
+        """Take up to max_messages receivable messages, waiting up to wait_time_seconds for the first one
+
+        Returns:
+            tuple[list[_Message], float]: The messages, and the monotonic time they were taken at
+        """
+        deadline = time.monotonic() + wait_time_seconds
+        while True:
+            now = time.monotonic()
+            taken = [
+                message for message in queue.take(max_messages, now) if not self._dead_letter(queue, message, now)
+            ]
+            if taken or now >= deadline or self._queues.get(queue_url) is not queue:
+                break
+            waiter = asyncio.get_running_loop().create_future()
+            queue.waiters.append(waiter)
+            timeout = deadline - now
+            next_visible = queue.next_visible()
+            if next_visible is not None:
+                timeout = min(timeout, max(next_visible - now, 0.001))
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if waiter in queue.waiters:
+                    queue.waiters.remove(waiter)
+        return taken, now
+
+    async def receive_message(
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = 1,
+        VisibilityTimeout: Optional[int] = None,
+        WaitTimeSeconds: Optional[int] = None,
+        AttributeNames: Optional[List[str]] = None,
+        MessageSystemAttributeNames: Optional[List[str]] = None,
+        MessageAttributeNames: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Dict:
+        queue = self._queue(QueueUrl, "ReceiveMessage")
+        if not 1 <= MaxNumberOfMessages <= MAX_BATCH_ENTRIES:
+            raise _client_error(
+                "InvalidParameterValue",
+                f"Value {MaxNumberOfMessages} for parameter MaxNumberOfMessages is invalid.",
+                "ReceiveMessage",
+            )
+        if VisibilityTimeout is None:
+            VisibilityTimeout = queue.attribute("VisibilityTimeout")
+        if not 0 <= VisibilityTimeout <= MAX_VISIBILITY_TIMEOUT:
+            raise _client_error(
+                "InvalidParameterValue",
+                f"Value {VisibilityTimeout} for parameter VisibilityTimeout is invalid.",
+                "ReceiveMessage",
+            )
+        if WaitTimeSeconds is None:
+            WaitTimeSeconds = queue.attribute("ReceiveMessageWaitTimeSeconds")
+        if not 0 <= WaitTimeSeconds <= MAX_WAIT_TIME_SECONDS:
+            raise _client_error(
+                "InvalidParameterValue",
+                f"Value {WaitTimeSeconds} for parameter WaitTimeSeconds is invalid.",
+                "ReceiveMessage",
+            )
+
+        taken, now = await self._wait_for_messages(QueueUrl, queue, MaxNumberOfMessages, WaitTimeSeconds)
+        system_names = list(AttributeNames or []) + list(MessageSystemAttributeNames or [])
+        messages = [
+            self._deliver(queue, message, now + VisibilityTimeout, system_names, MessageAttributeNames or [])
+            for message in taken
+        ]
+        return {"Messages": messages} if messages else {}
+
+    def _deliver(
+        self,
+        queue: _MemoryQueue,
+        message: _Message,
+        visible_at: float,
+        system_names: List[str],
+        message_attribute_names: List[str],
+    ) -> Dict[str, Any]:
+        """Mark a message received until visible_at and build its ReceiveMessage entry with the attributes asked for"""
+        message.receive_count += 1
+        if message.first_received_timestamp is None:
+            message.first_received_timestamp = int(time.time() * 1000)
+        message.visible_at = visible_at
+        queue.schedule(message)
+        receipt_handle = f"{_RECEIPT_HANDLE_PREFIX}{message.message_id}-{uuid.uuid4().hex}"
+        message.receipt_handles.append(receipt_handle)
+        received = {
+            "MessageId": message.message_id,
+            "ReceiptHandle": receipt_handle,
+            "MD5OfBody": message.md5,
+            "Body": message.body,
+        }
+        attributes = self._selected(system_names, message.system_attributes())
+        if attributes:
+            received["Attributes"] = attributes
+        message_attributes = self._selected(message_attribute_names, message.message_attributes)
+        if message_attributes:
+            received["MessageAttributes"] = message_attributes
+        return received
+
+    # Deleting and changing visibility
+
+    def _find(self, queue: _MemoryQueue, receipt_handle: str, operation: str) -> Optional[_Message]:
+        """
+        The message a receipt handle was issued for, or None if the message has been deleted
+
+        Raises:
+            ClientError: Raised if the receipt handle was not issued by this transport
+        """
+        if not receipt_handle or not receipt_handle.startswith(_RECEIPT_HANDLE_PREFIX):
+            raise _client_error(
+                "ReceiptHandleIsInvalid", f"The input receipt handle {receipt_handle!r} is not valid.", operation
+            )
+        message_id = receipt_handle[len(_RECEIPT_HANDLE_PREFIX) : -33]
+        message = queue.messages.get(message_id)
+        if message is not None and receipt_handle not in message.receipt_handles:
+            raise _client_error(
+                "ReceiptHandleIsInvalid", f"The input receipt handle {receipt_handle!r} is not valid.", operation
+            )
+        return message
+
+    def _delete(self, queue: _MemoryQueue, receipt_handle: str, operation: str) -> None:
+        message = self._find(queue, receipt_handle, operation)
+        if message is not None:
+            queue.remove(message)
+            if queue.fifo:
+                queue.notify()
+
+    def _change_visibility(
+        self, queue: _MemoryQueue, receipt_handle: str, visibility_timeout: int, operation: str
+    ) -> None:
+        if not 0 <= visibility_timeout <= MAX_VISIBILITY_TIMEOUT:
+            raise _client_error(
+                "InvalidParameterValue",
+                f"Value {visibility_timeout} for parameter VisibilityTimeout is invalid.",
+                operation,
+            )
+        message = self._find(queue, receipt_handle, operation)
+        now = time.monotonic()
+        if message is None or not message.in_flight(now) or receipt_handle != message.receipt_handles[-1]:
+            raise _client_error("MessageNotInflight", "The message referred to is not in flight.", operation)
+        message.visible_at = now + visibility_timeout
+        queue.schedule(message)
+        if visibility_timeout == 0:
+            queue.notify()
+
+    async def delete_message(self, QueueUrl: str, ReceiptHandle: str, **kwargs: Any) -> Dict:
+        self._delete(self._queue(QueueUrl, "DeleteMessage"), ReceiptHandle, "DeleteMessage")
+        return {}
+
+    async def delete_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]], **kwargs: Any) -> Dict:
+        queue = self._queue(QueueUrl, "DeleteMessageBatch")
+        self._check_batch(Entries, "DeleteMessageBatch")
+        successful = []
+        failed = []
+        for entry in Entries:
+            try:
+                self._delete(queue, entry.get("ReceiptHandle"), "DeleteMessageBatch")
+            except ClientError as exc:
+                failed.append(self._failure(entry["Id"], exc))
+                continue
+            successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    async def change_message_visibility(
+        self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: int, **kwargs: Any
+    ) -> Dict:
+        queue = self._queue(QueueUrl, "ChangeMessageVisibility")
+        self._change_visibility(queue, ReceiptHandle, VisibilityTimeout, "ChangeMessageVisibility")
+        return {}
+
+    async def change_message_visibility_batch(
+        self, QueueUrl: str, Entries: List[Dict[str, Any]], **kwargs: Any
+    ) -> Dict:
+        queue = self._queue(QueueUrl, "ChangeMessageVisibilityBatch")
+        self._check_batch(Entries, "ChangeMessageVisibilityBatch")
+        successful = []
+        failed = []
+        for entry in Entries:
+            try:
+                self._change_visibility(
+                    queue, entry.get("ReceiptHandle"), entry["VisibilityTimeout"], "ChangeMessageVisibilityBatch"
+                )
+            except ClientError as exc:
+                failed.append(self._failure(entry["Id"], exc))
+                continue
+            successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
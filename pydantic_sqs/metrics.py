@@ -0,0 +1,278 @@
+"""Module containing the metrics hooks of queue operations"""
+import socket
+import threading
+import time
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pydantic_sqs.batch import entry_size
+from pydantic_sqs.batch import MAX_BATCH_ENTRIES
+
+# Histogram of the latency (in seconds) of every SQS call, tagged with its operation
+CALL_SECONDS = "sqs_call_seconds"
+# Counter of failed SQS calls, tagged with their operation and error code or exception name
+CALL_ERRORS = "sqs_call_errors"
+# Histogram of the messages sent, received, deleted or changed per call, tagged with its operation
+MESSAGES_PER_CALL = "sqs_messages_per_call"
+# Histogram of how full batch calls and receives are, from 0 to 1, tagged with their operation
+BATCH_FILL_RATIO = "sqs_batch_fill_ratio"
+# Counter of batch entries that failed, tagged with their operation and error code
+BATCH_ENTRY_ERRORS = "sqs_batch_entry_errors"
+# Counter of receives that returned no messages
+EMPTY_RECEIVES = "sqs_empty_receives"
+# Counters of message bytes (bodies and message attributes) sent and received
+BYTES_SENT = "sqs_bytes_sent"
+BYTES_RECEIVED = "sqs_bytes_received"
+# Histogram of the time (in seconds) spent decoding and validating a received message, tagged with its model
+DECODE_SECONDS = "sqs_decode_seconds"
+# Counter of received messages that could not be decoded
+DECODE_ERRORS = "sqs_decode_errors"
+# Histograms of how long (in seconds) received messages waited in the queue, how long they took from being received
+# to being deleted, and the total of both, tagged with their model. Only recorded with SQSQueue.track_latency set
+DWELL_SECONDS = "sqs_dwell_seconds"
+ACK_SECONDS = "sqs_receive_to_ack_seconds"
+END_TO_END_SECONDS = "sqs_end_to_end_seconds"
+# Histogram of the time (in seconds) Worker handlers take, tagged with the model and their outcome, "ok" or "error"
+HANDLER_SECONDS = "sqs_handler_seconds"
+
+# The client methods that are instrumented
+OPERATIONS = (
+    "send_message",
+    "send_message_batch",
+    "receive_message",
+    "delete_message",
+    "delete_message_batch",
+    "change_message_visibility",
+    "change_message_visibility_batch",
+)
+
+
+class Metrics:
+    """
+    Receives the counters and histograms of a queue's operations, see SQSQueue.metrics.
+
+    This base class records nothing. Subclasses send them somewhere, like StatsDMetrics or PrometheusMetrics. They may
+    be called from the decode executor's threads.
+    """
+
+    def increment(self, name: str, value: float = 1, tags: Optional[Dict[str, str]] = None) -> None:
+        """Add value to a counter"""
+
+    def observe(self, name: str, value: float, tags: Optional[Dict[str, str]] = None) -> None:
+        """Record one value of a histogram"""
+
+
+class MemoryMetrics(Metrics):
+    """Keeps every counter and observation in memory. Useful in tests, or to sample metrics from code"""
+
+    def __init__(self) -> None:
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = defaultdict(float)
+        self.observations: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = defaultdict(list)
+
+    def increment(self, name: str, value: float = 1, tags: Optional[Dict[str, str]] = None) -> None:
+        self.counters[(name, tuple(sorted((tags or {}).items())))] += value
+
+    def observe(self, name: str, value: float, tags: Optional[Dict[str, str]] = None) -> None:
+        self.observations[(name, tuple(sorted((tags or {}).items())))].append(value)
+
+    def counter(self, name: str, **tags: str) -> float:
+        """The total of a counter over every tag set that includes tags"""
+        return sum(
+            value
+            for (key, key_tags), value in self.counters.items()
+            if key == name and tags.items() <= dict(key_tags).items()
+        )
+
+    def values(self, name: str, **tags: str) -> List[float]:
+        """The observations of a histogram over every tag set that includes tags"""
+        return [
+            value
+            for (key, key_tags), values in self.observations.items()
+            if key == name and tags.items() <= dict(key_tags).items()
+            for value in values
+        ]
+
+
+class StatsDMetrics(Metrics):
+    """
+    Sends metrics to a StatsD server over UDP, with tags in the DogStatsD format. Needs no extra packages.
+
+    Histograms are sent with the "h" type. Sending never raises, lost packets are lost metrics.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 8125, prefix: str = "", tags: bool = True):
+        """
+        Args:
+            host (str, optional): The StatsD host. Defaults to "localhost".
+            port (int, optional): The StatsD port. Defaults to 8125.
+            prefix (str, optional): Prepended to every metric name, like "myapp.". Defaults to "".
+            tags (bool, optional): Whether to send tags. Turn it off for servers that do not understand them.
+                Defaults to True.
+
+        Raises:
+            OSError: Raised if host cannot be resolved. It is resolved once here, not for every metric
+        """
+        self.address = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+        self.prefix = prefix
+        self.tags = tags
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.connect(self.address)
+
+    def _send(self, name: str, value: float, kind: str, tags: Optional[Dict[str, str]]) -> None:
+        line = f"{self.prefix}{name}:{value:g}|{kind}"
+        if tags and self.tags:
+            line += "|#" + ",".join(f"{key}:{tag}" for key, tag in tags.items())
+        try:
+            self._socket.send(line.encode("utf-8"))
+        except OSError:
+            pass
+
+    def increment(self, name: str, value: float = 1, tags: Optional[Dict[str, str]] = None) -> None:
+        self._send(name, value, "c", tags)
+
+    def observe(self, name: str, value: float, tags: Optional[Dict[str, str]] = None) -> None:
+        self._send(name, value, "h", tags)
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class PrometheusMetrics(Metrics):
+    """
+    Records metrics in prometheus_client counters and histograms, created on first use with the tags as labels.
+
+    prometheus_client has to be installed separately. Every use of a metric must have the same tag names, which is
+    the case for the metrics of this library.
+    """
+
+    # Buckets of the histograms that do not measure seconds
+    BUCKETS = {
+        MESSAGES_PER_CALL: (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10),
+        BATCH_FILL_RATIO: (0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1),
+    }
+
+    def __init__(self, namespace: str = "", registry: Any = None):
+        """
+        Args:
+            namespace (str, optional): The namespace of every metric. Defaults to "".
+            registry (CollectorRegistry, optional): The registry to register metrics in. Defaults to None, which uses
+                prometheus_client's default registry.
+
+        Raises:
+            ImportError: Raised if prometheus_client is not installed
+        """
+        try:
+            import prometheus_client
+        except ImportError as exc:
+            raise ImportError("PrometheusMetrics needs prometheus_client, pip install prometheus-client") from exc
+        self._prometheus = prometheus_client
+        self.namespace = namespace
+        self.registry = registry if registry is not None else prometheus_client.REGISTRY
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _metric(self, kind: str, name: str, tags: Optional[Dict[str, str]]) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    kwargs: Dict[str, Any] = {
+                        "namespace": self.namespace,
+                        "labelnames": sorted(tags or {}),
+                        "registry": self.registry,
+                    }
+                    if kind == "Histogram" and name in self.BUCKETS:
+                        kwargs["buckets"] = self.BUCKETS[name]
+                    metric = getattr(self._prometheus, kind)(name, name.replace("_", " "), **kwargs)
+                    self._metrics[name] = metric
+        return metric.labels(**tags) if tags else metric
+
+    def increment(self, name: str, value: float = 1, tags: Optional[Dict[str, str]] = None) -> None:
+        self._metric("Counter", name, tags).inc(value)
+
+    def observe(self, name: str, value: float, tags: Optional[Dict[str, str]] = None) -> None:
+        self._metric("Histogram", name, tags).observe(value)
+
+
+def _error_code(exc: BaseException) -> str:
+    """The SQS error code of a botocore ClientError, or the exception's class name"""
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code")
+        if code:
+            return code
+    return exc.__class__.__name__
+
+
+def _received_size(message: Dict[str, Any]) -> int:
+    return entry_size(
+        {"MessageBody": message.get("Body", ""), "MessageAttributes": message.get("MessageAttributes", {})}
+    )
+
+
+class InstrumentedClient:
+    """Wraps a SQS client and records metrics for every call made through it, see SQSQueue.client"""
+
+    def __init__(self, client: Any, metrics: Metrics, tags: Dict[str, str]):
+        """
+        Args:
+            client (Any): The client to wrap
+            metrics (Metrics): Where the metrics go
+            tags (dict[str, str]): Tags added to every metric, like the queue's name
+        """
+        self._client = client
+        self._metrics = metrics
+        self._tags = tags
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._client, name)
+        if name not in OPERATIONS:
+            return method
+
+        async def call(**kwargs: Any) -> Any:
+            tags = dict(self._tags, operation=name)
+            start = time.perf_counter()
+            try:
+                response = await method(**kwargs)
+            except Exception as exc:
+                self._metrics.increment(CALL_ERRORS, tags=dict(tags, error=_error_code(exc)))
+                raise
+            finally:
+                self._metrics.observe(CALL_SECONDS, time.perf_counter() - start, tags=tags)
+            self._record(name, tags, kwargs, response)
+            return response
+
+        return call
+
+    def _record(self, name: str, tags: Dict[str, str], request: Dict[str, Any], response: Dict[str, Any]) -> None:
+        metrics = self._metrics
+        if name == "receive_message":
+            messages = response.get("Messages", [])
+            metrics.observe(MESSAGES_PER_CALL, len(messages), tags=tags)
+            metrics.observe(BATCH_FILL_RATIO, len(messages) / request.get("MaxNumberOfMessages", 1), tags=tags)
+            if messages:
+                received = sum(_received_size(message) for message in messages)
+                metrics.increment(BYTES_RECEIVED, received, tags=self._tags)
+            else:
+                metrics.increment(EMPTY_RECEIVES, tags=self._tags)
+            return
+
+        entries = request.get("Entries")
+        if entries is None:
+            metrics.observe(MESSAGES_PER_CALL, 1, tags=tags)
+            if name == "send_message":
+                metrics.increment(BYTES_SENT, entry_size(request), tags=self._tags)
+            return
+
+        metrics.observe(MESSAGES_PER_CALL, len(entries), tags=tags)
+        metrics.observe(BATCH_FILL_RATIO, len(entries) / MAX_BATCH_ENTRIES, tags=tags)
+        if name == "send_message_batch":
+            metrics.increment(BYTES_SENT, sum(entry_size(entry) for entry in entries), tags=self._tags)
+        for failure in response.get("Failed", []):
+            metrics.increment(BATCH_ENTRY_ERRORS, tags=dict(tags, error=failure.get("Code", "Unknown")))
@@ -1,12 +1,25 @@
 """Module containing the model classes"""
-import json
 from typing import Any
 from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
 
+from pydantic import PrivateAttr
 from pydantic_sqs import exceptions
 from pydantic_sqs.abstract import _AbstractModel
+from pydantic_sqs.batch import BatchResult
+from pydantic_sqs.compression import compress_body
+from pydantic_sqs.compression import COMPRESSION_ATTRIBUTE
+from pydantic_sqs.compression import get_compressor
+from pydantic_sqs.latency import new_trace_id
+from pydantic_sqs.latency import stamp
+from pydantic_sqs.serialization import CODEC_ATTRIBUTE
+from pydantic_sqs.serialization import FINGERPRINT_ATTRIBUTE
+from pydantic_sqs.serialization import JSONCodec
+from pydantic_sqs.serialization import MODEL_ATTRIBUTE
+from pydantic_sqs.serialization import SQS_METADATA_FIELDS
+from pydantic_sqs.stream import MessageStream
 
 
 class SQSModel(_AbstractModel):
@@ -23,10 +36,61 @@ class SQSModel(_AbstractModel):
     attributes: Dict[str, str] = None  # type: ignore
     deleted: bool = False
 
+    # The time.monotonic() time this message was received
+    _received_at: Optional[float] = PrivateAttr(default=None)
+
+    # The time.monotonic() time this message's visibility timeout runs out, set when it is received
+    _visibility_deadline: Optional[float] = PrivateAttr(default=None)
+
+    # The size of the message body this object was received from
+    _body_size: Optional[int] = PrivateAttr(default=None)
+
+    # The blob store key of this message's body, if it was too large for SQS. See SQSQueue.blob_store
+    _claim_check: Optional[str] = PrivateAttr(default=None)
+
+    # The time.time() this message was sent at, see SQSQueue.track_latency
+    _sent_at: Optional[float] = PrivateAttr(default=None)
+
+    # How long (in seconds) this message waited in the queue before it was received
+    _dwell_seconds: Optional[float] = PrivateAttr(default=None)
+
+    # The trace id this message was, or will be, sent with
+    _trace_id: Optional[str] = PrivateAttr(default=None)
+
     class Config:
         arbitrary_types_allowed = True
         orm_mode = True
 
+    @property
+    def message_sent_at(self) -> Optional[float]:
+        """The time.time() this message was sent at, from the producer's stamp or SentTimestamp, if it was received
+        from a queue with track_latency set"""
+        return self._sent_at
+
+    @property
+    def message_dwell_seconds(self) -> Optional[float]:
+        """How long (in seconds) this message waited in the queue before it was received, if it was received from a
+        queue with track_latency set"""
+        return self._dwell_seconds
+
+    @property
+    def message_trace_id(self) -> Optional[str]:
+        """The trace id this message was received with, or was sent with by a queue with track_latency set"""
+        return self._trace_id
+
+    def continue_trace(self, other: Any) -> "SQSModel":
+        """
+        Send this object with the trace id of another message, like the message it was created in response to
+
+        Args:
+            other (SQSModel | SQSEnvelope): The message whose trace id is continued
+
+        Returns:
+            SQSModel: This object
+        """
+        self._trace_id = other.message_trace_id
+        return self
+
     @classmethod
     def __get_queue(cls) -> _AbstractModel:
         """
@@ -79,14 +143,49 @@ class SQSModel(_AbstractModel):
             wait_time_seconds,
             ignore_empty,
             ignore_unknown=True,
+            model_class=cls,
         )
         return [result for result in results if isinstance(result, cls)]
 
-    def __send_kwargs(
-        self, queue_url: str, wait_time_in_seconds: int = None
-    ) -> Dict[str, Any]:
+    @classmethod
+    def stream(
+        cls,
+        max_buffer_messages: int = 100,
+        max_buffer_bytes: int = 10 * 1024 * 1024,
+        pollers: int = 1,
+        max_messages: Optional[int] = None,
+        wait_time_seconds: int = 20,
+        visibility_timeout: Optional[int] = None,
+    ) -> "MessageStream":
+        """stream - streams this model from the queue through a prefetch buffer.
+        See SQSQueue.stream
+
+        Args:
+            max_buffer_messages (int, optional): The maximum number of prefetched messages. Defaults to 100.
+            max_buffer_bytes (int, optional): The maximum total body size of prefetched messages. Defaults to 10 MiB.
+            pollers (int, optional): The number of concurrent long-poll loops. Defaults to 1.
+            max_messages (int, optional): The maximum number of messages per receive call. Defaults to None.
+            wait_time_seconds (int, optional): The long-poll wait time of each receive call. Defaults to 20.
+            visibility_timeout (int, optional): The visibility timeout of received messages. Defaults to None.
+
+        Returns:
+            MessageStream: an async iterator of this model
         """
-        Create the send kwargs
+        queue = cls.__get_queue()
+        return queue.stream(
+            max_buffer_messages=max_buffer_messages,
+            max_buffer_bytes=max_buffer_bytes,
+            pollers=pollers,
+            max_messages=max_messages,
+            wait_time_seconds=wait_time_seconds,
+            visibility_timeout=visibility_timeout,
+            model_class=cls,
+        )
+
+    def _send_entry(self, wait_time_in_seconds: int = None) -> Dict[str, Any]:
+        """
+        Create the message body and options for sending this object, shared by send_message and
+        send_message_batch
 
         Args:
             wait_time_in_seconds (int, optional): The length of time, in seconds, for which to delay a specific message.
@@ -94,24 +193,66 @@ class SQSModel(_AbstractModel):
                 available for processing after the delay period is finished. If you don't specify a value, the
                 default value for the queue applies. Defaults to None. Greater than 0, less than or equal to 900
 
+        Raises:
+            ValueError: Raised if the queue is FIFO and this model has no message group id, see SQSQueue.register_model
+
         Returns:
-            Dict[str, Any]: send kwargs
+            Dict[str, Any]: send entry
         """
-        send_kwargs = {}
+        send_entry = {}
         if wait_time_in_seconds is not None:
             if wait_time_in_seconds < 0:
                 wait_time_in_seconds = 0
             if wait_time_in_seconds > 900:
                 wait_time_in_seconds = 900
-            send_kwargs["DelaySeconds"] = wait_time_in_seconds
+            send_entry["DelaySeconds"] = wait_time_in_seconds
 
-        send_kwargs["QueueUrl"] = queue_url
-        send_kwargs["MessageBody"] = json.dumps(
+        queue = self.__get_queue()
+        send_entry.update(queue._fifo_ids(self))
+        codec = queue.codec_for(self.__class__)
+        model_name = self.__class__.__qualname__.lower()
+        body = codec.encode(
             {
-                "model": self.__class__.__qualname__.lower(),
-                "message": self.dict(exclude_unset=True),
+                "model": model_name,
+                "message": self.dict(exclude_unset=True, exclude=SQS_METADATA_FIELDS),
             }
         )
+        message_attributes = {MODEL_ATTRIBUTE: {"DataType": "String", "StringValue": model_name}}
+        if codec.name != JSONCodec.name:
+            message_attributes[CODEC_ATTRIBUTE] = {"DataType": "String", "StringValue": codec.name}
+        if queue.trusted:
+            fingerprint = queue._decoder(self.__class__).fingerprint
+            message_attributes[FINGERPRINT_ATTRIBUTE] = {"DataType": "String", "StringValue": fingerprint}
+        if queue.track_latency:
+            if self._trace_id is None:
+                self._trace_id = new_trace_id()
+            stamp(message_attributes, self._trace_id)
+        if queue.compression is not None:
+            body, compression = compress_body(body, get_compressor(queue.compression), queue.compression_threshold)
+            if compression is not None:
+                message_attributes[COMPRESSION_ATTRIBUTE] = {"DataType": "String", "StringValue": compression}
+
+        send_entry["MessageBody"] = body
+        send_entry["MessageAttributes"] = message_attributes
+        return send_entry
+
+    def __send_kwargs(
+        self, queue_url: str, wait_time_in_seconds: int = None
+    ) -> Dict[str, Any]:
+        """
+        Create the send kwargs
+
+        Args:
+            wait_time_in_seconds (int, optional): The length of time, in seconds, for which to delay a specific message.
+                Valid values: 0 to 900. Maximum: 15 minutes. Messages with a positive DelaySeconds value become
+                available for processing after the delay period is finished. If you don't specify a value, the
+                default value for the queue applies. Defaults to None. Greater than 0, less than or equal to 900
+
+        Returns:
+            Dict[str, Any]: send kwargs
+        """
+        send_kwargs = self._send_entry(wait_time_in_seconds=wait_time_in_seconds)
+        send_kwargs["QueueUrl"] = queue_url
         return send_kwargs
 
     async def to_sqs(self, wait_time_in_seconds: int = None) -> None:
@@ -119,31 +260,77 @@ class SQSModel(_AbstractModel):
         Send this object to SQS.
         Well set this object's message_id to the message id rom SQS
 
+        If the queue has send_linger_seconds set, the message is buffered and sent with other messages in one
+        SendMessageBatch request. This call still waits until its own message has been sent.
+
         Args:
             wait_time_in_seconds (int, optional): The length of time, in seconds, for which to delay a specific message.
                 Valid values: 0 to 900. Maximum: 15 minutes. Messages with a positive DelaySeconds value become
                 available for processing after the delay period is finished. If you don't specify a value, the
                 default value for the queue applies. Defaults to None. Greater than 0, less than or equal to 900
+
+        Raises:
+            BatchEntryError: Raised if the message was buffered and SQS rejected it
+            ValueError: Raised if the queue is FIFO and this model has no message group id, or its body is offloaded to
+                the queue's blob store without a deduplication id, see SQSQueue.register_model
         """
         queue = self.__get_queue()
+        if queue.send_linger_seconds is not None:
+            self.message_id = await queue._buffered_send(self, wait_time_in_seconds=wait_time_in_seconds)
+            return
 
         send_kwargs = self.__send_kwargs(
             queue_url=queue.queue_url, wait_time_in_seconds=wait_time_in_seconds
         )
-        async with queue.session.create_client("sqs", **queue.client_kwargs) as client:
+        await queue._claim_check(send_kwargs)
+        async with queue.client() as client:
             response = await client.send_message(**send_kwargs)
 
         self.message_id = response["MessageId"]
 
+    @classmethod
+    async def to_sqs_batch(
+        cls,
+        models: Iterable["SQSModel"],
+        wait_time_in_seconds: int = None,
+        retries: int = 2,
+        max_concurrency: int = 10,
+    ) -> "BatchResult":
+        """
+        Send many objects to this model's queue using SendMessageBatch.
+        See SQSQueue.send_batch
+
+        Args:
+            models (Iterable[SQSModel]): The objects to send
+            wait_time_in_seconds (int, optional): The length of time, in seconds, for which to delay the messages.
+                Defaults to None.
+            retries (int, optional): How many times to retry entries that failed. Defaults to 2.
+            max_concurrency (int, optional): The maximum number of batch requests in flight. Defaults to 10.
+
+        Returns:
+            BatchResult: The models that were sent and the entries that failed
+        """
+        queue = cls.__get_queue()
+        return await queue.send_batch(
+            models,
+            wait_time_in_seconds=wait_time_in_seconds,
+            retries=retries,
+            max_concurrency=max_concurrency,
+        )
+
     async def delete_from_queue(self):
         """
         Delete this object from SQS.
         This is good to do after you've confirmed a message in your worker, or SQS will re-deliver
         the message after the visibility timeout
 
+        If the queue has ack_linger_seconds set, the delete is buffered and sent with other deletes in one
+        DeleteMessageBatch request, no later than shortly before the message's visibility timeout runs out.
+
         Sets this object's deleted attribute to True
         Raises:
             MessageNotInQueueError: Raised when the message is not in the queue or has already been deleted
+            BatchEntryError: Raised if the delete was buffered and SQS could not delete the message
         """
         if self.receipt_handle is None:
             raise exceptions.MessageNotInQueueError(
@@ -153,10 +340,26 @@ class SQSModel(_AbstractModel):
             raise exceptions.MessageNotInQueueError(
                 f"{str(self)} has already been deleted"
             )
-        queue = self.__get_queue()
-        session = queue.session
-        async with session.create_client("sqs", **queue.client_kwargs) as client:
-            await client.delete_message(
-                QueueUrl=queue.queue_url, ReceiptHandle=self.receipt_handle
+        await self.__get_queue()._delete_message(self)
+
+    async def release(self, visibility_timeout: int = 0):
+        """
+        Give this object back to SQS without deleting it.
+        Stops the queue's heartbeat from extending this message and sets its visibility timeout, so it is
+        redelivered once that runs out. The default of 0 makes it visible to other consumers right away.
+
+        Args:
+            visibility_timeout (int, optional): The new visibility timeout, in seconds from now. Defaults to 0.
+
+        Raises:
+            MessageNotInQueueError: Raised when the message is not in the queue or has already been deleted
+        """
+        if self.receipt_handle is None:
+            raise exceptions.MessageNotInQueueError(
+                f"{str(self)} does not have a receipt_handle so it was not pulled from SQS and cannot be released"
+            )
+        if self.deleted:
+            raise exceptions.MessageNotInQueueError(
+                f"{str(self)} has already been deleted"
             )
-        self.deleted = True
+        await self.__get_queue()._release_message(self, visibility_timeout=visibility_timeout)
@@ -0,0 +1,134 @@
+"""Module containing the adaptive receive controller"""
+import asyncio
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+
+class PollController:
+    """
+    Adapts how many pollers a consumer runs to the observed arrival rate.
+
+    Every receive call's result is recorded with record. Full receives mean messages are waiting, so after
+    ramp_up_after of them in a row a poller is added. After idle_after empty receives in a row a poller is removed, so
+    an idle queue settles on min_pollers.
+
+    Every receive asks for max_messages with the longest wait, as SQS bills per request: a long poll returns as soon as
+    messages arrive, so a shorter wait or a smaller batch would only add requests.
+    """
+
+    def __init__(
+        self,
+        min_pollers: int = 1,
+        max_pollers: int = 4,
+        max_messages: int = 10,
+        wait_time_seconds: int = 20,
+        ramp_up_after: int = 2,
+        idle_after: int = 2,
+    ):
+        """
+        Args:
+            min_pollers (int, optional): The fewest concurrent pollers, used when the queue is idle. Defaults to 1.
+            max_pollers (int, optional): The most concurrent pollers. Defaults to 4.
+            max_messages (int, optional): The batch size to ask for. Defaults to 10.
+            wait_time_seconds (int, optional): The long-poll wait. Defaults to 20, the longest SQS allows.
+            ramp_up_after (int, optional): Full receives in a row before a poller is added. Defaults to 2.
+            idle_after (int, optional): Empty receives in a row before a poller is removed. Defaults to 2.
+        """
+        self.min_pollers = min_pollers
+        self.max_pollers = max_pollers
+        self.max_messages = max_messages
+        self.wait_time_seconds = wait_time_seconds
+        self.ramp_up_after = ramp_up_after
+        self.idle_after = idle_after
+        self.pollers = min_pollers
+        self.receives = 0
+        self.empty_receives = 0
+        self._full_streak = 0
+        self._empty_streak = 0
+
+    def next_receive(self) -> Tuple[int, int]:
+        """
+        The parameters for the next receive call
+
+        Returns:
+            tuple[int, int]: the batch size (MaxNumberOfMessages) and long-poll wait (WaitTimeSeconds)
+        """
+        return self.max_messages, self.wait_time_seconds
+
+    def record(self, requested: int, received: int) -> None:
+        """
+        Record the result of a receive call
+
+        Args:
+            requested (int): The number of messages asked for
+            received (int): The number of messages SQS returned
+        """
+        self.receives += 1
+        if received == 0:
+            self.empty_receives += 1
+            self._full_streak = 0
+            self._empty_streak += 1
+            if self._empty_streak >= self.idle_after and self.pollers > self.min_pollers:
+                self.pollers -= 1
+                self._empty_streak = 0
+            return
+
+        self._empty_streak = 0
+        if received >= requested:
+            self._full_streak += 1
+            if self._full_streak >= self.ramp_up_after and self.pollers < self.max_pollers:
+                self.pollers += 1
+                self._full_streak = 0
+        else:
+            self._full_streak = 0
+
+
+class _Pollers:
+    """
+    Manages the long-poll loops of a consumer, shared by Worker and MessageStream.
+
+    Without a PollController the consumer runs a fixed number of pollers with fixed receive parameters. With one, the
+    number of pollers and the parameters of every receive call follow the controller.
+    """
+
+    pollers: int
+    max_messages: int
+    wait_time_seconds: int
+    poll_controller: Optional[PollController]
+    _poller_tasks: Set["asyncio.Task[None]"]
+
+    async def _poll(self) -> None:
+        raise NotImplementedError
+
+    def _wanted_pollers(self) -> int:
+        return self.poll_controller.pollers if self.poll_controller is not None else self.pollers
+
+    def _start_pollers(self) -> None:
+        """Start pollers until the wanted number is running"""
+        wanted = self._wanted_pollers()
+        while len(self._poller_tasks) < wanted:
+            task = asyncio.ensure_future(self._poll())
+            self._poller_tasks.add(task)
+            task.add_done_callback(self._poller_tasks.discard)
+
+    def _poller_should_exit(self) -> bool:
+        """Whether the calling poller should stop because fewer pollers are wanted"""
+        if len(self._poller_tasks) <= self._wanted_pollers():
+            return False
+        self._poller_tasks.discard(asyncio.current_task())
+        return True
+
+    def _receive_params(self) -> Tuple[int, int]:
+        """The batch size and long-poll wait for the next receive call"""
+        if self.poll_controller is None:
+            return self.max_messages, self.wait_time_seconds
+        max_messages, wait_time_seconds = self.poll_controller.next_receive()
+        return min(max_messages, self.max_messages), wait_time_seconds
+
+    def _record_receive(self, requested: int, received: int) -> None:
+        """Tell the controller how a receive call went and start pollers if it wants more"""
+        if self.poll_controller is None:
+            return
+        self.poll_controller.record(requested, received)
+        self._start_pollers()
@@ -1,18 +1,93 @@
 """Module containing the queue classes."""
-import json
+import asyncio
+import inspect
+import logging
+import time
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
 from typing import Any
+from typing import AsyncIterator
+from typing import Callable
 from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Set
+from typing import Tuple
 
+from aiobotocore.config import AioConfig
 from aiobotocore.session import AioSession
 from aiobotocore.session import get_session
 from pydantic import AnyUrl
+from pydantic import confloat
 from pydantic import conint
+from pydantic import PrivateAttr
 from pydantic import ValidationError
 from pydantic_sqs import exceptions
+from pydantic_sqs import latency
 from pydantic_sqs.abstract import _AbstractQueue
+from pydantic_sqs.batch import BatchFailure
+from pydantic_sqs.batch import BatchResult
+from pydantic_sqs.batch import entry_size
+from pydantic_sqs.batch import run_batches
+from pydantic_sqs.buffer import _get_buffer
+from pydantic_sqs.buffer import AckBuffer
+from pydantic_sqs.buffer import SendBuffer
+from pydantic_sqs.claim_check import BlobStore
+from pydantic_sqs.claim_check import CLAIM_CHECK_ATTRIBUTE
+from pydantic_sqs.claim_check import DEFAULT_CLAIM_CHECK_THRESHOLD
+from pydantic_sqs.claim_check import new_claim_check_key
+from pydantic_sqs.client import mark_default_session
+from pydantic_sqs.compression import COMPRESSION_ATTRIBUTE
+from pydantic_sqs.compression import decompress_body
+from pydantic_sqs.compression import get_compressor
+from pydantic_sqs.demux import Demultiplexer
+from pydantic_sqs.envelope import SQSEnvelope
+from pydantic_sqs.fifo import check_id_source
+from pydantic_sqs.fifo import FIFO_SYSTEM_ATTRIBUTES
+from pydantic_sqs.fifo import IdSource
+from pydantic_sqs.fifo import is_fifo
+from pydantic_sqs.fifo import resolve_id
+from pydantic_sqs.lease import LeaseManager
+from pydantic_sqs.metrics import ACK_SECONDS
+from pydantic_sqs.metrics import DECODE_ERRORS
+from pydantic_sqs.metrics import DECODE_SECONDS
+from pydantic_sqs.metrics import DWELL_SECONDS
+from pydantic_sqs.metrics import END_TO_END_SECONDS
+from pydantic_sqs.metrics import InstrumentedClient
+from pydantic_sqs.metrics import Metrics
 from pydantic_sqs.model import SQSModel
+from pydantic_sqs.poll import PollController
+from pydantic_sqs.scaling import BacklogScaler
+from pydantic_sqs.serialization import Codec
+from pydantic_sqs.serialization import CODEC_ATTRIBUTE
+from pydantic_sqs.serialization import FINGERPRINT_ATTRIBUTE
+from pydantic_sqs.serialization import get_codec
+from pydantic_sqs.serialization import get_json_backend
+from pydantic_sqs.serialization import JSONBackend
+from pydantic_sqs.serialization import JSONCodec
+from pydantic_sqs.serialization import MESSAGE_ATTRIBUTE_PREFIX
+from pydantic_sqs.serialization import MODEL_ATTRIBUTE
+from pydantic_sqs.serialization import ModelDecoder
+from pydantic_sqs.stream import MessageStream
+from pydantic_sqs.transport import DEFAULT_TRANSPORT
+from pydantic_sqs.transport import Transport
+from pydantic_sqs.worker import Worker
+
+logger = logging.getLogger(__name__)
+
+# The visibility timeout SQS applies when neither the queue nor the receive call sets one
+DEFAULT_VISIBILITY_TIMEOUT = 30
+# How long (in seconds) the queue's own visibility timeout, read with GetQueueAttributes, is reused
+VISIBILITY_TIMEOUT_MAX_AGE = 300.0
+
+
+def _claim_check_key(msg: Dict[str, Any]) -> Optional[str]:
+    """The claim check key of a received message, or None if its body was not offloaded"""
+    message_attributes = msg.get("MessageAttributes")
+    if not message_attributes or CLAIM_CHECK_ATTRIBUTE not in message_attributes:
+        return None
+    return message_attributes[CLAIM_CHECK_ATTRIBUTE].get("StringValue")
 
 
 class SQSQueue(_AbstractQueue):
@@ -40,6 +115,93 @@ class SQSQueue(_AbstractQueue):
     # Whether or not to use SSL for the aws client. Useful for testing with localstack
     use_ssl: bool = True
 
+    # The maximum number of connections kept in the client's connection pool
+    max_pool_connections: conint(gt=0) = 10
+
+    # How long (in seconds) an idle pooled connection is kept alive. None uses the aiohttp default
+    keepalive_timeout: Optional[float] = None
+
+    # When set, to_sqs calls are buffered for up to this many seconds and sent together with SendMessageBatch.
+    # None sends every message on its own
+    send_linger_seconds: Optional[confloat(ge=0)] = None
+
+    # When set, delete_from_queue calls are buffered for up to this many seconds and deleted together with
+    # DeleteMessageBatch. None deletes every message on its own
+    ack_linger_seconds: Optional[confloat(ge=0)] = None
+
+    # When set, the visibility timeout of every received message is extended by this many seconds shortly before it
+    # runs out, until the message is deleted or released. None never extends visibility timeouts
+    heartbeat_seconds: Optional[conint(gt=0, le=43200)] = None
+
+    # The longest time (in seconds) the heartbeat keeps a message invisible after it was received.
+    # None keeps extending until the message is deleted or released
+    heartbeat_max_lifetime: Optional[confloat(gt=0)] = None
+
+    # The JSON library used to encode and decode message bodies: "json", "orjson" or "ujson".
+    # orjson and ujson have to be installed separately
+    json_backend: str = "json"
+
+    # The default codec of message bodies, see SQSQueue.register_codec. Models can override it in register_model
+    codec: str = "json"
+
+    # When set, message bodies of at least compression_threshold characters are compressed with this compressor:
+    # "zlib", "zstd" or "lz4". zstd and lz4 have to be installed separately. None never compresses
+    compression: Optional[str] = None
+    compression_threshold: conint(ge=0) = 4096
+
+    # When set, message bodies larger than claim_check_threshold bytes are stored in this blob store and the message
+    # only carries their key. Consumers need the same store to read them
+    blob_store: Optional[BlobStore] = None
+    claim_check_threshold: conint(gt=0) = DEFAULT_CLAIM_CHECK_THRESHOLD
+    # Whether deleting a message also deletes its offloaded body from the blob store
+    claim_check_delete: bool = True
+
+    # When set, sent messages carry a fingerprint of their model's schema, and received messages whose fingerprint
+    # matches the registered model are built without validating them again. Only use it when every producer is trusted
+    trusted: bool = False
+
+    # The most messages of other models that from_sqs(model_class=...) keeps for later calls instead of leaving them
+    # invisible until their visibility timeout runs out, see SQSQueue.release_parked. 0 keeps none
+    demux_max_messages: conint(ge=0) = 100
+
+    # When set, received bodies of at least this many characters are decoded and validated in decode_executor instead
+    # of on the event loop. Smaller bodies are still decoded on the loop. None decodes everything on the loop
+    decode_offload_threshold: Optional[conint(ge=0)] = None
+    # The executor large bodies are decoded in. None uses the event loop's default thread pool
+    decode_executor: Optional[Executor] = None
+
+    # How this queue reaches SQS. None uses aiobotocore, see AioBotocoreTransport. MemoryTransport keeps queues in
+    # memory, for tests and benchmarks
+    transport: Optional[Transport] = None
+
+    # When set, every SQS call made through this queue, and every received message it decodes, is recorded in these
+    # metrics, see pydantic_sqs.metrics. None records nothing
+    metrics: Optional[Metrics] = None
+
+    # When set, sent messages are stamped with their send time and a trace id, and received messages record how long
+    # they waited in the queue, how long until they were deleted and the total of both in metrics
+    track_latency: bool = False
+
+    # The long-lived client used while this queue is open, see SQSQueue.open
+    _client: Any = PrivateAttr(default=None)
+    _client_key: Optional[Tuple[Any, ...]] = PrivateAttr(default=None)
+    _send_buffer: Optional[SendBuffer] = PrivateAttr(default=None)
+    _ack_buffer: Optional[AckBuffer] = PrivateAttr(default=None)
+    _handlers: Dict[type, Callable[[SQSModel], Any]] = PrivateAttr(default_factory=dict)
+    _process_handlers: Set[type] = PrivateAttr(default_factory=set)
+    _leases: Optional[LeaseManager] = PrivateAttr(default=None)
+    _json: Optional[JSONBackend] = PrivateAttr(default=None)
+    _decoders: Dict[type, ModelDecoder] = PrivateAttr(default_factory=dict)
+    _codecs: Dict[str, Codec] = PrivateAttr(default_factory=dict)
+    _model_codecs: Dict[type, str] = PrivateAttr(default_factory=dict)
+    _group_ids: Dict[type, IdSource] = PrivateAttr(default_factory=dict)
+    _deduplication_ids: Dict[type, IdSource] = PrivateAttr(default_factory=dict)
+    _json_codec: Optional[JSONCodec] = PrivateAttr(default=None)
+    _demux: Optional[Demultiplexer] = PrivateAttr(default=None)
+    _attribute_cache: Dict[Tuple[str, ...], Tuple[float, "asyncio.Future[Dict[str, str]]"]] = PrivateAttr(
+        default_factory=dict
+    )
+
     def __init__(
         self,
         queue_url: str,
@@ -50,26 +212,101 @@ class SQSQueue(_AbstractQueue):
         max_messages: conint(gt=0, le=10) = 1,  # type: ignore
         endpoint_url: AnyUrl = None,
         use_ssl: bool = True,
+        max_pool_connections: conint(gt=0) = 10,  # type: ignore
+        keepalive_timeout: Optional[float] = None,
+        send_linger_seconds: Optional[float] = None,
+        ack_linger_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[int] = None,
+        heartbeat_max_lifetime: Optional[float] = None,
+        json_backend: str = "json",
+        codec: str = "json",
+        compression: Optional[str] = None,
+        compression_threshold: int = 4096,
+        blob_store: Optional[BlobStore] = None,
+        claim_check_threshold: int = DEFAULT_CLAIM_CHECK_THRESHOLD,
+        claim_check_delete: bool = True,
+        trusted: bool = False,
+        demux_max_messages: int = 100,
+        decode_offload_threshold: Optional[int] = None,
+        decode_executor: Optional[Executor] = None,
+        transport: Optional[Transport] = None,
+        metrics: Optional[Metrics] = None,
+        track_latency: bool = False,
         **data: Any,
     ):
-        """Args:
-
-        queue_url (str): Url of the AWS SQS queue (or compatible) aws_region (str, optional): The AWS region for this
-        queue. Defaults to "us-east-1". session (AioSession, optional): An aiobotocore session. Defaults to None. If
-        none is provided, a new one will be created. visibility_timeout (int, optional): The duration (in seconds) that
-        the received messages are hidden from subsequent retrieve requests after being retrieved by a from_sqs request.
-        Defaults to None. wait_time_seconds (conint, optional): The duration (in seconds) for which the call waits for
-        a message to arrive in the queue before returning. If a message is available, the call returns sooner than
-        WaitTimeSeconds . If no messages are available and the wait time expires, the call returns successfully with an
-        empty list of messages. Defaults to None. Greater than0, less than or equal to 20 max_messages (conint,
-        optional):  The maximum number of messages to return. Amazon SQS never returns more messages than this value
-        (however, fewer messages might be returned).. Defaults to 1. Greater than 0, less than 10 endpoint_url (AnyUrl,
-        optional): a custom endpoint to use with aiobotocore. Useful for testing with localstack. Defaults to None.
-        use_ssl (bool, optional): Whether or not to use SSL for the aws client. Useful for testing with localstack.
-        Defaults to True.
+        """
+        Args:
+            queue_url (str): Url of the AWS SQS queue (or compatible)
+            aws_region (str, optional): The AWS region for this queue. Defaults to "us-east-1".
+            session (AioSession, optional): An aiobotocore session. Defaults to None. If none is provided, a new one
+                will be created.
+            visibility_timeout (int, optional): The duration (in seconds) that the received messages are hidden from
+                subsequent retrieve requests after being retrieved by a from_sqs request. Defaults to None.
+            wait_time_seconds (conint, optional): The duration (in seconds) for which the call waits for a message to
+                arrive in the queue before returning. If a message is available, the call returns sooner than
+                WaitTimeSeconds. If no messages are available and the wait time expires, the call returns
+                successfully with an empty list of messages. Greater than 0, less than or equal to 20. Defaults to
+                None.
+            max_messages (conint, optional): The maximum number of messages to return. Amazon SQS never returns more
+                messages than this value (however, fewer messages might be returned). Greater than 0, less than 10.
+                Defaults to 1.
+            endpoint_url (AnyUrl, optional): a custom endpoint to use with aiobotocore. Useful for testing with
+                localstack. Defaults to None.
+            use_ssl (bool, optional): Whether or not to use SSL for the aws client. Useful for testing with
+                localstack. Defaults to True.
+            max_pool_connections (conint, optional): The maximum number of connections in the client's connection
+                pool. Defaults to 10.
+            keepalive_timeout (float, optional): How long (in seconds) an idle pooled connection is kept alive.
+                Defaults to None, which uses the aiohttp default.
+            send_linger_seconds (float, optional): When set, to_sqs calls wait up to this many seconds to be sent
+                together with SendMessageBatch. Defaults to None, which sends every message on its own.
+            ack_linger_seconds (float, optional): When set, delete_from_queue calls wait up to this many seconds to be
+                deleted together with DeleteMessageBatch. Defaults to None, which deletes every message on its own.
+            heartbeat_seconds (int, optional): When set, received messages have their visibility timeout extended by
+                this many seconds shortly before it runs out, until they are deleted or released. Defaults to None.
+            heartbeat_max_lifetime (float, optional): The longest time (in seconds) the heartbeat keeps a message
+                invisible. Defaults to None, which has no limit.
+            json_backend (str, optional): The JSON library used for message bodies, one of "json", "orjson" or
+                "ujson". Defaults to "json".
+            codec (str, optional): The default codec of message bodies, one of "json", "msgpack" or "cbor". Defaults
+                to "json".
+            compression (str, optional): Compress large message bodies with "zlib", "zstd" or "lz4". Bodies are only
+                sent compressed if that makes them smaller. Defaults to None, which never compresses.
+            compression_threshold (int, optional): The shortest body (in characters) that is compressed. Defaults to
+                4096.
+            blob_store (BlobStore, optional): Offload message bodies larger than claim_check_threshold to this store
+                and only send their key. Consumers need the same store to read them. Defaults to None, which never
+                offloads.
+            claim_check_threshold (int, optional): The largest message (in bytes) sent without offloading its body.
+                Defaults to 248 KiB.
+            claim_check_delete (bool, optional): Whether deleting a message also deletes its offloaded body. Defaults
+                to True.
+            trusted (bool, optional): Stamp sent messages with a fingerprint of their model's schema, and skip
+                validating received messages whose fingerprint matches the registered model. Only fields that JSON
+                cannot represent, like datetimes or nested models, are still validated. Only set it when every
+                producer of the queue is trusted. Defaults to False.
+            demux_max_messages (int, optional): The most messages of other models that from_sqs(model_class=...)
+                keeps to hand to the next call for their model. Defaults to 100, 0 keeps none.
+            decode_offload_threshold (int, optional): Decode and validate received bodies of at least this many
+                characters in decode_executor, off the event loop. Defaults to None, which decodes every body on the
+                loop.
+            decode_executor (Executor, optional): The executor large bodies are decoded in. Defaults to None, which
+                uses the event loop's default thread pool.
+            transport (Transport, optional): How this queue reaches SQS. Defaults to None, which uses aiobotocore
+                with the session and client settings above.
+            metrics (Metrics, optional): Record the latency, size and errors of every SQS call and the decode time of
+                every received message in these metrics, like StatsDMetrics or PrometheusMetrics. Defaults to None,
+                which records nothing.
+            track_latency (bool, optional): Stamp sent messages with their send time and a trace id, and record the
+                dwell time, receive to delete time and end to end latency of received messages in metrics. Dwell times
+                use the producer's clock when it stamped the message, and SentTimestamp otherwise. Defaults to False.
+
+        Raises:
+            ValueError: Raised if json_backend, codec or compression is not known
+            ImportError: Raised if json_backend's, codec's or compression's package is not installed
         """
         if session is None:
-            session = get_session()
+            session = mark_default_session(get_session())
 
         super().__init__(
             queue_url=queue_url,
@@ -80,15 +317,64 @@ class SQSQueue(_AbstractQueue):
             max_messages=max_messages,
             endpoint_url=endpoint_url,
             use_ssl=use_ssl,
+            max_pool_connections=max_pool_connections,
+            keepalive_timeout=keepalive_timeout,
+            send_linger_seconds=send_linger_seconds,
+            ack_linger_seconds=ack_linger_seconds,
+            heartbeat_seconds=heartbeat_seconds,
+            heartbeat_max_lifetime=heartbeat_max_lifetime,
+            json_backend=json_backend,
+            codec=codec,
+            compression=compression,
+            compression_threshold=compression_threshold,
+            blob_store=blob_store,
+            claim_check_threshold=claim_check_threshold,
+            claim_check_delete=claim_check_delete,
+            trusted=trusted,
+            demux_max_messages=demux_max_messages,
+            decode_offload_threshold=decode_offload_threshold,
+            decode_executor=decode_executor,
+            transport=transport,
+            metrics=metrics,
+            track_latency=track_latency,
             **data,
         )
+        self._json = get_json_backend(json_backend)
+        self.get_codec(codec)
+        if compression is not None:
+            get_compressor(compression)
 
-    def register_model(self, model_class: SQSModel):
+    def register_model(
+        self,
+        model_class: SQSModel,
+        codec: Optional[str] = None,
+        group_id: Optional[IdSource] = None,
+        deduplication_id: Optional[IdSource] = None,
+    ):
         """Add a model to this SQS queue.
 
-        A queue can handle multiple models, but only one queue per model.  Args:     model_class (SQSModel): The model
-        class to register
+        A queue can handle multiple models, but only one queue per model.
+
+        Args:
+            model_class (SQSModel): The model class to register
+            codec (str, optional): The codec this model is sent with. Defaults to None, which uses the queue's codec.
+            group_id (str | Callable, optional): Where the MessageGroupId of messages sent to a FIFO queue comes from,
+                the name of a field or a callable that takes the model. Required to send to FIFO queues. Defaults to
+                None.
+            deduplication_id (str | Callable, optional): Where the MessageDeduplicationId comes from, like group_id.
+                Defaults to None, which needs ContentBasedDeduplication enabled on the queue. Required when bodies are
+                offloaded to blob_store.
+
+        Raises:
+            ValueError: Raised if codec is not known, if group_id or deduplication_id is not a field or callable, or
+                if either is set for a queue that is not FIFO
         """
+        if codec is not None:
+            self.get_codec(codec)
+        if (group_id is not None or deduplication_id is not None) and not self.fifo:
+            raise ValueError(f"group_id and deduplication_id can only be set for FIFO queues, not {self.queue_url}")
+        check_id_source(model_class, group_id, "group_id")
+        check_id_source(model_class, deduplication_id, "deduplication_id")
         model_name = model_class.__qualname__.lower()
         if model_name in self.models.keys():
             raise exceptions.ModelAlreadyRegisteredError(
@@ -96,6 +382,175 @@ class SQSQueue(_AbstractQueue):
             )
         model_class._queue = self
         self.models[model_class.__qualname__.lower()] = model_class
+        self._decoders[model_class] = ModelDecoder(model_class)
+        if codec is not None:
+            self._model_codecs[model_class] = codec
+        if group_id is not None:
+            self._group_ids[model_class] = group_id
+        if deduplication_id is not None:
+            self._deduplication_ids[model_class] = deduplication_id
+
+    def _decoder(self, model_class: type) -> ModelDecoder:
+        """The decoder of a model, compiled when the model was registered"""
+        decoder = self._decoders.get(model_class)
+        if decoder is None:
+            decoder = self._decoders[model_class] = ModelDecoder(model_class)
+        return decoder
+
+    @property
+    def json_library(self) -> JSONBackend:
+        """The JSON backend used to encode and decode message bodies, see json_backend"""
+        if self._json is None or self._json.name != self.json_backend:
+            self._json = get_json_backend(self.json_backend)
+        return self._json
+
+    def register_codec(self, codec: Codec) -> None:
+        """Add a custom codec to this queue, usable as the queue's or a model's codec by its name
+
+        Args:
+            codec (Codec): The codec. Its name is sent in a message attribute with every message it encodes
+        """
+        self._codecs[codec.name] = codec
+
+    def get_codec(self, name: str) -> Codec:
+        """Get a codec by name, either registered with register_codec or built in
+
+        Args:
+            name (str): The codec's name
+
+        Raises:
+            ValueError: Raised if there is no codec with that name
+            ImportError: Raised if the codec's package is not installed
+
+        Returns:
+            Codec: the codec
+        """
+        codec = self._codecs.get(name)
+        if codec is not None:
+            return codec
+        if name == JSONCodec.name:
+            if self._json_codec is None or self._json_codec.backend is not self.json_library:
+                self._json_codec = JSONCodec(self.json_library)
+            return self._json_codec
+        return get_codec(name)
+
+    def codec_for(self, model_class: type) -> Codec:
+        """The codec messages of a model are sent with"""
+        return self.get_codec(self._model_codecs.get(model_class, self.codec))
+
+    @property
+    def fifo(self) -> bool:
+        """Whether this is a FIFO queue, from the .fifo suffix of its name"""
+        return is_fifo(self.queue_url)
+
+    def _fifo_ids(self, model: SQSModel) -> Dict[str, str]:
+        """
+        The MessageGroupId and MessageDeduplicationId of a model sent to this queue, see register_model
+
+        Raises:
+            ValueError: Raised if this is a FIFO queue and the model was registered without a group_id
+
+        Returns:
+            dict[str, str]: The ids to add to the send entry, none if this is not a FIFO queue
+        """
+        if not self.fifo:
+            return {}
+        group_id = self._group_ids.get(model.__class__)
+        if group_id is None:
+            raise ValueError(
+                f"{model.__class__.__qualname__} needs a group_id to be sent to the FIFO queue {self.queue_url}"
+            )
+        ids = {"MessageGroupId": resolve_id(group_id, model)}
+        deduplication_id = self._deduplication_ids.get(model.__class__)
+        if deduplication_id is not None:
+            ids["MessageDeduplicationId"] = resolve_id(deduplication_id, model)
+        return ids
+
+    def handler(
+        self, model_class: type, process: bool = False
+    ) -> Callable[[Callable[[SQSModel], Any]], Callable[[SQSModel], Any]]:
+        """Register a handler for a model, used by consume.
+
+        The handler is called with every received message of that model and can be a coroutine function or a plain
+        function. Use it as a decorator::
+
+            @queue.handler(MyModel)
+            async def handle(message: MyModel):
+                ...
+
+        CPU-bound handlers can run in the worker's process pool instead of on the event loop, so they do not hold up
+        polling, deleting and heartbeats. They must be plain functions defined at module level, and get a pickled copy
+        of the message, so they should leave deleting it to the worker::
+
+            @queue.handler(MyModel, process=True)
+            def handle(message: MyModel):
+                ...
+
+        Args:
+            model_class (SQSModel): The registered model class the handler consumes
+            process (bool, optional): Whether the handler runs in the worker's process pool. Defaults to False.
+
+        Raises:
+            NotRegisteredError: Raised if the model is not registered to this queue
+            TypeError: Raised if process is set and the handler is a coroutine function
+        """
+        if self.models.get(model_class.__qualname__.lower()) is not model_class:
+            raise exceptions.NotRegisteredError(
+                f"{model_class.__qualname__} not registered to queue {self.queue_url}"
+            )
+
+        def decorator(func: Callable[[SQSModel], Any]) -> Callable[[SQSModel], Any]:
+            if process and inspect.iscoroutinefunction(func):
+                raise TypeError(f"{func.__qualname__} is a coroutine function and cannot run in a process pool")
+            self._handlers[model_class] = func
+            if process:
+                self._process_handlers.add(model_class)
+            else:
+                self._process_handlers.discard(model_class)
+            return func
+
+        return decorator
+
+    def get_handler(self, model_class: type) -> Optional[Callable[[SQSModel], Any]]:
+        """Get the handler registered for a model class, or None if it has no handler."""
+        return self._handlers.get(model_class)
+
+    def handler_runs_in_process(self, model_class: type) -> bool:
+        """Whether the handler of a model class was registered with process=True"""
+        return model_class in self._process_handlers
+
+    async def consume(
+        self,
+        pollers: int = 1,
+        max_in_flight: int = 10,
+        max_messages: int = 10,
+        wait_time_seconds: int = 20,
+        visibility_timeout: Optional[int] = None,
+        poll_controller: Optional[PollController] = None,
+        process_pool: Optional[Executor] = None,
+        processes: Optional[int] = None,
+        autoscaler: Optional[BacklogScaler] = None,
+        group_lanes: Optional[bool] = None,
+    ) -> None:
+        """Consume this queue with a Worker until the task running it is cancelled.
+
+        Messages are dispatched to the handlers registered with SQSQueue.handler and deleted once their handler
+        returns. Messages whose handler raises are left in the queue for redelivery. See Worker for the arguments.
+        """
+        worker = Worker(
+            self,
+            pollers=pollers,
+            max_in_flight=max_in_flight,
+            max_messages=max_messages,
+            wait_time_seconds=wait_time_seconds,
+            visibility_timeout=visibility_timeout,
+            poll_controller=poll_controller,
+            process_pool=process_pool,
+            processes=processes,
+            autoscaler=autoscaler,
+            group_lanes=group_lanes,
+        )
+        await worker.run()
 
     @property
     def client_kwargs(self) -> Dict[str, Any]:
@@ -107,8 +562,529 @@ class SQSQueue(_AbstractQueue):
         if self.endpoint_url is not None:
             kwargs["endpoint_url"] = self.endpoint_url
 
+        config_kwargs = {"max_pool_connections": self.max_pool_connections}
+        if self.keepalive_timeout is not None:
+            config_kwargs["connector_args"] = {"keepalive_timeout": self.keepalive_timeout}
+        kwargs["config"] = AioConfig(**config_kwargs)
+
         return kwargs
 
+    @property
+    def is_open(self) -> bool:
+        """Whether or not this queue holds a long-lived client, see SQSQueue.open"""
+        return self._client is not None
+
+    async def open(self) -> "SQSQueue":
+        """Open a long-lived client for this queue.
+
+        The client comes from the queue's transport and is used by every call made through this queue and its
+        registered models until the queue is closed. With the default transport it is shared with every other open
+        queue using the same session and client settings. Opening an already open queue does nothing.
+
+        Returns:
+            SQSQueue: this queue, so open can be chained
+        """
+        if self._client is not None:
+            return self
+        self._client, self._client_key = await self._transport.acquire(self)
+        return self
+
+    async def flush(self) -> None:
+        """Send everything waiting in this queue's buffers and wait for it to finish."""
+        for buffer in (self._send_buffer, self._ack_buffer):
+            if buffer is not None:
+                await buffer.flush()
+
+    def buffer_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters for this queue's send and ack buffers, see _BatchBuffer.stats.
+
+        Returns:
+            dict[str, dict[str, Any]]: stats keyed by "send" and "ack", for the buffers that have been used
+        """
+        stats = {}
+        if self._send_buffer is not None:
+            stats["send"] = self._send_buffer.stats()
+        if self._ack_buffer is not None:
+            stats["ack"] = self._ack_buffer.stats()
+        return stats
+
+    @property
+    def leases(self) -> Optional[LeaseManager]:
+        """The heartbeat extending the visibility timeout of received messages, or None if heartbeat_seconds is not
+        set."""
+        if self.heartbeat_seconds is None:
+            return None
+        if self._leases is None or self._leases.loop is not asyncio.get_running_loop():
+            self._leases = LeaseManager(
+                self,
+                extension=self.heartbeat_seconds,
+                max_lifetime=self.heartbeat_max_lifetime,
+            )
+        self._leases.extension = self.heartbeat_seconds
+        self._leases.max_lifetime = self.heartbeat_max_lifetime
+        return self._leases
+
+    @property
+    def demux(self) -> Demultiplexer:
+        """The messages of other models parked by from_sqs(model_class=...), see demux_max_messages"""
+        if self._demux is None:
+            self._demux = Demultiplexer(self.demux_max_messages)
+        self._demux.max_messages = self.demux_max_messages
+        return self._demux
+
+    async def release_parked(self, model_class: Optional[type] = None) -> BatchResult:
+        """Make parked messages visible to other consumers right away, see demux_max_messages
+
+        Args:
+            model_class (SQSModel, optional): Only release messages of this model. Defaults to None, which releases
+                every parked message.
+
+        Returns:
+            BatchResult: The messages that were released and the entries that failed
+        """
+        if self._demux is None or not len(self._demux):
+            return BatchResult(successful=[], failed=[])
+        return await self.change_visibility_batch(self._demux.drain(model_class), visibility_timeout=0)
+
+    def _untrack(self, model: SQSModel) -> None:
+        """Stop the heartbeat for a model, if it is being extended."""
+        if self._leases is not None:
+            self._leases.untrack(model)
+
+    async def close(self) -> None:
+        """Flush this queue's buffers, stop its heartbeat and release its long-lived client.
+
+        Parked messages of other models are released, see release_parked. The client is closed once no open queue is
+        using it.
+        """
+        try:
+            await self.release_parked()
+        except Exception:
+            logger.exception("Releasing the parked messages of %s failed", self.queue_url)
+        await self.flush()
+        if self._leases is not None:
+            await self._leases.stop()
+            self._leases = None
+        if self._client is None:
+            return
+        key = self._client_key
+        self._client = None
+        self._client_key = None
+        await self._transport.release(key)
+
+    async def __aenter__(self) -> "SQSQueue":
+        return await self.open()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator[Any]:
+        """Get a SQS client from this queue's transport for a call against this queue.
+
+        Yields the long-lived client if the queue is open, otherwise a client that is created for this call and closed
+        afterwards. With metrics set, the client records every call in them.
+        """
+        if self._client is not None:
+            yield self.__instrument(self._client)
+            return
+        async with self._transport.client(self) as client:
+            yield self.__instrument(client)
+
+    def __instrument(self, client: Any) -> Any:
+        if self.metrics is None:
+            return client
+        return InstrumentedClient(client, self.metrics, self._metric_tags)
+
+    @property
+    def _metric_tags(self) -> Dict[str, str]:
+        """The tags of every metric recorded for this queue"""
+        return {"queue": self.queue_url.rstrip("/").rsplit("/", 1)[-1]}
+
+    @property
+    def _transport(self) -> Transport:
+        return self.transport if self.transport is not None else DEFAULT_TRANSPORT
+
+    def __check_registered(self, model: SQSModel, envelopes: bool = False) -> None:
+        """
+        Make sure a model instance belongs to a model registered with this queue
+
+        Args:
+            model (SQSModel): The model instance
+            envelopes (bool, optional): Whether envelopes received from this queue are accepted too. Defaults to False.
+
+        Raises:
+            NotRegisteredError: Raised if the model is not registered to this queue
+        """
+        if envelopes and isinstance(model, SQSEnvelope) and model.queue is self:
+            return
+        if self.models.get(model.__class__.__qualname__.lower()) is not model.__class__:
+            raise exceptions.NotRegisteredError(
+                f"{model.__class__.__qualname__} not registered to queue {self.queue_url}"
+            )
+
+    async def send_batch(
+        self,
+        models: Iterable[SQSModel],
+        wait_time_in_seconds: int = None,
+        retries: int = 2,
+        max_concurrency: int = 10,
+    ) -> BatchResult:
+        """Send many models to this queue using SendMessageBatch.
+
+        Models are packed into requests of at most 10 entries and 256 KiB, and the requests are sent concurrently.
+        Each model that is sent has its message_id set. Entries that fail are retried on their own, unless SQS reports
+        the failure as the sender's fault.
+
+        On FIFO queues the requests are sent one at a time, in order. Retried entries are sent after the rest, so pass
+        retries=0 when a failed entry must not end up behind later messages of its group.
+
+        Args:
+            models (Iterable[SQSModel]): The models to send. Every model must be registered to this queue
+            wait_time_in_seconds (int, optional): The length of time, in seconds, for which to delay the messages.
+                Valid values: 0 to 900. Defaults to None, which uses the queue's default.
+            retries (int, optional): How many times to retry entries that failed. Defaults to 2.
+            max_concurrency (int, optional): The maximum number of batch requests in flight. Defaults to 10.
+
+        Raises:
+            NotRegisteredError: Raised if a model is not registered to this queue
+            ValueError: Raised if a model's body is offloaded to blob_store on a FIFO queue and the model was
+                registered without a deduplication_id
+
+        Returns:
+            BatchResult: The models that were sent and the entries that failed
+        """
+        entries = []
+        for model in models:
+            self.__check_registered(model)
+            entries.append((model._send_entry(wait_time_in_seconds=wait_time_in_seconds), model))
+        if self.blob_store is not None:
+            await asyncio.gather(*(self._claim_check(entry) for entry, _ in entries))
+
+        successful, failed = await run_batches(
+            self,
+            "send_message_batch",
+            entries,
+            retries=retries,
+            max_concurrency=1 if self.fifo else max_concurrency,
+        )
+        for model, result in successful:
+            model.message_id = result["MessageId"]
+        return BatchResult(successful=[model for model, _ in successful], failed=failed)
+
+    async def delete_batch(
+        self,
+        models: Iterable[SQSModel],
+        retries: int = 2,
+        max_concurrency: int = 10,
+    ) -> BatchResult:
+        """Delete many received models from this queue using DeleteMessageBatch.
+
+        Receipt handles are grouped into requests of at most 10 entries, and the requests are sent concurrently. Only
+        the models that were deleted have deleted set to True. Models that were never received or were already deleted
+        are reported as failures with the code MessageNotInQueue.
+
+        Args:
+            models (Iterable[SQSModel]): The models to delete. Every model must be registered to this queue
+            retries (int, optional): How many times to retry entries that failed. Defaults to 2.
+            max_concurrency (int, optional): The maximum number of batch requests in flight. Defaults to 10.
+
+        Raises:
+            NotRegisteredError: Raised if a model is not registered to this queue
+
+        Returns:
+            BatchResult: The models that were deleted and the entries that failed
+        """
+        entries = []
+        not_in_queue = []
+        for model in models:
+            self.__check_registered(model, envelopes=True)
+            if model.receipt_handle is None or model.deleted:
+                not_in_queue.append(
+                    BatchFailure(
+                        model=model,
+                        code="MessageNotInQueue",
+                        message=f"{str(model)} was not received from SQS or has already been deleted",
+                        sender_fault=True,
+                    )
+                )
+                continue
+            entries.append(({"ReceiptHandle": model.receipt_handle}, model))
+
+        successful, failed = await run_batches(
+            self,
+            "delete_message_batch",
+            entries,
+            retries=retries,
+            max_concurrency=max_concurrency,
+        )
+        for model, _ in successful:
+            model.deleted = True
+        self.__observe_deleted([model for model, _ in successful])
+        await self._delete_claim_checks([model for model, _ in successful])
+        return BatchResult(successful=[model for model, _ in successful], failed=not_in_queue + failed)
+
+    async def _buffered_send(self, model: SQSModel, wait_time_in_seconds: int = None) -> str:
+        """
+        Send a model through this queue's send buffer, see send_linger_seconds
+
+        Args:
+            model (SQSModel): The model to send
+            wait_time_in_seconds (int, optional): The length of time, in seconds, for which to delay the message.
+
+        Raises:
+            BatchEntryError: Raised if SQS rejected the message
+            ValueError: Raised if the body is offloaded on a FIFO queue without a deduplication id
+
+        Returns:
+            str: The message id of the sent message
+        """
+        entry = model._send_entry(wait_time_in_seconds=wait_time_in_seconds)
+        await self._claim_check(entry)
+        buffer = _get_buffer(self, "_send_buffer", SendBuffer, self.send_linger_seconds)
+        result = await buffer.submit(entry, model)
+        return result["MessageId"]
+
+    async def _delete_message(self, model: SQSModel) -> None:
+        """
+        Delete a received model or envelope, see SQSModel.delete_from_queue
+
+        Raises:
+            BatchEntryError: Raised if the delete was buffered and SQS could not delete the message
+        """
+        if self.ack_linger_seconds is not None:
+            await self._buffered_delete(model)
+        else:
+            async with self.client() as client:
+                await client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=model.receipt_handle)
+        model.deleted = True
+        self.__observe_deleted([model])
+        if model._claim_check is not None:
+            await self._delete_claim_checks([model])
+
+    async def _release_message(self, model: SQSModel, visibility_timeout: int = 0) -> None:
+        """Stop the heartbeat for a received model or envelope and set its visibility timeout, see SQSModel.release"""
+        self._untrack(model)
+        async with self.client() as client:
+            await client.change_message_visibility(
+                QueueUrl=self.queue_url,
+                ReceiptHandle=model.receipt_handle,
+                VisibilityTimeout=visibility_timeout,
+            )
+        model._visibility_deadline = time.monotonic() + visibility_timeout
+
+    async def _claim_check(self, entry: Dict[str, Any]) -> None:
+        """
+        Offload a send entry's body to the blob store if the entry is larger than claim_check_threshold. The entry's
+        body is replaced by the blob's key, which is also set as the claim check message attribute.
+
+        Blobs of messages that then fail to send are not deleted, use the store's own expiry (like an S3 lifecycle
+        rule) to clean them up.
+
+        On FIFO queues the entry needs an explicit deduplication id, as content-based deduplication would only see the
+        blob's random key.
+
+        Args:
+            entry (dict[str, Any]): The send entry, changed in place
+
+        Raises:
+            ValueError: Raised if the body is offloaded on a FIFO queue and the entry has no deduplication id
+        """
+        if self.blob_store is None or entry_size(entry) <= self.claim_check_threshold:
+            return
+        if self.fifo and "MessageDeduplicationId" not in entry:
+            raise ValueError(
+                f"Offloaded bodies on the FIFO queue {self.queue_url} need a deduplication_id, see register_model"
+            )
+        key = new_claim_check_key()
+        await self.blob_store.put(key, entry["MessageBody"].encode("utf-8"))
+        entry["MessageBody"] = key
+        entry.setdefault("MessageAttributes", {})[CLAIM_CHECK_ATTRIBUTE] = {"DataType": "String", "StringValue": key}
+
+    async def _delete_claim_checks(self, models: List[SQSModel]) -> None:
+        """Delete the offloaded bodies of deleted models from the blob store, see claim_check_delete"""
+        if self.blob_store is None or not self.claim_check_delete:
+            return
+        keys = [model._claim_check for model in models if model._claim_check is not None]
+        if not keys:
+            return
+        results = await asyncio.gather(*(self.blob_store.delete(key) for key in keys), return_exceptions=True)
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                logger.warning("Deleting claim check %s from the blob store failed: %s", key, result)
+
+    async def _buffered_delete(self, model: SQSModel) -> None:
+        """
+        Delete a model through this queue's ack buffer, see ack_linger_seconds
+
+        The buffer is flushed before the model's visibility timeout runs out.
+
+        Args:
+            model (SQSModel): The model to delete
+
+        Raises:
+            BatchEntryError: Raised if SQS could not delete the message
+        """
+        buffer = _get_buffer(self, "_ack_buffer", AckBuffer, self.ack_linger_seconds)
+        await buffer.submit(
+            {"ReceiptHandle": model.receipt_handle},
+            model,
+            deadline=model._visibility_deadline,
+        )
+
+    async def get_queue_attributes(
+        self, attribute_names: Optional[List[str]] = None, max_age: float = 0
+    ) -> Dict[str, str]:
+        """Get this queue's attributes, like ApproximateNumberOfMessages, using GetQueueAttributes.
+
+        Concurrent calls for the same attributes share one request, and with max_age set the result is reused until it
+        is that old. Failed requests are not reused.
+
+        Args:
+            attribute_names (list[str], optional): The attributes to get. Defaults to None, which gets all of them.
+            max_age (float, optional): The oldest result (in seconds) to reuse. Defaults to 0, which makes a new
+                request unless one is in flight.
+
+        Returns:
+            dict[str, str]: The attributes by name
+        """
+        key = tuple(attribute_names or ["All"])
+        cached = self._attribute_cache.get(key)
+        if cached is not None:
+            fetched_at, future = cached
+            if not future.done():
+                return dict(await asyncio.shield(future))
+            if max_age > 0 and time.monotonic() - fetched_at <= max_age:
+                return dict(future.result())
+
+        future = asyncio.get_running_loop().create_future()
+        self._attribute_cache[key] = (time.monotonic(), future)
+        try:
+            async with self.client() as client:
+                response = await client.get_queue_attributes(QueueUrl=self.queue_url, AttributeNames=list(key))
+        except asyncio.CancelledError:
+            self.__drop_attributes(key, future)
+            future.cancel()
+            raise
+        except Exception as exc:
+            self.__drop_attributes(key, future)
+            future.set_exception(exc)
+            # Waiters get the exception, but nobody has to retrieve it
+            future.exception()
+            raise
+        attributes = response.get("Attributes", {})
+        future.set_result(attributes)
+        return dict(attributes)
+
+    def __drop_attributes(self, key: Tuple[str, ...], future: "asyncio.Future[Dict[str, str]]") -> None:
+        """Forget a failed get_queue_attributes request, unless a newer one replaced it"""
+        cached = self._attribute_cache.get(key)
+        if cached is not None and cached[1] is future:
+            del self._attribute_cache[key]
+
+    async def change_visibility_batch(
+        self,
+        models: Iterable[SQSModel],
+        visibility_timeout: int,
+        retries: int = 2,
+        max_concurrency: int = 10,
+    ) -> BatchResult:
+        """Change the visibility timeout of many received models using ChangeMessageVisibilityBatch.
+
+        A visibility timeout of 0 makes the messages visible to other consumers right away.
+
+        Args:
+            models (Iterable[SQSModel]): The received models. Every model must be registered to this queue
+            visibility_timeout (int): The new visibility timeout, in seconds from now
+            retries (int, optional): How many times to retry entries that failed. Defaults to 2.
+            max_concurrency (int, optional): The maximum number of batch requests in flight. Defaults to 10.
+
+        Raises:
+            NotRegisteredError: Raised if a model is not registered to this queue
+
+        Returns:
+            BatchResult: The models whose visibility changed and the entries that failed
+        """
+        entries = []
+        not_in_queue = []
+        for model in models:
+            self.__check_registered(model, envelopes=True)
+            if model.receipt_handle is None or model.deleted:
+                not_in_queue.append(
+                    BatchFailure(
+                        model=model,
+                        code="MessageNotInQueue",
+                        message=f"{str(model)} was not received from SQS or has already been deleted",
+                        sender_fault=True,
+                    )
+                )
+                continue
+            entries.append(
+                (
+                    {"ReceiptHandle": model.receipt_handle, "VisibilityTimeout": visibility_timeout},
+                    model,
+                )
+            )
+
+        successful, failed = await run_batches(
+            self,
+            "change_message_visibility_batch",
+            entries,
+            retries=retries,
+            max_concurrency=max_concurrency,
+        )
+        deadline = time.monotonic() + visibility_timeout
+        for model, _ in successful:
+            model._visibility_deadline = deadline
+        return BatchResult(successful=[model for model, _ in successful], failed=not_in_queue + failed)
+
+    def stream(
+        self,
+        max_buffer_messages: int = 100,
+        max_buffer_bytes: int = 10 * 1024 * 1024,
+        pollers: int = 1,
+        max_messages: Optional[int] = None,
+        wait_time_seconds: int = 20,
+        visibility_timeout: Optional[int] = None,
+        model_class: Optional[type] = None,
+        poll_controller: Optional[PollController] = None,
+    ) -> MessageStream:
+        """Stream messages from this queue through a prefetch buffer filled by background long-polls.
+
+        Use it as an async context manager so prefetched messages are released when you are done::
+
+            async with queue.stream() as stream:
+                async for message in stream:
+                    ...
+
+        Args:
+            max_buffer_messages (int, optional): The maximum number of prefetched messages. Defaults to 100.
+            max_buffer_bytes (int, optional): The maximum total body size of prefetched messages. Defaults to 10 MiB.
+            pollers (int, optional): The number of concurrent long-poll loops. Defaults to 1.
+            max_messages (int, optional): The maximum number of messages per receive call. Defaults to None, which
+                asks for 10.
+            wait_time_seconds (int, optional): The long-poll wait time of each receive call. Defaults to 20.
+            visibility_timeout (int, optional): The visibility timeout of received messages. Defaults to None, which
+                uses the queue's visibility timeout.
+            model_class (SQSModel, optional): Only yield messages of this model. Defaults to None.
+            poll_controller (PollController, optional): Adapts the number of pollers to the arrival rate. Defaults
+                to None.
+
+        Returns:
+            MessageStream: an async iterator of SQSModels
+        """
+        return MessageStream(
+            self,
+            model_class=model_class,
+            max_buffer_messages=max_buffer_messages,
+            max_buffer_bytes=max_buffer_bytes,
+            pollers=pollers,
+            max_messages=max_messages if max_messages is not None else 10,
+            wait_time_seconds=wait_time_seconds,
+            visibility_timeout=visibility_timeout,
+            poll_controller=poll_controller,
+        )
+
     def __recv_kwargs(
         self,
         max_messages: Optional[int] = None,
@@ -137,6 +1113,14 @@ class SQSQueue(_AbstractQueue):
                 # max wait time is 20 seconds
                 recv_kwargs["WaitTimeSeconds"] = 20
 
+        recv_kwargs["MessageAttributeNames"] = [MESSAGE_ATTRIBUTE_PREFIX + "*"]
+        attribute_names = []
+        if self.track_latency:
+            attribute_names.extend(latency.LATENCY_SYSTEM_ATTRIBUTES)
+        if self.fifo:
+            attribute_names.extend(FIFO_SYSTEM_ATTRIBUTES)
+        if attribute_names:
+            recv_kwargs["AttributeNames"] = attribute_names
         recv_kwargs["QueueUrl"] = self.queue_url
         return recv_kwargs
 
@@ -147,9 +1131,16 @@ class SQSQueue(_AbstractQueue):
         wait_time_seconds: Optional[int] = None,
         ignore_empty: bool = False,
         ignore_unknown: bool = False,
+        model_class: Optional[type] = None,
+        lazy: bool = False,
     ) -> List[Optional["SQSModel"]]:
         """from_sqs - gets messages from the queue and parses them into pydantic models.
 
+        Messages are routed by their model message attribute before their bodies are fetched or parsed, so messages of
+        unknown models are rejected, and messages of models other than model_class are set aside, without decoding
+        them. Messages set aside are parked for the next call for their model while their visibility timeout lasts, see
+        demux_max_messages. Parked messages are returned before SQS is asked for more.
+
         Args:
             max_messages (int, optional): The maximum number of messages to return. Amazon SQS never returns more
                 messages than this value (however, fewer messages might be returned). Defaults to None.
@@ -164,50 +1155,488 @@ class SQSQueue(_AbstractQueue):
             ignore_unknown (bool, optional): Whether or not to ignore unknown messages. Defaults to False.
                 If true, unknown messages will not raise an InvalidMessageInQueueError and will simply return to the
                 queue after their visibility timeout
+            model_class (SQSModel, optional): Only return messages of this model. Messages of other models are parked,
+                or made visible again if there is no room to park them. Defaults to None, which returns every
+                registered model.
+            lazy (bool, optional): Return SQSEnvelopes that only fetch, parse and validate their body when hydrated.
+                Messages without a model attribute cannot be filtered by model_class before they are hydrated.
+                Defaults to False.
         Raises:
             exceptions.MsgNotFoundError: If no messages are found in the queue
             exceptions.InvalidMessageInQueueError: If an unknown message is found in the queue.
 
         Returns:
-            list[SQSModel]: A list of SQSModels from the queue
+            list[SQSModel]: A list of SQSModels from the queue, or SQSEnvelopes if lazy is set
         """
+        demux = self.demux if self.demux_max_messages else None
+        to_return = []
+        if demux is not None and len(demux):
+            wanted = max_messages or self.max_messages or 1
+            to_return = await self.__take_parked(demux, model_class, wanted, ignore_unknown, lazy)
+            if len(to_return) >= wanted:
+                return self.__hand_out(to_return)
+            max_messages = wanted - len(to_return)
+            if to_return:
+                wait_time_seconds = 0
+
         recv_kwargs = self.__recv_kwargs(
             max_messages=max_messages,
             visibility_timeout=visibility_timeout,
             wait_time_seconds=wait_time_seconds,
         )
 
-        to_return = []
+        queue_visibility_timeout = await self.__visibility_timeout(recv_kwargs, model_class)
+        received_at = time.monotonic()
+        visibility_deadline = received_at + queue_visibility_timeout
+        messages = await self.__receive_batch(recv_kwargs, ignore_empty or bool(to_return))
+        received_time = time.time() if self.track_latency else None
+
+        routed, others = self.__route(messages, model_class, ignore_unknown)
+        set_aside = []
+        for msg, target in others:
+            envelope = SQSEnvelope(self, msg, target, received_at, visibility_deadline, _claim_check_key(msg))
+            set_aside.append(self.__record_latency(envelope, received_time))
 
+        if lazy:
+            for msg, target in routed:
+                envelope = SQSEnvelope(self, msg, target, received_at, visibility_deadline, _claim_check_key(msg))
+                to_return.append(self.__record_latency(envelope, received_time))
+        else:
+            models, others_decoded = await self.__decode_received(
+                routed, model_class, ignore_unknown, (received_at, visibility_deadline, received_time)
+            )
+            to_return.extend(models)
+            set_aside.extend(others_decoded)
+
+        await self.__route_demux(demux, set_aside)
+        return self.__hand_out(to_return)
+
+    async def __decode_received(
+        self,
+        routed: List[Tuple[Dict[str, Any], Optional[type]]],
+        model_class: Optional[type],
+        ignore_unknown: bool,
+        receipt: Tuple[float, float, Optional[float]],
+    ) -> Tuple[List["SQSModel"], List[SQSEnvelope]]:
+        """Fetch the claim checks of and decode messages received by from_sqs
+
+        Args:
+            receipt (tuple[float, float, float | None]): The monotonic time the messages were received at, the
+                monotonic time their visibility timeout runs out and the time.time() they were received at if
+                track_latency is set
+
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if a message cannot be decoded and ignore_unknown is False
+
+        Returns:
+            tuple[list[SQSModel], list[SQSEnvelope]]: The models of model_class, and envelopes holding the models of
+                other models
+        """
+        claim_checks = await self.__fetch_claim_checks([msg for msg, _ in routed])
+        built = await self.__build_models(routed, claim_checks)
+        models = []
+        others = []
+        for (msg, _), model in zip(routed, built):
+            if isinstance(model, exceptions.InvalidMessageInQueueError):
+                if ignore_unknown:
+                    continue
+                raise model
+            model = self.__attach_lease_state(model, *receipt)
+            if model_class is not None and not isinstance(model, model_class):
+                others.append(self.__decoded_envelope(msg, model))
+            else:
+                models.append(model)
+        return models, others
+
+    async def __receive_batch(self, recv_kwargs: Dict[str, Any], ignore_empty: bool) -> List[Dict[str, Any]]:
+        """Receive messages for from_sqs
+
+        Raises:
+            exceptions.MsgNotFoundError: Raised if no messages were received and ignore_empty is False
+        """
         try:
-            messages = await self._get_messages(recv_kwargs)
+            return await self._get_messages(recv_kwargs)
         except exceptions.MsgNotFoundError as exc:
             if ignore_empty:
-                messages = []
-            else:
-                raise exc
+                return []
+            raise exc
 
-        for msg in messages:
+    @staticmethod
+    def __record_latency(received: Any, received_time: Optional[float]) -> Any:
+        """Set the dwell time of a received model or envelope, if track_latency is set"""
+        if received_time is not None:
+            received._dwell_seconds = latency.dwell_seconds(received.message_sent_at, received_time)
+        return received
+
+    def __attach_lease_state(
+        self, model: "SQSModel", received_at: float, visibility_deadline: float, received_time: Optional[float]
+    ) -> "SQSModel":
+        """Set when a decoded model was received and when its visibility timeout runs out"""
+        model._received_at = received_at
+        model._visibility_deadline = visibility_deadline
+        return self.__record_latency(model, received_time)
+
+    def __decoded_envelope(self, msg: Dict[str, Any], model: "SQSModel") -> SQSEnvelope:
+        """An envelope holding a model decoded by from_sqs that was not of the model_class asked for"""
+        envelope = SQSEnvelope(self, msg, model.__class__, model._received_at, model._visibility_deadline)
+        envelope._model = model
+        envelope._dwell_seconds = model._dwell_seconds
+        return envelope
+
+    async def __route_demux(self, demux: Optional[Demultiplexer], envelopes: List[SQSEnvelope]) -> None:
+        """Park messages from_sqs set aside for the next call for their model, see demux_max_messages, and make the
+        ones that do not fit visible again"""
+        if demux is None:
+            return
+        overflow = [envelope for envelope in envelopes if not demux.park(envelope, envelope.model_class)]
+        if overflow:
+            await self.change_visibility_batch(overflow, visibility_timeout=0)
+
+    def __hand_out(self, received: List[Any]) -> List[Any]:
+        """Start the heartbeat and record the dwell time of the messages from_sqs returns"""
+        self.__track(received)
+        self.__observe_received(received)
+        return received
+
+    async def __visibility_timeout(self, recv_kwargs: Dict[str, Any], model_class: Optional[type]) -> int:
+        """The visibility timeout of a receive call, used for the deadline of the received messages
+
+        Without one in the call, the heartbeat, the ack buffer and parked messages need the queue's own visibility
+        timeout, which is read with GetQueueAttributes and cached for VISIBILITY_TIMEOUT_MAX_AGE seconds. Otherwise
+        the deadline is not used and SQS's default is assumed.
+        """
+        visibility_timeout = recv_kwargs.get("VisibilityTimeout")
+        if visibility_timeout is not None:
+            return visibility_timeout
+        parks = model_class is not None and self.demux_max_messages > 0
+        if self.heartbeat_seconds is None and self.ack_linger_seconds is None and not parks:
+            return DEFAULT_VISIBILITY_TIMEOUT
+        attributes = await self.get_queue_attributes(["VisibilityTimeout"], max_age=VISIBILITY_TIMEOUT_MAX_AGE)
+        return int(attributes.get("VisibilityTimeout", DEFAULT_VISIBILITY_TIMEOUT))
+
+    async def __take_parked(
+        self,
+        demux: Demultiplexer,
+        model_class: Optional[type],
+        count: int,
+        ignore_unknown: bool,
+        lazy: bool,
+    ) -> List[Any]:
+        """Take parked messages for from_sqs, decoding them unless lazy is set
+
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if a parked message cannot be decoded and ignore_unknown is
+                False
+        """
+        taken = []
+        for envelope in demux.take(model_class, count):
+            if lazy:
+                taken.append(envelope)
+                continue
             try:
-                this_object = json.loads(msg["Body"])
-                to_return.append(
-                    self.__message_to_object(
-                        message=this_object,
-                        message_id=msg["MessageId"],
-                        receipt_handle=msg["ReceiptHandle"],
-                        attributes=msg.get("Attributes", None),
-                    )
-                )
-            except json.JSONDecodeError as exc:
-                if ignore_unknown:
-                    continue
-                raise exceptions.InvalidMessageInQueueError(f"Message {msg['MessageId']} is not valid JSON") from exc
+                taken.append(await envelope.hydrate())
             except exceptions.InvalidMessageInQueueError as exc:
                 if ignore_unknown:
                     continue
                 raise exc
+        return taken
+
+    def __track(self, received: List[Any]) -> None:
+        """Start the heartbeat for messages returned by from_sqs, if heartbeat_seconds is set"""
+        leases = self.leases
+        if leases is None:
+            return
+        for model in received:
+            leases.track(model._model if isinstance(model, SQSEnvelope) and model.hydrated else model)
+
+    @staticmethod
+    def __model_name(received: Any) -> str:
+        """The name of a received model's or envelope's model, for metric tags"""
+        if isinstance(received, SQSEnvelope):
+            if received.model_class is None:
+                return "unknown"
+            return received.model_class.__qualname__
+        return received.__class__.__qualname__
+
+    def __observe_received(self, received: List[Any]) -> None:
+        """Record the dwell time of messages returned by from_sqs, if track_latency and metrics are set"""
+        metrics = self.metrics
+        if metrics is None or not self.track_latency:
+            return
+        tags = self._metric_tags
+        for model in received:
+            if model.message_dwell_seconds is not None:
+                model_tags = dict(tags, model=self.__model_name(model))
+                metrics.observe(DWELL_SECONDS, model.message_dwell_seconds, tags=model_tags)
+
+    def __observe_deleted(self, deleted: List[Any]) -> None:
+        """Record the receive to delete time and end to end latency of deleted messages, if track_latency and metrics
+        are set"""
+        metrics = self.metrics
+        if metrics is None or not self.track_latency:
+            return
+        now = time.monotonic()
+        tags = self._metric_tags
+        for model in deleted:
+            if model._received_at is None:
+                continue
+            model_tags = dict(tags, model=self.__model_name(model))
+            ack_seconds = now - model._received_at
+            metrics.observe(ACK_SECONDS, ack_seconds, tags=model_tags)
+            if model.message_dwell_seconds is not None:
+                metrics.observe(END_TO_END_SECONDS, model.message_dwell_seconds + ack_seconds, tags=model_tags)
+
+    async def __build_models(
+        self,
+        routed: List[Tuple[Dict[str, Any], Optional[type]]],
+        claim_checks: Dict[str, Any],
+    ) -> List[Any]:
+        """Decode routed messages into their models, see decode_offload_threshold
+
+        Large bodies are decoded together in decode_executor while the small ones are decoded on the loop.
+
+        Returns:
+            list[SQSModel | InvalidMessageInQueueError]: The model of every message, in order, or the error decoding it
+        """
+        json_codec = self.get_codec(JSONCodec.name)
+        offloaded = self.__offloaded(routed, claim_checks)
+
+        metrics = self.metrics
+        tags = self._metric_tags if metrics is not None else {}
+
+        def build(indexes: Iterable[int]) -> List[Any]:
+            built = []
+            for index in indexes:
+                msg, target = routed[index]
+                start = time.perf_counter()
+                try:
+                    model = self.__build_model(msg, target, claim_checks, json_codec)
+                except exceptions.InvalidMessageInQueueError as exc:
+                    if metrics is not None:
+                        model_name = target.__qualname__ if target is not None else "unknown"
+                        metrics.increment(DECODE_ERRORS, tags=dict(tags, model=model_name))
+                    built.append(exc)
+                    continue
+                if metrics is not None:
+                    model_tags = dict(tags, model=model.__class__.__qualname__)
+                    metrics.observe(DECODE_SECONDS, time.perf_counter() - start, tags=model_tags)
+                built.append(model)
+            return built
+
+        if not offloaded:
+            return build(range(len(routed)))
+        future = asyncio.get_running_loop().run_in_executor(self.decode_executor, build, offloaded)
+        skip = set(offloaded)
+        inline = [index for index in range(len(routed)) if index not in skip]
+        results: List[Any] = [None] * len(routed)
+        for index, model in zip(inline, build(inline)):
+            results[index] = model
+        for index, model in zip(offloaded, await future):
+            results[index] = model
+        return results
+
+    def __offloaded(
+        self, routed: List[Tuple[Dict[str, Any], Optional[type]]], claim_checks: Dict[str, Any]
+    ) -> List[int]:
+        """The indexes of the routed messages large enough to be decoded in decode_executor"""
+        threshold = self.decode_offload_threshold
+        if threshold is None:
+            return []
+        return [index for index, (msg, _) in enumerate(routed) if self.__body_size(msg, claim_checks) >= threshold]
+
+    @staticmethod
+    def __body_size(msg: Dict[str, Any], claim_checks: Dict[str, Any]) -> int:
+        """The size of a received message's body, or of its offloaded body"""
+        if claim_checks:
+            claim_check = _claim_check_key(msg)
+            if claim_check is not None and isinstance(claim_checks[claim_check], bytes):
+                return len(claim_checks[claim_check])
+        return len(msg["Body"])
+
+    def __build_model(
+        self,
+        msg: Dict[str, Any],
+        model_class: Optional[type],
+        claim_checks: Dict[str, Any],
+        json_codec: Codec,
+    ) -> SQSModel:
+        """Decode a received message into its model
+
+        Args:
+            msg (dict[str, Any]): The received message
+            model_class (SQSModel, optional): The model the message was routed to, None to route it by its body
+            claim_checks (dict[str, Any]): The offloaded bodies fetched by __fetch_claim_checks
+            json_codec (Codec): The codec of messages without a codec attribute
+
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if the message cannot be decoded
+
+        Returns:
+            SQSModel: The model
+        """
+        body = msg["Body"]
+        claim_check = None
+        if claim_checks:
+            claim_check = _claim_check_key(msg)
+            if claim_check is not None:
+                body = self.__claimed_body(msg, claim_checks[claim_check])
+        fingerprint = None
+        if self.trusted:
+            fingerprint_attribute = msg.get("MessageAttributes", {}).get(FINGERPRINT_ATTRIBUTE)
+            if fingerprint_attribute is not None:
+                fingerprint = fingerprint_attribute.get("StringValue")
+        model = self.__message_to_object(
+            message=self.__decode_body(msg, body, json_codec),
+            message_id=msg["MessageId"],
+            receipt_handle=msg["ReceiptHandle"],
+            attributes=msg.get("Attributes", None),
+            model_class=model_class,
+            fingerprint=fingerprint,
+        )
+        model._body_size = len(body)
+        model._claim_check = claim_check
+        model._sent_at = latency.sent_at(msg)
+        model._trace_id = latency.trace_id(msg)
+        return model
+
+    async def _hydrate(self, envelope: SQSEnvelope) -> SQSModel:
+        """
+        Decode an envelope from from_sqs(lazy=True) into its model, see SQSEnvelope.hydrate
+
+        The model takes over the envelope's visibility deadline and heartbeat.
+
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if the message cannot be decoded
+        """
+        msg = envelope._message
+        claim_checks = await self.__fetch_claim_checks([msg])
+        model = (await self.__build_models([(msg, envelope.model_class)], claim_checks))[0]
+        if isinstance(model, exceptions.InvalidMessageInQueueError):
+            raise model
+        model._received_at = envelope._received_at
+        model._visibility_deadline = envelope._visibility_deadline
+        model._dwell_seconds = envelope._dwell_seconds
+        model.deleted = envelope._deleted
+        if self._leases is not None and envelope in self._leases:
+            self._leases.untrack(envelope)
+            self._leases.track(model)
+        return model
+
+    def __route(
+        self,
+        messages: List[Dict[str, Any]],
+        model_class: Optional[type],
+        ignore_unknown: bool,
+    ) -> Tuple[List[Tuple[Dict[str, Any], Optional[type]]], List[Tuple[Dict[str, Any], type]]]:
+        """Find the model of every received message from its model attribute, without looking at its body
+
+        Args:
+            messages (list[dict[str, Any]]): The received messages
+            model_class (SQSModel, optional): Set messages of other registered models aside
+            ignore_unknown (bool): Drop messages of unknown models instead of raising
 
-        return to_return
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if a message is of an unknown model and ignore_unknown is
+                False
+
+        Returns:
+            tuple[list[tuple[dict[str, Any], SQSModel]], list[tuple[dict[str, Any], SQSModel]]]: The messages to
+            decode with their model, and the messages of other models than model_class. The model is None for messages
+            without a model attribute, which are routed by their body
+        """
+        routed = []
+        others = []
+        models = self.models
+        for msg in messages:
+            message_attributes = msg.get("MessageAttributes")
+            model_attribute = message_attributes.get(MODEL_ATTRIBUTE) if message_attributes else None
+            if model_attribute is None:
+                routed.append((msg, None))
+                continue
+            model_name = model_attribute.get("StringValue")
+            target = models.get(model_name)
+            if target is None:
+                if ignore_unknown:
+                    continue
+                raise exceptions.InvalidMessageInQueueError(
+                    f"No model registered to queue {self.queue_url} for model "
+                    + f"type {model_name} from {msg['MessageId']}"
+                )
+            if model_class is not None and not issubclass(target, model_class):
+                others.append((msg, target))
+                continue
+            routed.append((msg, target))
+        return routed, others
+
+    async def __fetch_claim_checks(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fetch the offloaded bodies of received messages from the blob store concurrently
+
+        Returns:
+            dict[str, Any]: The body, or the exception fetching it raised, by claim check key
+        """
+        keys = [key for key in map(_claim_check_key, messages) if key is not None]
+        if not keys:
+            return {}
+        if self.blob_store is None:
+            return {key: None for key in keys}
+        results = await asyncio.gather(*(self.blob_store.get(key) for key in keys), return_exceptions=True)
+        return dict(zip(keys, results))
+
+    def __claimed_body(self, msg: Dict[str, Any], claimed: Any) -> str:
+        """The offloaded body of a message as fetched by __fetch_claim_checks
+
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if the body could not be fetched
+        """
+        if isinstance(claimed, bytes):
+            try:
+                return claimed.decode("utf-8")
+            except UnicodeDecodeError as exc:
+                claimed = exc
+        if claimed is None:
+            raise exceptions.InvalidMessageInQueueError(
+                f"Message {msg['MessageId']} has its body in a blob store, but queue {self.queue_url} has no "
+                + "blob_store"
+            )
+        raise exceptions.InvalidMessageInQueueError(
+            f"The body of message {msg['MessageId']} could not be fetched from the blob store"
+        ) from claimed
+
+    def __decode_body(self, msg: Dict[str, Any], body: str, json_codec: Codec) -> Any:
+        """Decompress and decode a received message's body as its message attributes say
+
+        Raises:
+            exceptions.InvalidMessageInQueueError: Raised if the body cannot be decoded
+        """
+        codec = json_codec
+        message_attributes = msg.get("MessageAttributes")
+        if message_attributes:
+            compression_attribute = message_attributes.get(COMPRESSION_ATTRIBUTE)
+            if compression_attribute is not None:
+                name = compression_attribute.get("StringValue")
+                try:
+                    body = decompress_body(body, get_compressor(name))
+                except (ValueError, ImportError) as exc:
+                    raise exceptions.InvalidMessageInQueueError(
+                        f"Message {msg['MessageId']} cannot be decompressed with {name}"
+                    ) from exc
+
+            codec_attribute = message_attributes.get(CODEC_ATTRIBUTE)
+            if codec_attribute is not None:
+                name = codec_attribute.get("StringValue")
+                try:
+                    codec = self.get_codec(name)
+                except (ValueError, ImportError) as exc:
+                    raise exceptions.InvalidMessageInQueueError(
+                        f"Message {msg['MessageId']} uses codec {name}, which this queue cannot decode"
+                    ) from exc
+
+        try:
+            return codec.decode(body)
+        except ValueError as exc:
+            raise exceptions.InvalidMessageInQueueError(
+                f"Message {msg['MessageId']} is not valid {codec.name}"
+            ) from exc
 
     def __message_to_object(
         self,
@@ -215,12 +1644,18 @@ class SQSQueue(_AbstractQueue):
         message_id: str,
         receipt_handle: str,
         attributes: Dict[str, str],
+        model_class: Optional[type] = None,
+        fingerprint: Optional[str] = None,
     ) -> "SQSModel":
         """
         Converts a SQS object to the pydantic model that represents it.
 
         Args:
             message (dict[str, Any]): _description_
+            model_class (SQSModel, optional): The model from the message's model attribute. Defaults to None, which
+                looks up the model named in the message
+            fingerprint (str, optional): The schema fingerprint the message was sent with. If it matches the model's,
+                the message is built without validating it again. Defaults to None.
 
         Raises:
             exceptions.InvalidMessageInQueueError: _description_
@@ -228,20 +1663,32 @@ class SQSQueue(_AbstractQueue):
         Returns:
             SQSModel: _description_
         """
-        try:
-            model = self.models[message["model"]]
-        except KeyError:
-            raise exceptions.InvalidMessageInQueueError(
-                f"No model registered to queue {self.queue_url} for model "
-                + f"type {message['model']} from {message_id}"
-            ) from None
+        if not isinstance(message, dict):
+            raise exceptions.InvalidMessageInQueueError(f"Invalid message {message_id} from queue {self.queue_url}")
+        model = model_class
+        if model is None:
+            try:
+                model = self.models[message["model"]]
+            except (KeyError, TypeError):
+                raise exceptions.InvalidMessageInQueueError(
+                    f"No model registered to queue {self.queue_url} for model "
+                    + f"type {message.get('model')} from {message_id}"
+                ) from None
+
+        decoder = self._decoder(model)
+        content = message.get("message")
+        if not isinstance(content, dict):
+            raise exceptions.InvalidMessageInQueueError(f"Invalid message {message_id} from queue {self.queue_url}")
 
+        decode = decoder.decode
+        if fingerprint is not None and fingerprint == decoder.fingerprint:
+            decode = decoder.construct
         try:
-            return model(
+            return decode(
+                content,
                 message_id=message_id,
                 receipt_handle=receipt_handle,
                 attributes=attributes,
-                **message["message"],
             )
         except ValidationError as exc:
             raise exceptions.InvalidMessageInQueueError(
@@ -264,7 +1711,7 @@ class SQSQueue(_AbstractQueue):
         Returns:
             _type_: _description_
         """
-        async with self.session.create_client("sqs", **self.client_kwargs) as client:
+        async with self.client() as client:
             response = await client.receive_message(**recv_kwargs)
 
         messages = response.get("Messages", [response.get("Message", None)])
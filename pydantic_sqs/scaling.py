@@ -0,0 +1,129 @@
+"""Module containing the backlog-driven autoscaler of consumer concurrency"""
+import math
+from typing import Optional
+from typing import Tuple
+
+# The queue attributes the autoscaler reads
+BACKLOG_ATTRIBUTES = ["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"]
+
+
+class BacklogScaler:
+    """
+    Scales a Worker's pollers and handler slots with the queue's backlog, see Worker.autoscaler.
+
+    Every interval_seconds the worker reads the queue's approximate number of visible and in-flight messages, with a
+    GetQueueAttributes result cached for the same interval, and passes them to evaluate. The scaler wants enough
+    handler slots to work off every outstanding message within target_drain_seconds at the observed handler time,
+    and one poller per messages_per_poller slots, both between their bounds. Until a handler time has been observed it
+    wants one slot per outstanding message.
+
+    Scaling up happens right away. Scaling down only happens after scale_down_after evaluations in a row that wanted
+    less, so a briefly empty queue does not shed capacity that is needed again a moment later.
+    """
+
+    def __init__(
+        self,
+        min_pollers: int = 1,
+        max_pollers: int = 8,
+        min_in_flight: int = 1,
+        max_in_flight: int = 100,
+        interval_seconds: float = 10.0,
+        target_drain_seconds: float = 60.0,
+        messages_per_poller: int = 10,
+        scale_down_after: int = 3,
+        smoothing: float = 0.1,
+    ):
+        """
+        Args:
+            min_pollers (int, optional): The fewest concurrent pollers, used when the queue is empty. Defaults to 1.
+            max_pollers (int, optional): The most concurrent pollers. Defaults to 8.
+            min_in_flight (int, optional): The fewest handler slots, used when the queue is empty. Defaults to 1.
+            max_in_flight (int, optional): The most handler slots. Defaults to 100.
+            interval_seconds (float, optional): How often (in seconds) the backlog is read. Defaults to 10.
+            target_drain_seconds (float, optional): How long (in seconds) working off the backlog should take.
+                Defaults to 60.
+            messages_per_poller (int, optional): The handler slots one poller is expected to keep busy. Defaults to
+                10, the most messages a receive call returns.
+            scale_down_after (int, optional): Evaluations in a row that want less before scaling down. Defaults to 3.
+            smoothing (float, optional): The weight of the latest handler time in the moving average of handler
+                times. Defaults to 0.1.
+
+        Raises:
+            ValueError: Raised if a minimum is larger than its maximum
+        """
+        if not 0 < min_pollers <= max_pollers:
+            raise ValueError("min_pollers must be positive and at most max_pollers")
+        if not 0 < min_in_flight <= max_in_flight:
+            raise ValueError("min_in_flight must be positive and at most max_in_flight")
+        self.min_pollers = min_pollers
+        self.max_pollers = max_pollers
+        self.min_in_flight = min_in_flight
+        self.max_in_flight = max_in_flight
+        self.interval_seconds = interval_seconds
+        self.target_drain_seconds = target_drain_seconds
+        self.messages_per_poller = messages_per_poller
+        self.scale_down_after = scale_down_after
+        self.smoothing = smoothing
+        self.pollers = min_pollers
+        self.in_flight = min_in_flight
+        self.handler_seconds: Optional[float] = None
+        self._down_streak = 0
+
+    def record_handled(self, seconds: float) -> None:
+        """
+        Record how long a handler took
+
+        Args:
+            seconds (float): The handler's run time
+        """
+        if self.handler_seconds is None:
+            self.handler_seconds = seconds
+        else:
+            self.handler_seconds += self.smoothing * (seconds - self.handler_seconds)
+
+    def target(self, visible: int, not_visible: int) -> Tuple[int, int]:
+        """
+        The pollers and handler slots wanted for a backlog, without hysteresis
+
+        Args:
+            visible (int): The approximate number of messages waiting in the queue
+            not_visible (int): The approximate number of messages received and not yet deleted, by every consumer
+
+        Returns:
+            tuple[int, int]: The number of pollers and handler slots
+        """
+        outstanding = visible + not_visible
+        if self.handler_seconds is None:
+            slots = outstanding
+        else:
+            slots = math.ceil(outstanding * self.handler_seconds / self.target_drain_seconds)
+        slots = min(self.max_in_flight, max(self.min_in_flight, slots))
+        pollers = min(self.max_pollers, max(self.min_pollers, math.ceil(slots / self.messages_per_poller)))
+        return pollers, slots
+
+    def evaluate(self, visible: int, not_visible: int) -> Tuple[int, int]:
+        """
+        Update the wanted pollers and handler slots from the queue's backlog
+
+        Args:
+            visible (int): The approximate number of messages waiting in the queue
+            not_visible (int): The approximate number of messages received and not yet deleted, by every consumer
+
+        Returns:
+            tuple[int, int]: The number of pollers and handler slots to run with
+        """
+        pollers, slots = self.target(visible, not_visible)
+        if pollers >= self.pollers and slots >= self.in_flight:
+            self._down_streak = 0
+            self.pollers, self.in_flight = pollers, slots
+            return self.pollers, self.in_flight
+
+        self._down_streak += 1
+        if self._down_streak >= self.scale_down_after:
+            self._down_streak = 0
+            self.pollers, self.in_flight = pollers, slots
+        else:
+            # Scale up whichever one wants more right away
+            self.pollers = max(self.pollers, pollers)
+            self.in_flight = max(self.in_flight, slots)
+        return self.pollers, self.in_flight
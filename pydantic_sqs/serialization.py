@@ -0,0 +1,415 @@
+"""Module containing the JSON backends, the wire codecs and the per-model message decoders"""
+import base64
+import hashlib
+import json
+from datetime import timezone
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+from pydantic import BaseModel
+from pydantic import ConstrainedInt
+from pydantic import ConstrainedStr
+from pydantic import validate_model
+from pydantic.fields import ModelField
+from pydantic.fields import SHAPE_DICT
+from pydantic.fields import SHAPE_LIST
+from pydantic.fields import SHAPE_SINGLETON
+from pydantic.json import pydantic_encoder
+
+# Fields of SQSModel that describe a received message rather than its content. They are never sent in a message body
+SQS_METADATA_FIELDS = frozenset(("message_id", "receipt_handle", "attributes", "deleted"))
+
+# Prefix of the message attributes pydantic_sqs sets on the messages it sends
+MESSAGE_ATTRIBUTE_PREFIX = "pydantic_sqs."
+# Message attribute naming the model of a message, so consumers can route it without parsing its body
+MODEL_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "model"
+# Message attribute holding the schema fingerprint of a message's model, see SQSQueue.trusted
+FINGERPRINT_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "fingerprint"
+# Message attribute naming the codec of a message body. Messages without it are JSON
+CODEC_ATTRIBUTE = MESSAGE_ATTRIBUTE_PREFIX + "codec"
+
+
+class JSONBackend:
+    """Encodes and decodes message bodies with the standard library's json module"""
+
+    name = "json"
+
+    def loads(self, data: str) -> Any:
+        """
+        Parse a JSON document
+
+        Raises:
+            ValueError: Raised if data is not valid JSON
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        """Serialize obj to a compact JSON document, encoding pydantic-supported types like datetimes and UUIDs"""
+        return json.dumps(obj, default=pydantic_encoder, separators=(",", ":"))
+
+
+class OrjsonBackend(JSONBackend):
+    """Encodes and decodes message bodies with orjson. Requires the orjson package"""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._orjson = orjson
+        self.loads = orjson.loads  # type: ignore
+
+    def dumps(self, obj: Any) -> str:
+        return self._orjson.dumps(obj, default=pydantic_encoder, option=self._orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+class UjsonBackend(JSONBackend):
+    """Encodes and decodes message bodies with ujson. Requires the ujson package"""
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        import ujson
+
+        self._ujson = ujson
+        self.loads = ujson.loads  # type: ignore
+
+    def dumps(self, obj: Any) -> str:
+        return self._ujson.dumps(obj, default=pydantic_encoder, ensure_ascii=False)
+
+
+JSON_BACKENDS: Dict[str, Type[JSONBackend]] = {
+    JSONBackend.name: JSONBackend,
+    OrjsonBackend.name: OrjsonBackend,
+    UjsonBackend.name: UjsonBackend,
+}
+
+_backends: Dict[str, JSONBackend] = {}
+
+
+def get_json_backend(name: str) -> JSONBackend:
+    """
+    Get a JSON backend by name
+
+    Args:
+        name (str): One of "json", "orjson" or "ujson"
+
+    Raises:
+        ValueError: Raised if there is no backend with that name
+        ImportError: Raised if the backend's package is not installed
+
+    Returns:
+        JSONBackend: The backend. Backends are created once and shared
+    """
+    backend = _backends.get(name)
+    if backend is not None:
+        return backend
+    try:
+        backend_class = JSON_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown json backend {name}, choose one of {', '.join(JSON_BACKENDS)}") from None
+    try:
+        backend = backend_class()
+    except ImportError as exc:
+        raise ImportError(f"The {name} json backend requires the {name} package, pip install {name}") from exc
+    _backends[name] = backend
+    return backend
+
+
+class Codec:
+    """
+    Turns message envelopes into SQS message bodies and back.
+
+    An envelope is a dict of the model name and the model's content. Bodies have to be text, so binary codecs encode
+    to base64. Custom codecs are added with SQSQueue.register_codec
+    """
+
+    name: str
+
+    def encode(self, envelope: Dict[str, Any]) -> str:
+        """Encode an envelope into a message body"""
+        raise NotImplementedError
+
+    def decode(self, body: str) -> Any:
+        """
+        Decode a message body into an envelope
+
+        Raises:
+            ValueError: Raised if body is not valid for this codec
+        """
+        raise NotImplementedError
+
+
+class JSONCodec(Codec):
+    """JSON bodies, written with the queue's JSON backend. Used for messages without a codec attribute"""
+
+    name = "json"
+
+    def __init__(self, backend: Optional[JSONBackend] = None):
+        """
+        Args:
+            backend (JSONBackend, optional): The JSON library to use. Defaults to None, which uses the standard
+                library's json module.
+        """
+        self.backend = backend if backend is not None else get_json_backend("json")
+
+    def encode(self, envelope: Dict[str, Any]) -> str:
+        return self.backend.dumps(envelope)
+
+    def decode(self, body: str) -> Any:
+        return self.backend.loads(body)
+
+
+class MsgpackCodec(Codec):
+    """Base64 encoded MessagePack bodies. Requires the msgpack package"""
+
+    name = "msgpack"
+
+    def __init__(self) -> None:
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def encode(self, envelope: Dict[str, Any]) -> str:
+        packed = self._msgpack.packb(envelope, default=pydantic_encoder, use_bin_type=True)
+        return base64.b64encode(packed).decode("ascii")
+
+    def decode(self, body: str) -> Any:
+        try:
+            return self._msgpack.unpackb(base64.b64decode(body, validate=True), raw=False)
+        except self._msgpack.UnpackException as exc:
+            # truncated bodies raise OutOfData, which is not a ValueError
+            raise ValueError(str(exc)) from exc
+
+
+class CBORCodec(Codec):
+    """Base64 encoded CBOR bodies. Requires the cbor2 package. Naive datetimes are encoded as UTC"""
+
+    name = "cbor"
+
+    def __init__(self) -> None:
+        import cbor2
+
+        self._cbor2 = cbor2
+
+    @staticmethod
+    def _default(encoder: Any, value: Any) -> None:
+        encoder.encode(pydantic_encoder(value))
+
+    def encode(self, envelope: Dict[str, Any]) -> str:
+        packed = self._cbor2.dumps(envelope, default=self._default, timezone=timezone.utc)
+        return base64.b64encode(packed).decode("ascii")
+
+    def decode(self, body: str) -> Any:
+        return self._cbor2.loads(base64.b64decode(body, validate=True))
+
+
+CODECS: Dict[str, Type[Codec]] = {
+    JSONCodec.name: JSONCodec,
+    MsgpackCodec.name: MsgpackCodec,
+    CBORCodec.name: CBORCodec,
+}
+
+_CODEC_PACKAGES = {MsgpackCodec.name: "msgpack", CBORCodec.name: "cbor2"}
+
+_codecs: Dict[str, Codec] = {}
+
+
+def get_codec(name: str) -> Codec:
+    """
+    Get a built-in codec by name
+
+    Args:
+        name (str): One of "json", "msgpack" or "cbor"
+
+    Raises:
+        ValueError: Raised if there is no codec with that name
+        ImportError: Raised if the codec's package is not installed
+
+    Returns:
+        Codec: The codec. Codecs are created once and shared
+    """
+    codec = _codecs.get(name)
+    if codec is not None:
+        return codec
+    try:
+        codec_class = CODECS[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec {name}, choose one of {', '.join(CODECS)}") from None
+    try:
+        codec = codec_class()
+    except ImportError as exc:
+        package = _CODEC_PACKAGES.get(name, name)
+        raise ImportError(f"The {name} codec requires the {package} package, pip install {package}") from exc
+    _codecs[name] = codec
+    return codec
+
+
+def schema_fingerprint(model_class: Type[Any]) -> str:
+    """
+    A short hash of a model's name, fields, types, constraints and validators. Producers and consumers with the same
+    model definition get the same fingerprint
+
+    Args:
+        model_class (SQSModel): The model class
+
+    Returns:
+        str: The fingerprint
+    """
+    try:
+        schema = json.dumps(model_class.schema(), sort_keys=True, default=repr)
+    except Exception:
+        # models with arbitrary types have no JSON schema
+        schema = repr([(name, repr(field)) for name, field in model_class.__fields__.items()])
+    validators = sorted(
+        f"{name}:{validator.func.__qualname__}"
+        for name, field_validators in model_class.__validators__.items()
+        for validator in field_validators
+    )
+    root_validators = [
+        getattr(validator, "__qualname__", repr(validator))
+        for validator in model_class.__pre_root_validators__ + [v for _, v in model_class.__post_root_validators__]
+    ]
+    digest = hashlib.blake2b(digest_size=8)
+    for part in (model_class.__qualname__.lower(), schema, repr(validators), repr(root_validators)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _is_json_native(field: ModelField) -> bool:
+    """Whether a decoded JSON value is already what validating it for field would produce"""
+    if field.sub_fields and field.shape == SHAPE_SINGLETON:
+        # Unions
+        return all(_is_json_native(sub_field) for sub_field in field.sub_fields)
+    if field.shape == SHAPE_LIST:
+        return all(_is_json_native(sub_field) for sub_field in field.sub_fields)
+    if field.shape == SHAPE_DICT:
+        return _is_json_native(field.key_field) and all(_is_json_native(sub_field) for sub_field in field.sub_fields)
+    if field.shape != SHAPE_SINGLETON:
+        return False
+    field_type = field.type_
+    if field_type is Any or field_type in (str, int, bool):
+        return True
+    return isinstance(field_type, type) and issubclass(field_type, (ConstrainedStr, ConstrainedInt))
+
+
+class ModelDecoder:
+    """
+    Builds instances of one model from decoded message content.
+
+    Created once per model when it is registered, so every message only pays for pydantic validation: the message
+    metadata is merged into the freshly decoded content in place rather than unpacked into keyword arguments.
+    Messages from trusted producers can skip most of the validation with construct. Models with their own __init__
+    are always built through it.
+    """
+
+    def __init__(self, model_class: Type[Any]):
+        """
+        Args:
+            model_class (SQSModel): The model class to build
+        """
+        self.model_class = model_class
+        self._new = model_class.__new__
+        self._custom_init = model_class.__init__ is not BaseModel.__init__
+        self.fingerprint = schema_fingerprint(model_class)
+        # (name, alias, field, whether the field needs validating) of every content field
+        self._fields: List[Tuple[str, str, ModelField, bool]] = [
+            (name, field.alias, field, not _is_json_native(field))
+            for name, field in model_class.__fields__.items()
+            if name not in SQS_METADATA_FIELDS
+        ]
+
+    def decode(
+        self,
+        content: Dict[str, Any],
+        message_id: str,
+        receipt_handle: Optional[str],
+        attributes: Optional[Dict[str, str]],
+    ) -> Any:
+        """
+        Validate content and build the model
+
+        Args:
+            content (dict[str, Any]): The decoded message content. It is modified in place
+            message_id (str): The SQS message id
+            receipt_handle (str): The SQS receipt handle
+            attributes (dict[str, str]): The SQS message system attributes
+
+        Raises:
+            ValidationError: Raised if content is not valid for the model
+
+        Returns:
+            SQSModel: The validated model
+        """
+        content["message_id"] = message_id
+        content["receipt_handle"] = receipt_handle
+        content["attributes"] = attributes
+        content.pop("deleted", None)
+        if self._custom_init:
+            return self.model_class(**content)
+        values, fields_set, error = validate_model(self.model_class, content)
+        if error is not None:
+            raise error
+        return self._build(values, fields_set)
+
+    def construct(
+        self,
+        content: Dict[str, Any],
+        message_id: str,
+        receipt_handle: Optional[str],
+        attributes: Optional[Dict[str, str]],
+    ) -> Any:
+        """
+        Build the model from content that was validated by its producer, see SQSQueue.trusted
+
+        Only fields whose decoded values differ from their validated values, like datetimes or nested models, are
+        validated; validators are not run again. Content that turns out not to fit the model, and content of models
+        with their own __init__, is fully validated.
+
+        Args:
+            content (dict[str, Any]): The decoded message content
+            message_id (str): The SQS message id
+            receipt_handle (str): The SQS receipt handle
+            attributes (dict[str, str]): The SQS message system attributes
+
+        Raises:
+            ValidationError: Raised if content is not valid for the model
+
+        Returns:
+            SQSModel: The model
+        """
+        if self._custom_init:
+            return self.decode(content, message_id, receipt_handle, attributes)
+        values: Dict[str, Any] = {
+            "message_id": message_id,
+            "receipt_handle": receipt_handle,
+            "attributes": attributes,
+            "deleted": False,
+        }
+        fields_set = {"message_id", "receipt_handle", "attributes"}
+        for name, alias, field, needs_validation in self._fields:
+            if alias in content:
+                value = content[alias]
+                if needs_validation:
+                    value, errors = field.validate(value, values, loc=alias, cls=self.model_class)
+                    if errors:
+                        return self.decode(content, message_id, receipt_handle, attributes)
+                values[name] = value
+                fields_set.add(name)
+            elif field.required:
+                return self.decode(content, message_id, receipt_handle, attributes)
+            else:
+                values[name] = field.get_default()
+        return self._build(values, fields_set)
+
+    def _build(self, values: Dict[str, Any], fields_set: set) -> Any:
+        model = self._new(self.model_class)
+        object.__setattr__(model, "__dict__", values)
+        object.__setattr__(model, "__fields_set__", fields_set)
+        model._init_private_attributes()
+        return model
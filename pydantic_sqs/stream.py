@@ -0,0 +1,167 @@
+"""Module containing the streaming receive API"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any
+from typing import Deque
+from typing import Optional
+from typing import Set
+
+from pydantic_sqs.poll import _Pollers
+from pydantic_sqs.poll import PollController
+from pydantic_sqs.worker import POLL_ERROR_BACKOFF
+
+logger = logging.getLogger(__name__)
+
+
+class MessageStream(_Pollers):
+    """
+    An async iterator over the messages of a SQSQueue.
+
+    Background long-polls keep a bounded prefetch buffer filled, so the consumer does not wait on a ReceiveMessage
+    round trip between messages. Polling stops while the buffer is full and resumes as the consumer catches up.
+    Messages still in the buffer when the stream is closed are made visible again right away. Use it as an async
+    context manager so it is always closed::
+
+        async with queue.stream() as stream:
+            async for message in stream:
+                ...
+    """
+
+    def __init__(
+        self,
+        queue: Any,
+        model_class: Optional[type] = None,
+        max_buffer_messages: int = 100,
+        max_buffer_bytes: int = 10 * 1024 * 1024,
+        pollers: int = 1,
+        max_messages: int = 10,
+        wait_time_seconds: int = 20,
+        visibility_timeout: Optional[int] = None,
+        poll_controller: Optional[PollController] = None,
+    ):
+        """
+        Args:
+            queue (SQSQueue): The queue to stream
+            model_class (SQSModel, optional): Only yield messages of this model. Defaults to None, which yields
+                every registered model.
+            max_buffer_messages (int, optional): The maximum number of prefetched messages. Defaults to 100.
+            max_buffer_bytes (int, optional): The maximum total body size of prefetched messages. Defaults to 10 MiB.
+            pollers (int, optional): The number of concurrent long-poll loops. Defaults to 1.
+            max_messages (int, optional): The maximum number of messages per receive call. Defaults to 10.
+            wait_time_seconds (int, optional): The long-poll wait time of each receive call. Defaults to 20.
+            visibility_timeout (int, optional): The visibility timeout of received messages. Defaults to None, which
+                uses the queue's visibility timeout.
+            poll_controller (PollController, optional): Adapts the number of pollers to the arrival rate, and sets
+                the batch size and long-poll wait. pollers and wait_time_seconds are ignored when it is set. Defaults
+                to None.
+        """
+        self.queue = queue
+        self.model_class = model_class
+        self.max_buffer_messages = max_buffer_messages
+        self.max_buffer_bytes = max_buffer_bytes
+        self.pollers = pollers
+        self.max_messages = max_messages
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.poll_controller = poll_controller
+        self._buffer: Deque[Any] = deque()
+        self._buffer_bytes = 0
+        self._reserved = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._poller_tasks: Set["asyncio.Task[None]"] = set()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def buffer_bytes(self) -> int:
+        """The total body size of the prefetched messages"""
+        return self._buffer_bytes
+
+    def _start(self) -> None:
+        if self._changed is not None:
+            return
+        self._changed = asyncio.Condition()
+        self._start_pollers()
+
+    def _room(self) -> int:
+        """How many more messages the pollers may ask for"""
+        if self._buffer_bytes >= self.max_buffer_bytes:
+            return 0
+        return self.max_buffer_messages - len(self._buffer) - self._reserved
+
+    async def _poll(self) -> None:
+        """A long-poll loop that keeps the buffer filled"""
+        while not self._closed and not self._poller_should_exit():
+            max_messages, wait_time_seconds = self._receive_params()
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._room() > 0)
+                reserved = min(max_messages, self._room())
+                self._reserved += reserved
+            try:
+                models = await self.queue.from_sqs(
+                    max_messages=reserved,
+                    visibility_timeout=self.visibility_timeout,
+                    wait_time_seconds=wait_time_seconds,
+                    ignore_empty=True,
+                    ignore_unknown=True,
+                    model_class=self.model_class,
+                )
+            except asyncio.CancelledError:
+                self._reserved -= reserved
+                raise
+            except Exception:
+                logger.exception("Receiving from %s failed", self.queue.queue_url)
+                models = []
+                await asyncio.sleep(POLL_ERROR_BACKOFF)
+
+            self._record_receive(reserved, len(models))
+            async with self._changed:
+                self._reserved -= reserved
+                for model in models:
+                    if self.model_class is not None and not isinstance(model, self.model_class):
+                        continue
+                    self._buffer.append(model)
+                    self._buffer_bytes += model._body_size or 0
+                self._changed.notify_all()
+
+    def __aiter__(self) -> "MessageStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._closed:
+            raise StopAsyncIteration
+        self._start()
+        async with self._changed:
+            await self._changed.wait_for(lambda: len(self._buffer) > 0 or self._closed)
+            if self._closed:
+                raise StopAsyncIteration
+            model = self._buffer.popleft()
+            self._buffer_bytes -= model._body_size or 0
+            self._changed.notify_all()
+        return model
+
+    async def close(self) -> None:
+        """Stop polling and make the messages left in the buffer visible again"""
+        if self._closed:
+            return
+        self._closed = True
+        for task in self._poller_tasks:
+            task.cancel()
+        await asyncio.gather(*self._poller_tasks, return_exceptions=True)
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+        if self._buffer:
+            unconsumed, self._buffer, self._buffer_bytes = list(self._buffer), deque(), 0
+            for model in unconsumed:
+                self.queue._untrack(model)
+            await self.queue.change_visibility_batch(unconsumed, visibility_timeout=0)
+
+    async def __aenter__(self) -> "MessageStream":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
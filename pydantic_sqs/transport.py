@@ -0,0 +1,84 @@
+"""Module containing the transports SQSQueue reaches SQS through"""
+import asyncio
+from abc import ABC
+from abc import abstractmethod
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import AsyncIterator
+from typing import Hashable
+from typing import Tuple
+
+from pydantic_sqs.client import CLIENT_POOL
+from pydantic_sqs.client import session_key
+
+
+class Transport(ABC):
+    """
+    How a SQSQueue reaches SQS, see SQSQueue.transport.
+
+    A transport hands out clients with the aiobotocore SQS client's methods, like receive_message or
+    send_message_batch. Clients take and return the same kwargs and dicts as the aiobotocore client, and raise
+    botocore's ClientError for failed calls.
+    """
+
+    @abstractmethod
+    def client(self, queue: Any) -> Any:
+        """
+        Get a client for a single call against a queue that is not open
+
+        Args:
+            queue (SQSQueue): The queue the call is made for
+
+        Returns:
+            An async context manager yielding the client
+        """
+
+    @abstractmethod
+    async def acquire(self, queue: Any) -> Tuple[Any, Hashable]:
+        """
+        Get a long-lived client for an open queue, see SQSQueue.open
+
+        Args:
+            queue (SQSQueue): The queue that is being opened
+
+        Returns:
+            tuple[Any, Hashable]: The client, and the key to release it with
+        """
+
+    @abstractmethod
+    async def release(self, key: Hashable) -> None:
+        """Release a client from acquire once its queue is closed"""
+
+
+class AioBotocoreTransport(Transport):
+    """
+    Reaches SQS (or localstack) with aiobotocore, the default transport.
+
+    Open queues with the same session and client settings share one client from the client pool. Queues created
+    without a session count as having the same session, so only their client settings decide which client they share.
+    """
+
+    @asynccontextmanager
+    async def client(self, queue: Any) -> AsyncIterator[Any]:
+        async with queue.session.create_client("sqs", **queue.client_kwargs) as client:
+            yield client
+
+    async def acquire(self, queue: Any) -> Tuple[Any, Hashable]:
+        key = (
+            session_key(queue.session),
+            id(asyncio.get_running_loop()),
+            queue.aws_region,
+            queue.use_ssl,
+            queue.endpoint_url,
+            queue.max_pool_connections,
+            queue.keepalive_timeout,
+        )
+        client = await CLIENT_POOL.acquire(key, queue.session, queue.client_kwargs)
+        return client, key
+
+    async def release(self, key: Hashable) -> None:
+        await CLIENT_POOL.release(key)
+
+
+# DEFAULT_TRANSPORT is used by every SQSQueue without a transport of its own
+DEFAULT_TRANSPORT = AioBotocoreTransport()
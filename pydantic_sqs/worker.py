@@ -0,0 +1,314 @@
+"""Module containing the consumer runtime"""
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from pydantic_sqs.fifo import message_group_id
+from pydantic_sqs.metrics import HANDLER_SECONDS
+from pydantic_sqs.poll import _Pollers
+from pydantic_sqs.poll import PollController
+from pydantic_sqs.scaling import BACKLOG_ATTRIBUTES
+from pydantic_sqs.scaling import BacklogScaler
+
+logger = logging.getLogger(__name__)
+
+# How long (in seconds) a poller waits before polling again after a receive call failed
+POLL_ERROR_BACKOFF = 1.0
+
+
+class Worker(_Pollers):
+    """
+    Consumes a SQSQueue with concurrent long-poll loops and dispatches every message to the handler registered for
+    its model with SQSQueue.handler.
+
+    Messages are deleted once their handler returns. If a handler raises, the message is left in the queue and SQS
+    redelivers it after its visibility timeout, which the queue's heartbeat stops extending. Messages without a
+    handler are left in the queue as well.
+
+    Handlers registered with process=True run in a process pool, while their messages are received, kept invisible
+    and deleted on the event loop.
+
+    With an autoscaler, the number of pollers and handler slots follows the queue's backlog while the worker runs.
+
+    On FIFO queues every message group gets its own lane: messages of one group are handled one at a time in the order
+    SQS returned them, while different groups are handled concurrently. When a handler fails, the rest of its lane is
+    made visible again so SQS redelivers the group in order, starting with the failed message once its visibility
+    timeout runs out.
+    """
+
+    def __init__(
+        self,
+        queue: Any,
+        pollers: int = 1,
+        max_in_flight: int = 10,
+        max_messages: int = 10,
+        wait_time_seconds: int = 20,
+        visibility_timeout: Optional[int] = None,
+        poll_controller: Optional[PollController] = None,
+        process_pool: Optional[Executor] = None,
+        processes: Optional[int] = None,
+        autoscaler: Optional[BacklogScaler] = None,
+        group_lanes: Optional[bool] = None,
+    ):
+        """
+        Args:
+            queue (SQSQueue): The queue to consume
+            pollers (int, optional): The number of concurrent long-poll loops. Defaults to 1.
+            max_in_flight (int, optional): The maximum number of messages being handled at once. Pollers only ask
+                SQS for as many messages as there are free slots. Defaults to 10.
+            max_messages (int, optional): The maximum number of messages per receive call. Defaults to 10.
+            wait_time_seconds (int, optional): The long-poll wait time of each receive call. Defaults to 20.
+            visibility_timeout (int, optional): The visibility timeout of received messages. Defaults to None, which
+                uses the queue's visibility timeout.
+            poll_controller (PollController, optional): Adapts the number of pollers to the arrival rate, and sets
+                the batch size and long-poll wait. pollers and wait_time_seconds are ignored when it is set, and
+                max_messages caps its batch size. Defaults to None.
+            process_pool (Executor, optional): The pool handlers registered with process=True run in. Defaults to
+                None, which starts a ProcessPoolExecutor when the first such message arrives and shuts it down when run
+                returns.
+            processes (int, optional): The number of processes of the pool started by run. Defaults to None, which
+                starts one per CPU.
+            autoscaler (BacklogScaler, optional): Scales the pollers and handler slots with the queue's backlog.
+                pollers and max_in_flight are ignored when it is set. With a poll_controller, it sets the controller's
+                max_pollers instead of the number of pollers. Defaults to None.
+            group_lanes (bool, optional): Whether to handle messages in per message group lanes. Defaults to None,
+                which uses lanes on FIFO queues.
+        """
+        self.queue = queue
+        self.pollers = pollers
+        self.max_in_flight = max_in_flight
+        self.max_messages = max_messages
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.poll_controller = poll_controller
+        self.process_pool = process_pool
+        self.processes = processes
+        self.autoscaler = autoscaler
+        self.group_lanes = queue.fifo if group_lanes is None else group_lanes
+        if autoscaler is not None:
+            self.pollers = autoscaler.pollers
+            self.max_in_flight = autoscaler.in_flight
+            if poll_controller is not None:
+                poll_controller.max_pollers = autoscaler.pollers
+        self._owned_pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._slots_changed: Optional[asyncio.Condition] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._poller_tasks: Set["asyncio.Task[None]"] = set()
+        self._handler_tasks: Set["asyncio.Task[None]"] = set()
+        self._scaler_task: Optional["asyncio.Task[None]"] = None
+        self._lanes: Dict[str, Deque[Any]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """The number of messages currently reserved or being handled"""
+        return self._in_flight
+
+    async def run(self) -> None:
+        """Consume the queue until stop is called, then wait for every message in flight to be handled"""
+        self._slots_changed = asyncio.Condition()
+        self._stopped = asyncio.Event()
+        self._start_pollers()
+        if self.autoscaler is not None:
+            self._scaler_task = asyncio.ensure_future(self._scale())
+        try:
+            await self._stopped.wait()
+        finally:
+            self._stopped.set()
+            if self._scaler_task is not None:
+                self._scaler_task.cancel()
+                await asyncio.gather(self._scaler_task, return_exceptions=True)
+                self._scaler_task = None
+            for task in self._poller_tasks:
+                task.cancel()
+            await asyncio.gather(*self._poller_tasks, return_exceptions=True)
+            if self._handler_tasks:
+                await asyncio.gather(*self._handler_tasks, return_exceptions=True)
+            await self.queue.flush()
+            if self._owned_pool is not None:
+                pool, self._owned_pool = self._owned_pool, None
+                await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+
+    def stop(self) -> None:
+        """Stop polling. run returns once every message in flight has been handled"""
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def _get_process_pool(self) -> Executor:
+        """The pool process handlers run in, started on first use if process_pool is not set"""
+        if self.process_pool is not None:
+            return self.process_pool
+        if self._owned_pool is None:
+            self._owned_pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._owned_pool
+
+    async def _scale(self) -> None:
+        """Resize the pollers and handler slots to the queue's backlog every autoscaler.interval_seconds"""
+        autoscaler = self.autoscaler
+        while not self._stopped.is_set():
+            try:
+                attributes = await self.queue.get_queue_attributes(
+                    BACKLOG_ATTRIBUTES, max_age=autoscaler.interval_seconds
+                )
+                pollers, in_flight = autoscaler.evaluate(
+                    int(attributes.get("ApproximateNumberOfMessages", 0)),
+                    int(attributes.get("ApproximateNumberOfMessagesNotVisible", 0)),
+                )
+                await self._resize(pollers, in_flight)
+            except Exception:
+                logger.exception("Reading the backlog of %s failed", self.queue.queue_url)
+            try:
+                await asyncio.wait_for(self._stopped.wait(), autoscaler.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _resize(self, pollers: int, in_flight: int) -> None:
+        """Run with this many pollers and handler slots. Pollers and slots above them are let go once they are idle"""
+        if self.poll_controller is not None:
+            self.poll_controller.max_pollers = pollers
+            self.poll_controller.pollers = min(self.poll_controller.pollers, pollers)
+        else:
+            self.pollers = pollers
+        async with self._slots_changed:
+            self.max_in_flight = in_flight
+            self._slots_changed.notify_all()
+        self._start_pollers()
+
+    async def _reserve_slots(self, wanted: int) -> int:
+        """Wait for at least one free handler slot and reserve up to wanted slots"""
+        async with self._slots_changed:
+            await self._slots_changed.wait_for(lambda: self._in_flight < self.max_in_flight)
+            reserved = min(wanted, self.max_in_flight - self._in_flight)
+            self._in_flight += reserved
+            return reserved
+
+    async def _release_slots(self, count: int) -> None:
+        async with self._slots_changed:
+            self._in_flight -= count
+            self._slots_changed.notify_all()
+
+    async def _poll(self) -> None:
+        """A long-poll loop that receives messages into free handler slots"""
+        while not self._stopped.is_set() and not self._poller_should_exit():
+            max_messages, wait_time_seconds = self._receive_params()
+            reserved = await self._reserve_slots(max_messages)
+            try:
+                models = await self.queue.from_sqs(
+                    max_messages=reserved,
+                    visibility_timeout=self.visibility_timeout,
+                    wait_time_seconds=wait_time_seconds,
+                    ignore_empty=True,
+                    ignore_unknown=True,
+                )
+            except asyncio.CancelledError:
+                await self._release_slots(reserved)
+                raise
+            except Exception:
+                logger.exception("Receiving from %s failed", self.queue.queue_url)
+                await self._release_slots(reserved)
+                await asyncio.sleep(POLL_ERROR_BACKOFF)
+                continue
+
+            if reserved > len(models):
+                await self._release_slots(reserved - len(models))
+            self._record_receive(reserved, len(models))
+            for model in models:
+                self._dispatch(model)
+
+    def _dispatch(self, model: Any) -> None:
+        """Handle a received message right away, or in its group's lane if group_lanes is set"""
+        group = message_group_id(model) if self.group_lanes else None
+        if group is None:
+            self._start_handler(self._handle(model))
+            return
+        lane = self._lanes.get(group)
+        if lane is not None:
+            lane.append(model)
+            return
+        self._lanes[group] = deque([model])
+        self._start_handler(self._run_lane(group))
+
+    def _start_handler(self, coroutine: Any) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._handler_tasks.add(task)
+        task.add_done_callback(self._handler_tasks.discard)
+
+    async def _run_lane(self, group: str) -> None:
+        """Handle the messages of one message group in order, until its lane is empty"""
+        lane = self._lanes[group]
+        try:
+            while lane:
+                if not await self._handle(lane.popleft()) and lane:
+                    rest = list(lane)
+                    lane.clear()
+                    await self._abandon(rest)
+        finally:
+            del self._lanes[group]
+
+    async def _abandon(self, models: List[Any]) -> None:
+        """Make received messages visible again without handling them"""
+        try:
+            for model in models:
+                self.queue._untrack(model)
+            result = await self.queue.change_visibility_batch(models, visibility_timeout=0)
+            for failure in result.failed:
+                logger.warning("Releasing %s failed: %s %s", failure.model.message_id, failure.code, failure.message)
+        except Exception:
+            logger.exception("Releasing %d messages to %s failed", len(models), self.queue.queue_url)
+        finally:
+            await self._release_slots(len(models))
+
+    def _observe_handler(self, model: Any, start: float, outcome: str) -> None:
+        """Record how long a handler took in the queue's metrics and the autoscaler, if there are any"""
+        seconds = time.perf_counter() - start
+        if self.autoscaler is not None:
+            self.autoscaler.record_handled(seconds)
+        metrics = self.queue.metrics
+        if metrics is not None:
+            tags = dict(self.queue._metric_tags, model=model.__class__.__qualname__, outcome=outcome)
+            metrics.observe(HANDLER_SECONDS, seconds, tags=tags)
+
+    async def _handle(self, model: Any) -> bool:
+        """Run the handler for one message and delete the message if it succeeded
+
+        Returns:
+            bool: Whether the message was handled and deleted
+        """
+        try:
+            handler = self.queue.get_handler(model.__class__)
+            if handler is None:
+                logger.warning("No handler registered for %s, leaving it in the queue", model.__class__.__qualname__)
+                self.queue._untrack(model)
+                return False
+            start = time.perf_counter()
+            try:
+                if self.queue.handler_runs_in_process(model.__class__):
+                    await asyncio.get_running_loop().run_in_executor(self._get_process_pool(), handler, model)
+                else:
+                    result = handler(model)
+                    if inspect.isawaitable(result):
+                        await result
+            except Exception:
+                self._observe_handler(model, start, "error")
+                logger.exception("Handler for %s %s failed", model.__class__.__qualname__, model.message_id)
+                self.queue._untrack(model)
+                return False
+            self._observe_handler(model, start, "ok")
+            if not model.deleted:
+                await model.delete_from_queue()
+            return True
+        except Exception:
+            logger.exception("Deleting %s from %s failed", model.message_id, self.queue.queue_url)
+            return False
+        finally:
+            await self._release_slots(1)
@@ -6,6 +6,7 @@ import time
 import docker
 import pytest_asyncio
 from aiobotocore.session import get_session
+from pydantic_sqs import MemoryTransport
 from pydantic_sqs import SQSQueue
 
 
@@ -55,3 +56,12 @@ async def create_localstack_queue(localstack_sqs_client_args):
             use_ssl=False,
         )
         yield queue, session, client_kwargs
+
+
+@pytest_asyncio.fixture(name="memory_queue")
+async def create_memory_queue():
+    """Creates a queue in an in-memory transport, for tests that do not need localstack"""
+    transport = MemoryTransport()
+    response = await transport.create_queue(QueueName="test")
+    queue = SQSQueue(response["QueueUrl"], transport=transport)
+    yield queue, transport
@@ -412,3 +412,127 @@ async def test_from_sqs_invalid_message_in_queue_ignore_unknown(localstack_queue
 
     messages = await queue.from_sqs(ignore_unknown=True)
     assert len(messages) == 0
+
+
+def test_queue_client_kwargs_pool_config():
+    queue = SQSQueue(
+        queue_url="http://testurl",
+        max_pool_connections=50,
+        keepalive_timeout=30,
+    )
+    config = queue.client_kwargs["config"]
+    assert config.max_pool_connections == 50
+    assert config.connector_args["keepalive_timeout"] == 30
+
+
+@pytest.mark.asyncio
+async def test_queue_open_close(localstack_queue):
+    from pydantic_sqs.client import CLIENT_POOL
+
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    assert not queue.is_open
+    async with queue:
+        assert queue.is_open
+        await ThisModel(test="test").to_sqs()
+        from_sqs = await ThisModel.from_sqs()
+        assert from_sqs[0].test == "test"
+        await from_sqs[0].delete_from_queue()
+    assert not queue.is_open
+    assert len(CLIENT_POOL) == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_shares_client(localstack_queue):
+    from pydantic_sqs.client import CLIENT_POOL
+
+    queue = localstack_queue[0]
+    other_queue = SQSQueue(
+        queue.queue_url,
+        session=queue.session,
+        endpoint_url=queue.endpoint_url,
+        use_ssl=False,
+    )
+    await queue.open()
+    await other_queue.open()
+    assert queue._client is other_queue._client
+    assert len(CLIENT_POOL) == 1
+
+    await queue.close()
+    assert len(CLIENT_POOL) == 1
+    await other_queue.close()
+    assert len(CLIENT_POOL) == 0
+
+
+@pytest.mark.asyncio
+async def test_default_queues_share_client(localstack_queue):
+    from pydantic_sqs.client import CLIENT_POOL
+
+    queue = localstack_queue[0]
+    other_queue = SQSQueue(queue.queue_url, endpoint_url=queue.endpoint_url, use_ssl=False)
+    async with queue, other_queue:
+        assert queue._client is other_queue._client
+        assert len(CLIENT_POOL) == 1
+    assert len(CLIENT_POOL) == 0
+
+
+@pytest.mark.asyncio
+async def test_from_sqs_routes_by_model_attribute(localstack_queue):
+    from pydantic_sqs.exceptions import InvalidMessageInQueueError
+    from pydantic_sqs.serialization import MODEL_ATTRIBUTE
+
+    class ThisModel(SQSModel):
+        test: str
+
+    class OtherModel(SQSModel):
+        test: str
+
+    class FailingDecoder:
+        def decode(self, *args, **kwargs):
+            raise AssertionError("messages of other models must not be decoded")
+
+    queue, session, client_kwargs = localstack_queue
+    queue.register_model(ThisModel)
+    queue.register_model(OtherModel)
+    queue._decoders[OtherModel] = FailingDecoder()
+
+    await ThisModel(test="this").to_sqs()
+    await OtherModel(test="other").to_sqs()
+    received = []
+    for _ in range(5):
+        received.extend(
+            await queue.from_sqs(max_messages=10, wait_time_seconds=1, ignore_empty=True, model_class=ThisModel)
+        )
+    assert [model.test for model in received] == ["this"]
+
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.send_message(
+            QueueUrl=queue.queue_url,
+            MessageBody="not even json",
+            MessageAttributes={MODEL_ATTRIBUTE: {"DataType": "String", "StringValue": "unknownmodel"}},
+        )
+    with pytest.raises(InvalidMessageInQueueError, match="No model registered"):
+        for _ in range(5):
+            await queue.from_sqs(max_messages=10, wait_time_seconds=1, ignore_empty=True, model_class=ThisModel)
+
+
+@pytest.mark.asyncio
+async def test_from_sqs_routes_untagged_messages_by_body(localstack_queue):
+    import json
+
+    class ThisModel(SQSModel):
+        test: str
+
+    queue, session, client_kwargs = localstack_queue
+    queue.register_model(ThisModel)
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.send_message(
+            QueueUrl=queue.queue_url,
+            MessageBody=json.dumps({"model": ThisModel.__qualname__.lower(), "message": {"test": "legacy"}}),
+        )
+
+    from_sqs = await queue.from_sqs(wait_time_seconds=1)
+    assert from_sqs[0].test == "legacy"
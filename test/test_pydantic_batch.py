@@ -0,0 +1,189 @@
+import pytest
+from pydantic_sqs import exceptions
+from pydantic_sqs import SQSModel
+from pydantic_sqs.batch import chunk_entries
+from pydantic_sqs.batch import entry_size
+from pydantic_sqs.batch import MAX_BATCH_BYTES
+
+
+def test_chunk_entries_max_entries():
+    entries = [({"MessageBody": "x"}, index) for index in range(25)]
+    chunks = list(chunk_entries(entries))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert [item for chunk in chunks for _, item in chunk] == list(range(25))
+
+
+def test_chunk_entries_max_bytes():
+    body = "x" * (MAX_BATCH_BYTES // 3)
+    entries = [({"MessageBody": body}, index) for index in range(5)]
+    chunks = list(chunk_entries(entries))
+    assert [len(chunk) for chunk in chunks] == [3, 2]
+
+
+def test_entry_size_counts_attributes():
+    entry = {
+        "MessageBody": "abc",
+        "MessageAttributes": {"name": {"DataType": "String", "StringValue": "value"}},
+    }
+    assert entry_size(entry) == len("abc") + len("name") + len("String") + len("value")
+
+
+@pytest.mark.asyncio
+async def test_send_batch(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    models = (ThisModel(test=str(index)) for index in range(15))
+
+    result = await queue.send_batch(models)
+    assert result.ok
+    assert len(result.successful) == 15
+    assert all(model.message_id is not None for model in result.successful)
+
+    received = []
+    while len(received) < 15:
+        received.extend(await queue.from_sqs(max_messages=10, ignore_empty=True))
+    assert sorted(int(model.test) for model in received) == list(range(15))
+
+
+@pytest.mark.asyncio
+async def test_to_sqs_batch(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    models = [ThisModel(test="foo"), ThisModel(test="bar")]
+
+    result = await ThisModel.to_sqs_batch(models)
+    assert result.ok
+    assert [model.message_id is not None for model in models] == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_send_batch_too_large(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    too_large = ThisModel(test="x" * MAX_BATCH_BYTES)
+
+    result = await queue.send_batch([ThisModel(test="small"), too_large])
+    assert not result.ok
+    assert len(result.successful) == 1
+    assert result.failed[0].model is too_large
+    assert result.failed[0].code == "MessageTooLong"
+    assert too_large.message_id is None
+
+
+@pytest.mark.asyncio
+async def test_send_batch_retries_failed_entries(localstack_queue, mocker):
+    from pydantic_sqs import batch
+
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    mocker.patch.object(batch, "RETRY_BACKOFF", 0)
+    calls = []
+
+    class FlakyClient:
+        async def send_message_batch(self, QueueUrl, Entries):
+            calls.append([entry["MessageBody"] for entry in Entries])
+            if len(calls) == 1:
+                return {
+                    "Successful": [{"Id": Entries[0]["Id"], "MessageId": "1"}],
+                    "Failed": [{"Id": Entries[1]["Id"], "Code": "InternalError", "SenderFault": False}],
+                }
+            return {"Successful": [{"Id": entry["Id"], "MessageId": "2"} for entry in Entries]}
+
+    queue._client = FlakyClient()
+    models = [ThisModel(test="foo"), ThisModel(test="bar")]
+    try:
+        result = await queue.send_batch(models)
+    finally:
+        queue._client = None
+
+    assert result.ok
+    assert len(calls) == 2
+    assert len(calls[1]) == 1
+    assert [model.message_id for model in models] == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_send_batch_not_registered(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    with pytest.raises(exceptions.NotRegisteredError):
+        await localstack_queue[0].send_batch([ThisModel(test="test")])
+
+
+@pytest.mark.asyncio
+async def test_delete_batch(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    session = localstack_queue[1]
+    client_kwargs = localstack_queue[2]
+    queue.register_model(ThisModel)
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(3)])
+    received = []
+    while len(received) < 3:
+        received.extend(await queue.from_sqs(max_messages=10, ignore_empty=True))
+
+    never_sent = ThisModel(test="never sent")
+    result = await queue.delete_batch(received + [never_sent])
+    assert not result.ok
+    assert len(result.successful) == 3
+    assert all(model.deleted for model in received)
+    assert result.failed[0].model is never_sent
+    assert result.failed[0].code == "MessageNotInQueue"
+    assert never_sent.deleted is False
+
+    async with session.create_client("sqs", **client_kwargs) as client:
+        response = await client.get_queue_attributes(
+            QueueUrl=queue.queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+        )
+    assert int(response["Attributes"]["ApproximateNumberOfMessages"]) == 0
+    assert int(response["Attributes"]["ApproximateNumberOfMessagesNotVisible"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_batch_partial_failure(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    deleted = ThisModel(test="foo", receipt_handle="good")
+    not_deleted = ThisModel(test="bar", receipt_handle="bad")
+
+    class PartialClient:
+        async def delete_message_batch(self, QueueUrl, Entries):
+            return {
+                "Successful": [{"Id": entry["Id"]} for entry in Entries if entry["ReceiptHandle"] == "good"],
+                "Failed": [
+                    {"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True}
+                    for entry in Entries
+                    if entry["ReceiptHandle"] == "bad"
+                ],
+            }
+
+    queue._client = PartialClient()
+    try:
+        result = await queue.delete_batch([deleted, not_deleted])
+    finally:
+        queue._client = None
+
+    assert result.successful == [deleted]
+    assert result.failed[0].model is not_deleted
+    assert result.failed[0].code == "ReceiptHandleIsInvalid"
+    assert deleted.deleted is True
+    assert not_deleted.deleted is False
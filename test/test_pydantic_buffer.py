@@ -0,0 +1,227 @@
+import asyncio
+
+import pytest
+from pydantic_sqs import exceptions
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+
+
+class RecordingClient:
+    """A stand-in client that records batch requests"""
+
+    def __init__(self, fail_bodies=()):
+        self.requests = []
+        self.fail_bodies = fail_bodies
+
+    async def send_message_batch(self, QueueUrl, Entries):
+        self.requests.append(Entries)
+        return {
+            "Successful": [
+                {"Id": entry["Id"], "MessageId": f"{len(self.requests)}-{entry['Id']}"}
+                for entry in Entries
+                if entry["MessageBody"] not in self.fail_bodies
+            ],
+            "Failed": [
+                {"Id": entry["Id"], "Code": "InvalidMessageContents", "SenderFault": True}
+                for entry in Entries
+                if entry["MessageBody"] in self.fail_bodies
+            ],
+        }
+
+
+def buffered_queue(linger, client):
+    queue = SQSQueue("http://testurl", send_linger_seconds=linger)
+    queue._client = client
+    return queue
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_fills_batch():
+    class ThisModel(SQSModel):
+        test: str
+
+    client = RecordingClient()
+    queue = buffered_queue(60, client)
+    queue.register_model(ThisModel)
+
+    models = [ThisModel(test=str(index)) for index in range(10)]
+    await asyncio.gather(*[model.to_sqs() for model in models])
+
+    assert len(client.requests) == 1
+    assert len({model.message_id for model in models}) == 10
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_lingers():
+    class ThisModel(SQSModel):
+        test: str
+
+    client = RecordingClient()
+    queue = buffered_queue(0.01, client)
+    queue.register_model(ThisModel)
+
+    models = [ThisModel(test=str(index)) for index in range(3)]
+    await asyncio.gather(*[model.to_sqs() for model in models])
+
+    assert len(client.requests) == 1
+    assert len(client.requests[0]) == 3
+    assert all(model.message_id is not None for model in models)
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_failure_only_fails_its_caller():
+    class ThisModel(SQSModel):
+        test: str
+
+    good = ThisModel(test="good")
+    bad = ThisModel(test="bad")
+    client = RecordingClient()
+    queue = buffered_queue(0.01, client)
+    queue.register_model(ThisModel)
+    client.fail_bodies = (bad._send_entry()["MessageBody"],)
+
+    results = await asyncio.gather(good.to_sqs(), bad.to_sqs(), return_exceptions=True)
+
+    assert results[0] is None
+    assert isinstance(results[1], exceptions.BatchEntryError)
+    assert results[1].failure.code == "InvalidMessageContents"
+    assert good.message_id is not None
+    assert bad.message_id is None
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_flushed_on_close():
+    class ThisModel(SQSModel):
+        test: str
+
+    client = RecordingClient()
+    queue = buffered_queue(60, client)
+    queue.register_model(ThisModel)
+
+    model = ThisModel(test="test")
+    send = asyncio.ensure_future(model.to_sqs())
+    await asyncio.sleep(0)
+    assert client.requests == []
+
+    await queue.flush()
+    await send
+    assert model.message_id is not None
+
+
+@pytest.mark.asyncio
+async def test_buffered_send_localstack(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.send_linger_seconds = 0.01
+    queue.register_model(ThisModel)
+
+    models = [ThisModel(test=str(index)) for index in range(12)]
+    await asyncio.gather(*[model.to_sqs() for model in models])
+    assert all(model.message_id is not None for model in models)
+
+    received = []
+    while len(received) < 12:
+        received.extend(await queue.from_sqs(max_messages=10, ignore_empty=True))
+    assert {model.message_id for model in received} == {model.message_id for model in models}
+
+
+class RecordingAckClient:
+    """A stand-in client that records delete batch requests"""
+
+    def __init__(self):
+        self.requests = []
+
+    async def delete_message_batch(self, QueueUrl, Entries):
+        self.requests.append(Entries)
+        return {"Successful": [{"Id": entry["Id"]} for entry in Entries]}
+
+
+@pytest.mark.asyncio
+async def test_buffered_delete_coalesces():
+    class ThisModel(SQSModel):
+        test: str
+
+    client = RecordingAckClient()
+    queue = SQSQueue("http://testurl", ack_linger_seconds=0.01)
+    queue._client = client
+    queue.register_model(ThisModel)
+
+    models = [ThisModel(test=str(index), receipt_handle=str(index)) for index in range(12)]
+    await asyncio.gather(*[model.delete_from_queue() for model in models])
+
+    assert [len(request) for request in client.requests] == [10, 2]
+    assert all(model.deleted for model in models)
+    stats = queue.buffer_stats()["ack"]
+    assert stats["flushes"] == 2
+    assert stats["flushed_entries"] == 12
+    assert stats["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_buffered_delete_before_visibility_timeout():
+    import time
+    from pydantic_sqs import buffer
+
+    class ThisModel(SQSModel):
+        test: str
+
+    client = RecordingAckClient()
+    queue = SQSQueue("http://testurl", ack_linger_seconds=60)
+    queue._client = client
+    queue.register_model(ThisModel)
+
+    model = ThisModel(test="test", receipt_handle="handle")
+    model._visibility_deadline = time.monotonic() + buffer.DEADLINE_MARGIN + 0.01
+    await asyncio.wait_for(model.delete_from_queue(), timeout=1)
+    assert model.deleted is True
+
+
+@pytest.mark.asyncio
+async def test_buffered_delete_flushed_on_close():
+    class ThisModel(SQSModel):
+        test: str
+
+    client = RecordingAckClient()
+    queue = SQSQueue("http://testurl", ack_linger_seconds=60)
+    queue._client = client
+    queue.register_model(ThisModel)
+
+    model = ThisModel(test="test", receipt_handle="handle")
+    delete = asyncio.ensure_future(model.delete_from_queue())
+    await asyncio.sleep(0)
+    assert client.requests == []
+
+    await queue.close()
+    await delete
+    assert model.deleted is True
+    assert len(client.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_buffered_delete_localstack(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    session = localstack_queue[1]
+    client_kwargs = localstack_queue[2]
+    queue.ack_linger_seconds = 0.01
+    queue.register_model(ThisModel)
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(3)])
+
+    received = []
+    while len(received) < 3:
+        received.extend(await queue.from_sqs(max_messages=10, ignore_empty=True))
+    assert all(model._visibility_deadline is not None for model in received)
+    await asyncio.gather(*[model.delete_from_queue() for model in received])
+    assert all(model.deleted for model in received)
+
+    async with session.create_client("sqs", **client_kwargs) as client:
+        response = await client.get_queue_attributes(
+            QueueUrl=queue.queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+        )
+    assert int(response["Attributes"]["ApproximateNumberOfMessages"]) == 0
+    assert int(response["Attributes"]["ApproximateNumberOfMessagesNotVisible"]) == 0
@@ -0,0 +1,124 @@
+import pytest
+from pydantic_sqs import FileBlobStore
+from pydantic_sqs import MemoryBlobStore
+from pydantic_sqs import S3BlobStore
+from pydantic_sqs import SQSModel
+from pydantic_sqs.claim_check import CLAIM_CHECK_ATTRIBUTE
+from pydantic_sqs.exceptions import InvalidMessageInQueueError
+
+
+class BigModel(SQSModel):
+    test: int
+    payload: str
+
+
+async def receive(queue, count):
+    received = []
+    while len(received) < count:
+        received.extend(await queue.from_sqs(max_messages=10, wait_time_seconds=1))
+    return {model.test: model for model in received}
+
+
+@pytest.mark.asyncio
+async def test_claim_check_round_trip(localstack_queue):
+    store = MemoryBlobStore()
+    queue = localstack_queue[0]
+    queue.blob_store = store
+    queue.register_model(BigModel)
+
+    await BigModel(test=1, payload="small").to_sqs()
+    await BigModel(test=2, payload="x" * 300 * 1024).to_sqs()
+    result = await BigModel.to_sqs_batch([BigModel(test=3, payload="y" * 300 * 1024)])
+    assert result.ok
+    assert len(store) == 2
+
+    by_test = await receive(queue, 3)
+    assert by_test[1].payload == "small"
+    assert by_test[1]._claim_check is None
+    assert by_test[2].payload == "x" * 300 * 1024
+    assert by_test[3].payload == "y" * 300 * 1024
+
+    await by_test[1].delete_from_queue()
+    await by_test[2].delete_from_queue()
+    assert len(store) == 1
+    await queue.delete_batch([by_test[3]])
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_claim_check_keep_on_delete(localstack_queue):
+    store = MemoryBlobStore()
+    queue = localstack_queue[0]
+    queue.blob_store = store
+    queue.claim_check_threshold = 1024
+    queue.claim_check_delete = False
+    queue.register_model(BigModel)
+
+    await BigModel(test=1, payload="x" * 2048).to_sqs()
+    model = (await receive(queue, 1))[1]
+    await model.delete_from_queue()
+    assert len(store) == 1
+
+
+@pytest.mark.asyncio
+async def test_claim_check_missing_blob(localstack_queue):
+    store = MemoryBlobStore()
+    queue = localstack_queue[0]
+    queue.blob_store = store
+    queue.claim_check_threshold = 1024
+    queue.register_model(BigModel)
+
+    await BigModel(test=1, payload="x" * 2048).to_sqs()
+    store.blobs.clear()
+    with pytest.raises(InvalidMessageInQueueError):
+        await queue.from_sqs(wait_time_seconds=1)
+
+
+@pytest.mark.asyncio
+async def test_claim_check_without_blob_store(localstack_queue):
+    queue, session, client_kwargs = localstack_queue
+    queue.register_model(BigModel)
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.send_message(
+            QueueUrl=queue.queue_url,
+            MessageBody="key",
+            MessageAttributes={CLAIM_CHECK_ATTRIBUTE: {"DataType": "String", "StringValue": "key"}},
+        )
+
+    with pytest.raises(InvalidMessageInQueueError):
+        await queue.from_sqs(wait_time_seconds=1)
+
+
+@pytest.mark.asyncio
+async def test_file_blob_store(tmp_path):
+    store = FileBlobStore(tmp_path / "blobs")
+    await store.put("abc", b"data")
+    assert await store.get("abc") == b"data"
+    await store.delete("abc")
+    await store.delete("abc")
+    with pytest.raises(KeyError):
+        await store.get("abc")
+    with pytest.raises(KeyError):
+        await store.get("../abc")
+
+
+@pytest.mark.asyncio
+async def test_s3_blob_store(localstack_queue):
+    queue, session, client_kwargs = localstack_queue
+    async with session.create_client("s3", **client_kwargs) as client:
+        await client.create_bucket(Bucket="pydantic-sqs-blobs")
+
+    store = S3BlobStore("pydantic-sqs-blobs", prefix="claims/", session=session, **client_kwargs)
+    try:
+        queue.blob_store = store
+        queue.claim_check_threshold = 1024
+        queue.register_model(BigModel)
+
+        await BigModel(test=1, payload="x" * 2048).to_sqs()
+        model = (await receive(queue, 1))[1]
+        assert model.payload == "x" * 2048
+        await model.delete_from_queue()
+        with pytest.raises(KeyError):
+            await store.get(model._claim_check)
+    finally:
+        await store.close()
@@ -0,0 +1,97 @@
+import base64
+import os
+from typing import List
+
+import pytest
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs.compression import compress_body
+from pydantic_sqs.compression import COMPRESSION_ATTRIBUTE
+from pydantic_sqs.compression import decompress_body
+from pydantic_sqs.compression import get_compressor
+
+
+@pytest.mark.parametrize("name", ["zlib", "zstd", "lz4"])
+def test_compressors(name):
+    try:
+        compressor = get_compressor(name)
+    except ImportError:
+        pytest.skip(f"{name} is not installed")
+    body = '{"values":[' + ",".join(str(i % 7) for i in range(5000)) + "]}"
+
+    compressed, used = compress_body(body, compressor, threshold=1024)
+    assert used == name
+    assert len(compressed) < len(body)
+    assert decompress_body(compressed, compressor) == body
+
+    with pytest.raises(ValueError):
+        decompress_body("bm90IGNvbXByZXNzZWQ=", compressor)
+
+
+def test_compress_body_size_decision():
+    compressor = get_compressor("zlib")
+    small = '{"test":1}'
+    assert compress_body(small, compressor, threshold=1024) == (small, None)
+
+    incompressible = base64.b64encode(os.urandom(3000)).decode("ascii")
+    assert compress_body(incompressible, compressor, threshold=1024) == (incompressible, None)
+
+
+def test_get_compressor():
+    with pytest.raises(ValueError):
+        get_compressor("rar")
+    with pytest.raises(ValueError):
+        SQSQueue("https://example.com/queue", compression="rar")
+
+
+def test_send_entry_compression():
+    class ThisModel(SQSModel):
+        values: List[int]
+
+    queue = SQSQueue("https://example.com/queue", compression="zlib", compression_threshold=1024)
+    queue.register_model(ThisModel)
+
+    assert COMPRESSION_ATTRIBUTE not in ThisModel(values=[1])._send_entry()["MessageAttributes"]
+    entry = ThisModel(values=[1] * 2000)._send_entry()
+    assert entry["MessageAttributes"][COMPRESSION_ATTRIBUTE] == {"DataType": "String", "StringValue": "zlib"}
+    assert len(entry["MessageBody"]) < 1024
+
+
+@pytest.mark.asyncio
+async def test_compressed_round_trip(localstack_queue):
+    class ThisModel(SQSModel):
+        test: int
+        values: List[int]
+
+    queue = localstack_queue[0]
+    queue.compression = "zlib"
+    queue.compression_threshold = 1024
+    queue.register_model(ThisModel)
+
+    await ThisModel(test=1, values=[1]).to_sqs()
+    await ThisModel(test=2, values=list(range(100)) * 100).to_sqs()
+    await ThisModel.to_sqs_batch([ThisModel(test=3, values=[3] * 10000)])
+
+    received = []
+    while len(received) < 3:
+        received.extend(await queue.from_sqs(max_messages=10, wait_time_seconds=1))
+    by_test = {model.test: model for model in received}
+    assert by_test[1].values == [1]
+    assert by_test[2].values == list(range(100)) * 100
+    assert by_test[3].values == [3] * 10000
+
+
+@pytest.mark.asyncio
+async def test_bad_compressed_message_in_queue(localstack_queue):
+    from pydantic_sqs.exceptions import InvalidMessageInQueueError
+
+    queue, session, client_kwargs = localstack_queue
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.send_message(
+            QueueUrl=queue.queue_url,
+            MessageBody="not compressed",
+            MessageAttributes={COMPRESSION_ATTRIBUTE: {"DataType": "String", "StringValue": "zlib"}},
+        )
+
+    with pytest.raises(InvalidMessageInQueueError):
+        await queue.from_sqs(wait_time_seconds=1)
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+from pydantic_sqs import SQSEnvelope
+from pydantic_sqs import SQSModel
+from pydantic_sqs.demux import Demultiplexer
+
+
+class Parked:
+    def __init__(self, deadline, deleted=False):
+        self._visibility_deadline = deadline
+        self.deleted = deleted
+
+
+def test_demultiplexer():
+    class ThisModel(SQSModel):
+        test: str
+
+    class ThatModel(SQSModel):
+        test: str
+
+    demux = Demultiplexer(max_messages=3)
+    later = time.monotonic() + 60
+    first, second, third = Parked(later), Parked(later), Parked(later)
+    assert demux.park(first, ThisModel)
+    assert demux.park(second, ThatModel)
+    assert demux.park(third, ThisModel)
+    assert not demux.park(Parked(later), ThisModel)
+    assert len(demux) == 3
+
+    assert demux.take(ThisModel, 1) == [first]
+    assert demux.take(ThisModel, 5) == [third]
+    assert demux.take(ThisModel, 5) == []
+    assert demux.drain() == [second]
+    assert len(demux) == 0
+
+
+def test_demultiplexer_expiry():
+    class ThisModel(SQSModel):
+        test: str
+
+    demux = Demultiplexer(max_messages=2)
+    assert demux.park(Parked(time.monotonic()), ThisModel)
+    assert demux.park(Parked(time.monotonic() + 60, deleted=True), ThisModel)
+    kept = Parked(time.monotonic() + 60)
+    assert demux.park(kept, ThisModel)
+    assert demux.take(None, 5) == [kept]
+
+
+@pytest.mark.asyncio
+async def test_from_sqs_parks_other_models(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    class ThatModel(SQSModel):
+        name: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    queue.register_model(ThatModel)
+    await queue.send_batch([ThisModel(test="foo"), ThatModel(name="bar")])
+
+    this = []
+    while not this:
+        this = await ThisModel.from_sqs(max_messages=10, wait_time_seconds=1)
+    assert [model.test for model in this] == ["foo"]
+
+    start = time.monotonic()
+    that = await ThatModel.from_sqs(max_messages=1, wait_time_seconds=10)
+    assert time.monotonic() - start < 5
+    assert [model.name for model in that] == ["bar"]
+    assert len(queue.demux) == 0
+    await that[0].delete_from_queue()
+
+
+@pytest.mark.asyncio
+async def test_release_parked(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    class ThatModel(SQSModel):
+        name: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    queue.register_model(ThatModel)
+    await ThatModel(name="bar").to_sqs()
+
+    while not len(queue.demux):
+        assert await ThisModel.from_sqs(max_messages=10, wait_time_seconds=1) == []
+    result = await queue.release_parked()
+    assert result.ok
+    assert isinstance(result.successful[0], SQSEnvelope)
+    assert len(queue.demux) == 0
+
+    received = await queue.from_sqs(wait_time_seconds=1, ignore_empty=True)
+    assert [model.name for model in received] == ["bar"]
+
+
+@pytest.mark.asyncio
+async def test_overflow_is_released(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    class ThatModel(SQSModel):
+        name: str
+
+    queue = localstack_queue[0]
+    queue.demux_max_messages = 1
+    queue.register_model(ThisModel)
+    queue.register_model(ThatModel)
+    await ThatModel.to_sqs_batch([ThatModel(name="one"), ThatModel(name="two")])
+
+    received = []
+    while len(received) < 2:
+        await ThisModel.from_sqs(max_messages=10, wait_time_seconds=1)
+        assert len(queue.demux) == 1
+        received.extend(await ThatModel.from_sqs(max_messages=10, wait_time_seconds=1))
+    assert sorted(model.name for model in received) == ["one", "two"]
@@ -0,0 +1,157 @@
+import pytest
+from pydantic_sqs import MemoryBlobStore
+from pydantic_sqs import SQSEnvelope
+from pydantic_sqs import SQSModel
+from pydantic_sqs.exceptions import InvalidMessageInQueueError
+from pydantic_sqs.exceptions import MessageNotInQueueError
+from pydantic_sqs.serialization import ModelDecoder
+from pydantic_sqs.serialization import MODEL_ATTRIBUTE
+
+
+class CountingDecoder(ModelDecoder):
+    def __init__(self, model_class):
+        super().__init__(model_class)
+        self.decoded = 0
+
+    def decode(self, *args, **kwargs):
+        self.decoded += 1
+        return super().decode(*args, **kwargs)
+
+
+async def receive(queue, count, **kwargs):
+    received = []
+    while len(received) < count:
+        received.extend(await queue.from_sqs(max_messages=10, wait_time_seconds=1, ignore_empty=True, **kwargs))
+    return received
+
+
+@pytest.mark.asyncio
+async def test_lazy_from_sqs(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    decoder = queue._decoders[ThisModel] = CountingDecoder(ThisModel)
+
+    sent = ThisModel(test="test")
+    await sent.to_sqs()
+    envelope = (await receive(queue, 1, lazy=True))[0]
+    assert isinstance(envelope, SQSEnvelope)
+    assert envelope.message_id == sent.message_id
+    assert envelope.receipt_handle is not None
+    assert envelope.model_class is ThisModel
+    assert not envelope.hydrated
+    assert decoder.decoded == 0
+
+    model = await envelope.hydrate()
+    assert await envelope.hydrate() is model
+    assert decoder.decoded == 1
+    assert model.test == "test"
+    assert model.message_id == sent.message_id
+    assert model._visibility_deadline == envelope._visibility_deadline
+
+    await envelope.delete_from_queue()
+    assert model.deleted
+    assert envelope.deleted
+    assert await queue.from_sqs(wait_time_seconds=1, ignore_empty=True) == []
+
+
+@pytest.mark.asyncio
+async def test_lazy_delete_without_decoding(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    store = MemoryBlobStore()
+    queue = localstack_queue[0]
+    queue.blob_store = store
+    queue.claim_check_threshold = 1024
+    queue.register_model(ThisModel)
+    decoder = queue._decoders[ThisModel] = CountingDecoder(ThisModel)
+
+    await ThisModel(test="x" * 2048).to_sqs()
+    envelope = (await receive(queue, 1, lazy=True))[0]
+    assert envelope._claim_check in store.blobs
+
+    await envelope.delete_from_queue()
+    assert envelope.deleted
+    assert decoder.decoded == 0
+    assert len(store) == 0
+    with pytest.raises(MessageNotInQueueError):
+        await envelope.delete_from_queue()
+    assert await queue.from_sqs(wait_time_seconds=1, ignore_empty=True) == []
+
+
+@pytest.mark.asyncio
+async def test_lazy_fetches_claim_check_on_hydrate(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    class CountingStore(MemoryBlobStore):
+        fetched = 0
+
+        async def get(self, key):
+            self.fetched += 1
+            return await super().get(key)
+
+    store = CountingStore()
+    queue = localstack_queue[0]
+    queue.blob_store = store
+    queue.claim_check_threshold = 1024
+    queue.register_model(ThisModel)
+
+    await ThisModel(test="x" * 2048).to_sqs()
+    envelope = (await receive(queue, 1, lazy=True))[0]
+    assert store.fetched == 0
+    model = await envelope.hydrate()
+    assert store.fetched == 1
+    assert model.test == "x" * 2048
+    assert model._claim_check == envelope._claim_check
+
+
+@pytest.mark.asyncio
+async def test_lazy_invalid_message(localstack_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, session, client_kwargs = localstack_queue
+    queue.register_model(ThisModel)
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.send_message(
+            QueueUrl=queue.queue_url,
+            MessageBody="not json",
+            MessageAttributes={
+                MODEL_ATTRIBUTE: {"DataType": "String", "StringValue": ThisModel.__qualname__.lower()},
+            },
+        )
+
+    envelope = (await receive(queue, 1, lazy=True))[0]
+    assert envelope.body == "not json"
+    with pytest.raises(InvalidMessageInQueueError):
+        await envelope.hydrate()
+
+    await envelope.release()
+    again = (await receive(queue, 1, lazy=True))[0]
+    assert again.message_id == envelope.message_id
+
+
+@pytest.mark.asyncio
+async def test_lazy_heartbeat_moves_to_model(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.heartbeat_seconds = 30
+    queue.register_model(ThisModel)
+
+    await ThisModel(test="test").to_sqs()
+    envelope = (await receive(queue, 1, lazy=True))[0]
+    assert envelope in queue.leases
+
+    model = await envelope.hydrate()
+    assert envelope not in queue.leases
+    assert model in queue.leases
+
+    result = await queue.change_visibility_batch([envelope], visibility_timeout=10)
+    assert result.ok
+    await queue.close()
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from pydantic_sqs import MemoryBlobStore
+from pydantic_sqs import MemoryTransport
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs import Worker
+
+
+@pytest_asyncio.fixture(name="fifo_queue")
+async def create_fifo_queue():
+    transport = MemoryTransport()
+    response = await transport.create_queue(QueueName="test.fifo", Attributes={"FifoQueue": "true"})
+    yield SQSQueue(response["QueueUrl"], transport=transport)
+
+
+def test_fifo_register_model(memory_queue, fifo_queue):
+    class ThisModel(SQSModel):
+        account: str
+
+    queue, transport = memory_queue
+    assert not queue.fifo
+    assert fifo_queue.fifo
+    with pytest.raises(ValueError):
+        queue.register_model(ThisModel, group_id="account")
+    with pytest.raises(ValueError):
+        fifo_queue.register_model(ThisModel, group_id="missing")
+    with pytest.raises(ValueError):
+        fifo_queue.register_model(ThisModel, group_id="account", deduplication_id=1)
+    assert ThisModel.__qualname__.lower() not in fifo_queue.models
+
+
+@pytest.mark.asyncio
+async def test_fifo_send_ids(fifo_queue):
+    class Grouped(SQSModel):
+        account: str
+        sequence: int
+
+    class Ungrouped(SQSModel):
+        test: str
+
+    fifo_queue.register_model(Grouped, group_id="account", deduplication_id=lambda model: f"{model.sequence}")
+    fifo_queue.register_model(Ungrouped)
+
+    entry = Grouped(account="a", sequence=1)._send_entry()
+    assert entry["MessageGroupId"] == "a"
+    assert entry["MessageDeduplicationId"] == "1"
+    with pytest.raises(ValueError):
+        await Ungrouped(test="no group").to_sqs()
+
+    await Grouped(account="a", sequence=1).to_sqs()
+    result = await fifo_queue.send_batch([Grouped(account="a", sequence=index) for index in range(12)])
+    assert result.ok
+
+    received = []
+    while True:
+        models = await fifo_queue.from_sqs(max_messages=10, ignore_empty=True)
+        if not models:
+            break
+        assert {model.attributes["MessageGroupId"] for model in models} == {"a"}
+        received.extend(model.sequence for model in models)
+        await fifo_queue.delete_batch(models)
+    # sequence 1 was deduplicated
+    assert received == [1, 0] + list(range(2, 12))
+
+
+@pytest.mark.asyncio
+async def test_fifo_worker_group_lanes(fifo_queue):
+    class ThisModel(SQSModel):
+        account: str
+        sequence: int
+
+    fifo_queue.register_model(ThisModel, group_id="account", deduplication_id=lambda model: model.json())
+    running = set()
+    overlapping_groups = 0
+    handled = {}
+
+    @fifo_queue.handler(ThisModel)
+    async def handle(message):
+        nonlocal overlapping_groups
+        assert message.account not in running
+        running.add(message.account)
+        overlapping_groups = max(overlapping_groups, len(running))
+        await asyncio.sleep(0.01)
+        running.discard(message.account)
+        handled.setdefault(message.account, []).append(message.sequence)
+
+    await fifo_queue.send_batch(
+        [ThisModel(account=account, sequence=index) for index in range(10) for account in ("a", "b", "c")]
+    )
+    assert Worker(fifo_queue).group_lanes
+    consume = asyncio.ensure_future(
+        fifo_queue.consume(max_in_flight=30, wait_time_seconds=1, visibility_timeout=30, group_lanes=True)
+    )
+    while sum(map(len, handled.values())) < 30:
+        await asyncio.sleep(0.01)
+    consume.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consume
+
+    assert handled == {account: list(range(10)) for account in ("a", "b", "c")}
+    assert overlapping_groups > 1
+
+
+@pytest.mark.asyncio
+async def test_fifo_worker_failure_keeps_order(fifo_queue):
+    class ThisModel(SQSModel):
+        account: str
+        sequence: int
+
+    fifo_queue.register_model(ThisModel, group_id="account", deduplication_id="sequence")
+    handled = []
+    failed = []
+
+    @fifo_queue.handler(ThisModel)
+    async def handle(message):
+        handled.append(message.sequence)
+        if message.sequence == 2 and not failed:
+            failed.append(message.sequence)
+            raise ValueError("failed once")
+
+    await fifo_queue.send_batch([ThisModel(account="a", sequence=index) for index in range(5)])
+    worker = Worker(fifo_queue, max_in_flight=10, wait_time_seconds=1, visibility_timeout=1)
+    run = asyncio.ensure_future(worker.run())
+    while handled[-1:] != [4]:
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await run
+
+    assert handled == [0, 1, 2, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_fifo_claim_check_needs_deduplication_id(fifo_queue):
+    class Grouped(SQSModel):
+        account: str
+        payload: str
+
+    class Deduplicated(SQSModel):
+        account: str
+        payload: str
+
+    async with fifo_queue.client() as client:
+        await client.set_queue_attributes(
+            QueueUrl=fifo_queue.queue_url, Attributes={"ContentBasedDeduplication": "true"}
+        )
+    fifo_queue.blob_store = MemoryBlobStore()
+    fifo_queue.claim_check_threshold = 1000
+    fifo_queue.register_model(Grouped, group_id="account")
+    fifo_queue.register_model(Deduplicated, group_id="account", deduplication_id="payload")
+
+    await Grouped(account="a", payload="small").to_sqs()
+    with pytest.raises(ValueError):
+        await Grouped(account="a", payload="x" * 2000).to_sqs()
+    with pytest.raises(ValueError):
+        await fifo_queue.send_batch([Grouped(account="a", payload="x" * 2000)])
+
+    await Deduplicated(account="a", payload="x" * 2000).to_sqs()
+    received = await fifo_queue.from_sqs(max_messages=10, wait_time_seconds=1)
+    assert [model.payload for model in received] == ["small", "x" * 2000]
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+from pydantic_sqs import MemoryMetrics
+from pydantic_sqs import SQSModel
+from pydantic_sqs import metrics as sqs_metrics
+from pydantic_sqs.latency import SENT_AT_ATTRIBUTE
+from pydantic_sqs.latency import TRACE_ID_ATTRIBUTE
+
+
+@pytest.mark.asyncio
+async def test_latency_tracking(memory_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, transport = memory_queue
+    queue.track_latency = True
+    metrics = queue.metrics = MemoryMetrics()
+    queue.register_model(ThisModel)
+
+    sent = ThisModel(test=1)
+    before = time.time()
+    await sent.to_sqs()
+    await ThisModel.to_sqs_batch([ThisModel(test=2)])
+    assert sent.message_trace_id is not None
+
+    received = await queue.from_sqs(max_messages=10)
+    assert [model.test for model in received] == [1, 2]
+    first = received[0]
+    assert first.message_trace_id == sent.message_trace_id
+    assert received[1].message_trace_id not in (None, sent.message_trace_id)
+    assert before <= first.message_sent_at <= time.time()
+    assert first.message_dwell_seconds >= 0
+    assert set(first.attributes) == {"SentTimestamp"}
+
+    await first.delete_from_queue()
+    await queue.delete_batch(received[1:])
+    tags = {"queue": "test", "model": ThisModel.__qualname__}
+    assert len(metrics.values(sqs_metrics.DWELL_SECONDS, **tags)) == 2
+    acks = metrics.values(sqs_metrics.ACK_SECONDS, **tags)
+    end_to_end = metrics.values(sqs_metrics.END_TO_END_SECONDS, **tags)
+    assert len(acks) == len(end_to_end) == 2
+    assert all(total >= ack for ack, total in zip(acks, end_to_end))
+
+    reply = ThisModel(test=3).continue_trace(first)
+    await reply.to_sqs()
+    envelope = (await queue.from_sqs(lazy=True))[0]
+    assert envelope.message_trace_id == first.message_trace_id
+    assert envelope.message_dwell_seconds is not None
+    model = await envelope.hydrate()
+    assert model.message_trace_id == first.message_trace_id
+    assert model.message_dwell_seconds == envelope.message_dwell_seconds
+
+
+@pytest.mark.asyncio
+async def test_latency_without_stamps(memory_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, transport = memory_queue
+    queue.register_model(ThisModel)
+
+    await ThisModel(test=1).to_sqs()
+    received = (await queue.from_sqs())[0]
+    assert received.message_trace_id is None
+    assert received.message_sent_at is None
+    assert received.attributes is None
+
+    queue.track_latency = True
+    entry = ThisModel(test=2)._send_entry()
+    assert {SENT_AT_ATTRIBUTE, TRACE_ID_ATTRIBUTE} <= set(entry["MessageAttributes"])
+    del entry["MessageAttributes"][SENT_AT_ATTRIBUTE]
+    async with queue.client() as client:
+        await client.send_message(QueueUrl=queue.queue_url, **entry)
+    received = (await queue.from_sqs())[0]
+    assert received.message_sent_at == int(received.attributes["SentTimestamp"]) / 1000
+    assert received.message_dwell_seconds >= 0
@@ -0,0 +1,186 @@
+import asyncio
+import time
+
+import pytest
+from pydantic_sqs import BatchFailure
+from pydantic_sqs import BatchResult
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs import lease
+from pydantic_sqs.lease import LeaseManager
+
+
+class RecordingQueue:
+    """A stand-in queue that records visibility changes"""
+
+    queue_url = "http://testurl"
+
+    def __init__(self):
+        self.changes = []
+
+    async def change_visibility_batch(self, models, visibility_timeout):
+        self.changes.append((list(models), visibility_timeout))
+        for model in models:
+            model._visibility_deadline = time.monotonic() + visibility_timeout
+        return BatchResult(successful=list(models))
+
+
+class FlakyQueue(RecordingQueue):
+    """A stand-in queue whose first visibility change fails the way a dropped request does"""
+
+    async def change_visibility_batch(self, models, visibility_timeout):
+        if not self.changes:
+            self.changes.append(([], visibility_timeout))
+            return BatchResult(failed=[BatchFailure(model=model, code="ClientOSError") for model in models])
+        return await super().change_visibility_batch(models, visibility_timeout)
+
+
+def received_model(visibility_timeout):
+    class ThisModel(SQSModel):
+        test: str
+
+    model = ThisModel(test="test", receipt_handle="handle")
+    model._received_at = time.monotonic()
+    model._visibility_deadline = model._received_at + visibility_timeout
+    return model
+
+
+@pytest.mark.asyncio
+async def test_lease_extends_until_deleted():
+    queue = RecordingQueue()
+    leases = LeaseManager(queue, extension=2)
+    model = received_model(visibility_timeout=0.5)
+
+    leases.track(model)
+    await asyncio.sleep(0.1)
+    assert len(queue.changes) == 1
+    assert queue.changes[0] == ([model], 2)
+    assert model in leases
+
+    model.deleted = True
+    leases._changed.set()
+    await asyncio.sleep(0.1)
+    assert len(leases) == 0
+    assert len(queue.changes) == 1
+
+
+@pytest.mark.asyncio
+async def test_lease_max_lifetime():
+    queue = RecordingQueue()
+    leases = LeaseManager(queue, extension=2, max_lifetime=1)
+    model = received_model(visibility_timeout=0.5)
+
+    leases.track(model)
+    await asyncio.sleep(0.1)
+    assert queue.changes == []
+    assert len(leases) == 0
+
+
+@pytest.mark.asyncio
+async def test_lease_untrack():
+    queue = RecordingQueue()
+    leases = LeaseManager(queue, extension=30)
+    model = received_model(visibility_timeout=30)
+
+    leases.track(model)
+    leases.untrack(model)
+    await asyncio.sleep(0.05)
+    assert model not in leases
+    await leases.stop()
+    assert queue.changes == []
+
+
+@pytest.mark.asyncio
+async def test_lease_retries_transient_failure(monkeypatch):
+    monkeypatch.setattr(lease, "HEARTBEAT_ERROR_BACKOFF", 0.1)
+    queue = FlakyQueue()
+    leases = LeaseManager(queue, extension=2)
+    model = received_model(visibility_timeout=0.5)
+
+    leases.track(model)
+    await asyncio.sleep(0.05)
+    assert len(queue.changes) == 1
+    assert model in leases
+    await asyncio.sleep(0.1)
+    assert len(queue.changes) == 2
+    assert queue.changes[1] == ([model], 2)
+    assert leases.extensions == 1
+    await leases.stop()
+
+
+@pytest.mark.asyncio
+async def test_lease_untracks_sender_fault():
+    class ExpiredQueue(RecordingQueue):
+        async def change_visibility_batch(self, models, visibility_timeout):
+            self.changes.append((list(models), visibility_timeout))
+            failures = [
+                BatchFailure(model=model, code="ReceiptHandleIsInvalid", sender_fault=True) for model in models
+            ]
+            return BatchResult(failed=failures)
+
+    queue = ExpiredQueue()
+    leases = LeaseManager(queue, extension=2)
+    model = received_model(visibility_timeout=0.5)
+
+    leases.track(model)
+    await asyncio.sleep(0.05)
+    assert len(queue.changes) == 1
+    assert model not in leases
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_message_invisible(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.heartbeat_seconds = 2
+    queue.register_model(ThisModel)
+    await ThisModel(test="test").to_sqs()
+
+    received = await queue.from_sqs(visibility_timeout=1)
+    assert received[0] in queue.leases
+    await asyncio.sleep(2)
+    assert await queue.from_sqs(ignore_empty=True) == []
+    assert queue.leases.extensions > 0
+
+    await received[0].delete_from_queue()
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_release(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.heartbeat_seconds = 30
+    queue.register_model(ThisModel)
+    await ThisModel(test="test").to_sqs()
+
+    received = await queue.from_sqs(visibility_timeout=30)
+    await received[0].release()
+    assert received[0] not in queue.leases
+
+    redelivered = await queue.from_sqs()
+    assert redelivered[0].message_id == received[0].message_id
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_deadline_uses_queue_visibility_timeout(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue, session, client_kwargs = localstack_queue
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.set_queue_attributes(QueueUrl=queue.queue_url, Attributes={"VisibilityTimeout": "2"})
+    queue = SQSQueue(queue.queue_url, endpoint_url=queue.endpoint_url, use_ssl=False, heartbeat_seconds=30)
+    queue.register_model(ThisModel)
+    await ThisModel(test="test").to_sqs()
+
+    before = time.monotonic()
+    received = (await queue.from_sqs())[0]
+    assert before + 2 <= received._visibility_deadline <= time.monotonic() + 2
+    await received.delete_from_queue()
+    await queue.close()
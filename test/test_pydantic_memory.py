@@ -0,0 +1,212 @@
+import asyncio
+import json
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from pydantic_sqs import MemoryTransport
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs import Transport
+
+
+def error_code(exc_info):
+    return exc_info.value.response["Error"]["Code"]
+
+
+async def queue_depth(transport, queue_url):
+    response = await transport.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"])
+    attributes = response["Attributes"]
+    return (
+        int(attributes["ApproximateNumberOfMessages"]),
+        int(attributes["ApproximateNumberOfMessagesNotVisible"]),
+        int(attributes["ApproximateNumberOfMessagesDelayed"]),
+    )
+
+
+def test_transport_is_abstract():
+    class IncompleteTransport(Transport):
+        async def acquire(self, queue):
+            return self, None
+
+    with pytest.raises(TypeError):
+        Transport()
+    with pytest.raises(TypeError):
+        IncompleteTransport()
+
+
+@pytest.mark.asyncio
+async def test_memory_round_trip(memory_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue, transport = memory_queue
+    queue.register_model(ThisModel)
+
+    await ThisModel(test="one").to_sqs()
+    await ThisModel.to_sqs_batch([ThisModel(test="two"), ThisModel(test="three")])
+    assert await queue_depth(transport, queue.queue_url) == (3, 0, 0)
+
+    async with queue:
+        received = await queue.from_sqs(max_messages=10)
+        assert [model.test for model in received] == ["one", "two", "three"]
+        assert await queue_depth(transport, queue.queue_url) == (0, 3, 0)
+        await received[0].delete_from_queue()
+        result = await queue.delete_batch(received[1:])
+    assert result.ok
+    assert await queue_depth(transport, queue.queue_url) == (0, 0, 0)
+    assert await queue.from_sqs(ignore_empty=True) == []
+
+
+@pytest.mark.asyncio
+async def test_memory_visibility_and_receive_count(memory_queue):
+    queue, transport = memory_queue
+    await transport.send_message(QueueUrl=queue.queue_url, MessageBody="body")
+
+    first = (await transport.receive_message(QueueUrl=queue.queue_url, AttributeNames=["All"]))["Messages"][0]
+    assert first["Attributes"]["ApproximateReceiveCount"] == "1"
+    assert await transport.receive_message(QueueUrl=queue.queue_url) == {}
+
+    await transport.change_message_visibility(
+        QueueUrl=queue.queue_url, ReceiptHandle=first["ReceiptHandle"], VisibilityTimeout=0
+    )
+    with pytest.raises(ClientError) as exc_info:
+        await transport.change_message_visibility(
+            QueueUrl=queue.queue_url, ReceiptHandle=first["ReceiptHandle"], VisibilityTimeout=10
+        )
+    assert error_code(exc_info) == "MessageNotInflight"
+
+    second = (
+        await transport.receive_message(
+            QueueUrl=queue.queue_url, VisibilityTimeout=1, MessageSystemAttributeNames=["ApproximateReceiveCount"]
+        )
+    )["Messages"][0]
+    assert second["MessageId"] == first["MessageId"]
+    assert second["ReceiptHandle"] != first["ReceiptHandle"]
+    assert second["Attributes"] == {"ApproximateReceiveCount": "2"}
+
+    start = time.monotonic()
+    third = await transport.receive_message(QueueUrl=queue.queue_url, WaitTimeSeconds=5)
+    assert 0.5 < time.monotonic() - start < 3
+    assert third["Messages"][0]["MessageId"] == first["MessageId"]
+
+    with pytest.raises(ClientError) as exc_info:
+        await transport.delete_message(QueueUrl=queue.queue_url, ReceiptHandle="not a receipt handle")
+    assert error_code(exc_info) == "ReceiptHandleIsInvalid"
+    await transport.delete_message(QueueUrl=queue.queue_url, ReceiptHandle=first["ReceiptHandle"])
+    await transport.delete_message(QueueUrl=queue.queue_url, ReceiptHandle=third["Messages"][0]["ReceiptHandle"])
+    assert await queue_depth(transport, queue.queue_url) == (0, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_memory_delay_and_long_poll(memory_queue):
+    queue, transport = memory_queue
+    await transport.send_message(QueueUrl=queue.queue_url, MessageBody="delayed", DelaySeconds=1)
+    assert await queue_depth(transport, queue.queue_url) == (0, 0, 1)
+    assert await transport.receive_message(QueueUrl=queue.queue_url) == {}
+
+    start = time.monotonic()
+    received = await transport.receive_message(QueueUrl=queue.queue_url, WaitTimeSeconds=5)
+    assert 0.5 < time.monotonic() - start < 3
+    assert received["Messages"][0]["Body"] == "delayed"
+
+    async def send_later():
+        await asyncio.sleep(0.05)
+        await transport.send_message(QueueUrl=queue.queue_url, MessageBody="later")
+
+    start = time.monotonic()
+    sending = asyncio.ensure_future(send_later())
+    received = await transport.receive_message(QueueUrl=queue.queue_url, WaitTimeSeconds=5)
+    await sending
+    assert time.monotonic() - start < 1
+    assert received["Messages"][0]["Body"] == "later"
+
+
+@pytest.mark.asyncio
+async def test_memory_batch_limits(memory_queue):
+    queue, transport = memory_queue
+    entries = [{"Id": str(index), "MessageBody": "body"} for index in range(11)]
+    with pytest.raises(ClientError) as exc_info:
+        await transport.send_message_batch(QueueUrl=queue.queue_url, Entries=entries)
+    assert error_code(exc_info) == "AWS.SimpleQueueService.TooManyEntriesInBatchRequest"
+
+    with pytest.raises(ClientError) as exc_info:
+        await transport.send_message_batch(QueueUrl=queue.queue_url, Entries=[entries[0], entries[0]])
+    assert error_code(exc_info) == "AWS.SimpleQueueService.BatchEntryIdsNotDistinct"
+
+    large = [{"Id": str(index), "MessageBody": "x" * 100000} for index in range(3)]
+    with pytest.raises(ClientError) as exc_info:
+        await transport.send_message_batch(QueueUrl=queue.queue_url, Entries=large)
+    assert error_code(exc_info) == "AWS.SimpleQueueService.BatchRequestTooLong"
+
+    response = await transport.send_message_batch(
+        QueueUrl=queue.queue_url,
+        Entries=[{"Id": "ok", "MessageBody": "body"}, {"Id": "empty", "MessageBody": ""}],
+    )
+    assert [result["Id"] for result in response["Successful"]] == ["ok"]
+    assert response["Failed"][0]["Id"] == "empty"
+    assert response["Failed"][0]["SenderFault"] is True
+
+
+@pytest.mark.asyncio
+async def test_memory_fifo_groups():
+    transport = MemoryTransport()
+    queue_url = (
+        await transport.create_queue(
+            QueueName="test.fifo", Attributes={"FifoQueue": "true", "ContentBasedDeduplication": "true"}
+        )
+    )["QueueUrl"]
+
+    async def send(body, group):
+        return await transport.send_message(QueueUrl=queue_url, MessageBody=body, MessageGroupId=group)
+
+    async def receive(count=1):
+        response = await transport.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=count)
+        return response.get("Messages", [])
+
+    first = await send("a1", "a")
+    await send("a2", "a")
+    await send("b1", "b")
+    assert (await send("a1", "a"))["MessageId"] == first["MessageId"]
+    with pytest.raises(ClientError) as exc_info:
+        await transport.send_message(QueueUrl=queue_url, MessageBody="no group")
+    assert error_code(exc_info) == "MissingParameter"
+
+    a1 = await receive()
+    assert [message["Body"] for message in a1] == ["a1"]
+    b1 = await receive(10)
+    assert [message["Body"] for message in b1] == ["b1"]
+    assert await receive(10) == []
+
+    await transport.delete_message(QueueUrl=queue_url, ReceiptHandle=a1[0]["ReceiptHandle"])
+    assert [message["Body"] for message in await receive(10)] == ["a2"]
+
+
+@pytest.mark.asyncio
+async def test_memory_redrive_policy():
+    transport = MemoryTransport()
+    dead_letter_url = (await transport.create_queue(QueueName="dead-letter"))["QueueUrl"]
+    dead_letter_arn = (
+        await transport.get_queue_attributes(QueueUrl=dead_letter_url, AttributeNames=["QueueArn"])
+    )["Attributes"]["QueueArn"]
+    queue_url = (
+        await transport.create_queue(
+            QueueName="source",
+            Attributes={"RedrivePolicy": json.dumps({"deadLetterTargetArn": dead_letter_arn, "maxReceiveCount": 1})},
+        )
+    )["QueueUrl"]
+
+    await transport.send_message(QueueUrl=queue_url, MessageBody="poison")
+    received = (await transport.receive_message(QueueUrl=queue_url, VisibilityTimeout=0))["Messages"][0]
+    assert await transport.receive_message(QueueUrl=queue_url) == {}
+    dead = (await transport.receive_message(QueueUrl=dead_letter_url))["Messages"][0]
+    assert dead["MessageId"] == received["MessageId"]
+
+
+@pytest.mark.asyncio
+async def test_memory_unknown_queue():
+    transport = MemoryTransport()
+    queue = SQSQueue("memory://us-east-1/000000000000/missing", transport=transport)
+    with pytest.raises(ClientError) as exc_info:
+        await queue.from_sqs()
+    assert error_code(exc_info) == "AWS.SimpleQueueService.NonExistentQueue"
@@ -0,0 +1,140 @@
+import asyncio
+import socket
+
+import pytest
+from botocore.exceptions import ClientError
+from pydantic_sqs import MemoryMetrics
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs import StatsDMetrics
+from pydantic_sqs import Worker
+from pydantic_sqs import metrics as sqs_metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics_queue_calls(memory_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue, transport = memory_queue
+    metrics = queue.metrics = MemoryMetrics()
+    queue.register_model(ThisModel)
+
+    await ThisModel(test="one").to_sqs()
+    await ThisModel.to_sqs_batch([ThisModel(test="two"), ThisModel(test="three")])
+    received = await queue.from_sqs(max_messages=10)
+    assert await queue.from_sqs(ignore_empty=True) == []
+    await received[0].delete_from_queue()
+    await queue.delete_batch(received[1:])
+
+    assert metrics.values(sqs_metrics.MESSAGES_PER_CALL, operation="send_message") == [1]
+    assert metrics.values(sqs_metrics.MESSAGES_PER_CALL, operation="send_message_batch") == [2]
+    assert metrics.values(sqs_metrics.BATCH_FILL_RATIO, operation="send_message_batch") == [0.2]
+    assert metrics.values(sqs_metrics.MESSAGES_PER_CALL, operation="receive_message") == [3, 0]
+    assert metrics.values(sqs_metrics.BATCH_FILL_RATIO, operation="receive_message") == [0.3, 0]
+    assert metrics.values(sqs_metrics.MESSAGES_PER_CALL, operation="delete_message_batch") == [2]
+    assert metrics.counter(sqs_metrics.EMPTY_RECEIVES, queue="test") == 1
+    assert metrics.counter(sqs_metrics.BYTES_SENT) == metrics.counter(sqs_metrics.BYTES_RECEIVED) > 0
+    assert len(metrics.values(sqs_metrics.CALL_SECONDS, queue="test")) == 6
+    assert len(metrics.values(sqs_metrics.DECODE_SECONDS, model=ThisModel.__qualname__)) == 3
+    assert metrics.counter(sqs_metrics.CALL_ERRORS) == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_errors(memory_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, transport = memory_queue
+    metrics = queue.metrics = MemoryMetrics()
+    queue.register_model(ThisModel)
+
+    invalid = ThisModel(test=1)._send_entry()
+    invalid["MessageBody"] = invalid["MessageBody"].replace("1", '"not an int"')
+    async with queue.client() as client:
+        await client.send_message_batch(
+            QueueUrl=queue.queue_url,
+            Entries=[dict(invalid, Id="invalid"), {"Id": "empty", "MessageBody": ""}],
+        )
+    assert metrics.counter(sqs_metrics.BATCH_ENTRY_ERRORS, operation="send_message_batch") == 1
+    assert await queue.from_sqs(max_messages=10, model_class=ThisModel, ignore_unknown=True) == []
+    assert metrics.counter(sqs_metrics.DECODE_ERRORS, model=ThisModel.__qualname__) == 1
+
+    missing = SQSQueue("memory://us-east-1/000000000000/missing", transport=transport, metrics=metrics)
+    with pytest.raises(ClientError):
+        await missing.from_sqs()
+    assert (
+        metrics.counter(
+            sqs_metrics.CALL_ERRORS,
+            queue="missing",
+            operation="receive_message",
+            error="AWS.SimpleQueueService.NonExistentQueue",
+        )
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_metrics_worker_handlers(memory_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, transport = memory_queue
+    metrics = queue.metrics = MemoryMetrics()
+    queue.register_model(ThisModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        handled.append(message.test)
+        if message.test == 2:
+            raise ValueError("failed")
+
+    await ThisModel.to_sqs_batch([ThisModel(test=1), ThisModel(test=2)])
+    worker = Worker(queue, wait_time_seconds=1, visibility_timeout=30)
+    running = asyncio.ensure_future(worker.run())
+    while len(handled) < 2:
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await running
+
+    assert len(metrics.values(sqs_metrics.HANDLER_SECONDS, model=ThisModel.__qualname__, outcome="ok")) == 1
+    assert len(metrics.values(sqs_metrics.HANDLER_SECONDS, model=ThisModel.__qualname__, outcome="error")) == 1
+
+
+def test_statsd_metrics():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(5)
+    metrics = StatsDMetrics("127.0.0.1", server.getsockname()[1], prefix="app.")
+    try:
+        metrics.increment(sqs_metrics.EMPTY_RECEIVES, tags={"queue": "test"})
+        metrics.observe(sqs_metrics.CALL_SECONDS, 0.5, tags={"queue": "test", "operation": "receive_message"})
+        assert server.recv(1024) == b"app.sqs_empty_receives:1|c|#queue:test"
+        assert server.recv(1024) == b"app.sqs_call_seconds:0.5|h|#queue:test,operation:receive_message"
+    finally:
+        metrics.close()
+        server.close()
+
+
+def test_statsd_metrics_resolves_host_once(monkeypatch):
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(5)
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting(*args, **kwargs):
+        lookups.append(args[0])
+        return getaddrinfo(*args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting)
+    metrics = StatsDMetrics("localhost", server.getsockname()[1])
+    try:
+        for _ in range(3):
+            metrics.increment(sqs_metrics.EMPTY_RECEIVES)
+            assert server.recv(1024) == b"sqs_empty_receives:1|c"
+        assert lookups == ["localhost"]
+    finally:
+        metrics.close()
+        server.close()
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from pydantic_sqs import SQSModel
+from pydantic_sqs import Worker
+from pydantic_sqs.poll import PollController
+
+
+def test_poll_controller_ramps_up_on_full_receives():
+    controller = PollController(max_pollers=3, ramp_up_after=2)
+    assert controller.pollers == 1
+    assert controller.next_receive() == (10, 20)
+
+    for _ in range(4):
+        controller.record(requested=10, received=10)
+    assert controller.pollers == 3
+    assert controller.next_receive() == (10, 20)
+
+    controller.record(requested=10, received=10)
+    controller.record(requested=10, received=10)
+    assert controller.pollers == 3
+
+
+def test_poll_controller_backs_off_when_idle():
+    controller = PollController(max_pollers=3, ramp_up_after=1, idle_after=2)
+    controller.record(requested=10, received=10)
+    controller.record(requested=10, received=10)
+    assert controller.pollers == 3
+
+    pollers = []
+    for _ in range(6):
+        controller.record(requested=10, received=0)
+        pollers.append(controller.pollers)
+    assert pollers == [3, 2, 2, 1, 1, 1]
+    assert controller.next_receive() == (10, 20)
+    assert controller.empty_receives == 6
+
+
+def test_poll_controller_keeps_receive_params_on_a_trickle():
+    controller = PollController(max_pollers=3, ramp_up_after=1)
+    for _ in range(5):
+        controller.record(requested=10, received=1)
+        assert controller.next_receive() == (10, 20)
+    assert controller.pollers == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_with_poll_controller(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        handled.append(message)
+
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(30)])
+
+    controller = PollController(max_pollers=3, ramp_up_after=1, wait_time_seconds=1)
+    worker = Worker(queue, max_in_flight=30, poll_controller=controller)
+    run = asyncio.ensure_future(worker.run())
+    for _ in range(200):
+        if len(handled) == 30:
+            break
+        await asyncio.sleep(0.05)
+    worker.stop()
+    await run
+
+    assert len(handled) == 30
+    assert controller.receives > 0
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from pydantic_sqs import BacklogScaler
+from pydantic_sqs import SQSModel
+from pydantic_sqs import Worker
+
+
+def test_backlog_scaler_bounds():
+    scaler = BacklogScaler(min_pollers=1, max_pollers=4, min_in_flight=2, max_in_flight=50)
+    assert (scaler.pollers, scaler.in_flight) == (1, 2)
+    assert scaler.evaluate(visible=25, not_visible=5) == (3, 30)
+    assert scaler.evaluate(visible=1000, not_visible=0) == (4, 50)
+
+    scaler.record_handled(0.5)
+    assert scaler.target(visible=1200, not_visible=0) == (1, 10)
+    assert scaler.target(visible=0, not_visible=0) == (1, 2)
+
+    with pytest.raises(ValueError):
+        BacklogScaler(min_pollers=3, max_pollers=2)
+
+
+def test_backlog_scaler_scales_down_slowly():
+    scaler = BacklogScaler(max_pollers=4, max_in_flight=40, scale_down_after=3)
+    assert scaler.evaluate(visible=40, not_visible=0) == (4, 40)
+    assert scaler.evaluate(visible=0, not_visible=0) == (4, 40)
+    assert scaler.evaluate(visible=0, not_visible=0) == (4, 40)
+    assert scaler.evaluate(visible=0, not_visible=0) == (1, 1)
+
+    assert scaler.evaluate(visible=0, not_visible=0) == (1, 1)
+    assert scaler.evaluate(visible=15, not_visible=0) == (2, 15)
+    assert scaler.evaluate(visible=5, not_visible=0) == (2, 15)
+    assert scaler.evaluate(visible=25, not_visible=0) == (3, 25)
+
+
+@pytest.mark.asyncio
+async def test_queue_attributes_cached(memory_queue):
+    queue, transport = memory_queue
+    calls = []
+    get_queue_attributes = transport.get_queue_attributes
+
+    async def counting(**kwargs):
+        calls.append(kwargs["AttributeNames"])
+        await asyncio.sleep(0.01)
+        return await get_queue_attributes(**kwargs)
+
+    transport.get_queue_attributes = counting
+    await transport.send_message(QueueUrl=queue.queue_url, MessageBody="body")
+
+    names = ["ApproximateNumberOfMessages"]
+    first, second = await asyncio.gather(queue.get_queue_attributes(names), queue.get_queue_attributes(names))
+    assert first == second == {"ApproximateNumberOfMessages": "1"}
+    assert len(calls) == 1
+
+    await transport.send_message(QueueUrl=queue.queue_url, MessageBody="body")
+    assert await queue.get_queue_attributes(names, max_age=60) == {"ApproximateNumberOfMessages": "1"}
+    assert len(calls) == 1
+    assert await queue.get_queue_attributes(names) == {"ApproximateNumberOfMessages": "2"}
+    assert len(calls) == 2
+    assert "QueueArn" in await queue.get_queue_attributes(max_age=60)
+    assert calls[-1] == ["All"]
+
+
+@pytest.mark.asyncio
+async def test_worker_autoscales_with_backlog(memory_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, transport = memory_queue
+    queue.register_model(ThisModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        await asyncio.sleep(0.05)
+        handled.append(message.test)
+
+    for start in range(0, 60, 10):
+        await ThisModel.to_sqs_batch([ThisModel(test=index) for index in range(start, start + 10)])
+
+    scaler = BacklogScaler(max_pollers=3, max_in_flight=20, interval_seconds=0.02, scale_down_after=2)
+    worker = Worker(queue, wait_time_seconds=1, visibility_timeout=30, autoscaler=scaler)
+    assert (worker.pollers, worker.max_in_flight) == (1, 1)
+    running = asyncio.ensure_future(worker.run())
+    peak_in_flight = peak_pollers = 0
+    while len(handled) < 60:
+        peak_in_flight = max(peak_in_flight, worker.in_flight)
+        peak_pollers = max(peak_pollers, worker.pollers)
+        await asyncio.sleep(0.01)
+    assert peak_in_flight > 10
+    assert peak_pollers > 1
+
+    while worker.max_in_flight > 1:
+        await asyncio.sleep(0.01)
+    assert worker.pollers == 1
+    worker.stop()
+    await asyncio.wait_for(running, 5)
+    assert sorted(handled) == list(range(60))
+
+
+@pytest.mark.asyncio
+async def test_consume_with_autoscaler(memory_queue):
+    class ThisModel(SQSModel):
+        test: int
+
+    queue, transport = memory_queue
+    queue.register_model(ThisModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        await asyncio.sleep(0.05)
+        handled.append(message.test)
+
+    await ThisModel.to_sqs_batch([ThisModel(test=index) for index in range(10)])
+    scaler = BacklogScaler(max_pollers=2, max_in_flight=10, interval_seconds=0.02)
+    consume = asyncio.ensure_future(queue.consume(wait_time_seconds=1, autoscaler=scaler))
+    while len(handled) < 10:
+        await asyncio.sleep(0.01)
+    assert scaler.in_flight > 1
+    consume.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consume
+    assert sorted(handled) == list(range(10))
@@ -0,0 +1,375 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict
+from typing import List
+
+import pytest
+from pydantic import ValidationError
+from pydantic_sqs import SQSModel
+from pydantic_sqs import SQSQueue
+from pydantic_sqs.serialization import Codec
+from pydantic_sqs.serialization import CODEC_ATTRIBUTE
+from pydantic_sqs.serialization import get_codec
+from pydantic_sqs.serialization import get_json_backend
+from pydantic_sqs.serialization import ModelDecoder
+
+
+def test_get_json_backend():
+    backend = get_json_backend("json")
+    assert backend is get_json_backend("json")
+    assert backend.loads(backend.dumps({"a": [1, 2]})) == {"a": [1, 2]}
+    assert backend.dumps({"when": datetime(2022, 1, 1)}) == '{"when":"2022-01-01T00:00:00"}'
+
+    with pytest.raises(ValueError):
+        get_json_backend("yaml")
+
+
+def test_queue_json_backend():
+    with pytest.raises(ValueError):
+        SQSQueue("https://example.com/queue", json_backend="yaml")
+
+    pytest.importorskip("orjson")
+    queue = SQSQueue("https://example.com/queue", json_backend="orjson")
+    assert queue.json_library.name == "orjson"
+    assert queue.json_library.loads(queue.json_library.dumps({"a": 1})) == {"a": 1}
+
+
+def test_model_decoder():
+    class ThisModel(SQSModel):
+        test: int
+        name: str = "default"
+
+    decoder = ModelDecoder(ThisModel)
+    model = decoder.decode(
+        {"test": "1", "message_id": "spoofed", "deleted": True},
+        message_id="id",
+        receipt_handle="handle",
+        attributes={"SentTimestamp": "1"},
+    )
+    assert isinstance(model, ThisModel)
+    assert model.test == 1
+    assert model.name == "default"
+    assert model.message_id == "id"
+    assert model.receipt_handle == "handle"
+    assert model.attributes == {"SentTimestamp": "1"}
+    assert not model.deleted
+    assert model._received_at is None
+    assert model.dict(exclude_unset=True, exclude={"message_id", "receipt_handle", "attributes"}) == {"test": 1}
+
+    with pytest.raises(ValidationError):
+        decoder.decode({"test": "one"}, message_id="id", receipt_handle="handle", attributes=None)
+
+
+def test_model_decoder_custom_init():
+    class ThisModel(SQSModel):
+        x: int
+
+        def __init__(self, **data):
+            data.setdefault("x", 5)
+            super().__init__(**data)
+
+    assert ThisModel().x == 5
+    decoder = ModelDecoder(ThisModel)
+    for build in (decoder.decode, decoder.construct):
+        model = build({}, message_id="id", receipt_handle="handle", attributes=None)
+        assert model.x == 5
+        assert model.message_id == "id"
+        assert model.receipt_handle == "handle"
+
+
+@pytest.mark.parametrize("json_backend", ["json", "orjson", "ujson"])
+def test_json_backend_parity(json_backend):
+    pytest.importorskip(json_backend)
+    backend = get_json_backend(json_backend)
+    content = {"counts": {1: "one"}, "when": datetime(2022, 1, 1)}
+    assert backend.loads(backend.dumps(content)) == {"counts": {"1": "one"}, "when": "2022-01-01T00:00:00"}
+
+
+def test_register_model_compiles_decoder():
+    class ThisModel(SQSModel):
+        test: int
+
+    queue = SQSQueue("https://example.com/queue")
+    queue.register_model(ThisModel)
+    assert queue._decoders[ThisModel].model_class is ThisModel
+
+
+def test_send_entry_excludes_metadata():
+    class ThisModel(SQSModel):
+        test: int
+
+    queue = SQSQueue("https://example.com/queue")
+    queue.register_model(ThisModel)
+    model = ThisModel(test=1, message_id="id", receipt_handle="handle")
+    body = json.loads(model._send_entry(0)["MessageBody"])
+    assert body == {"model": ThisModel.__qualname__.lower(), "message": {"test": 1}}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("json_backend", ["json", "orjson"])
+async def test_round_trip_json_backend(localstack_queue, json_backend):
+    pytest.importorskip(json_backend)
+
+    class ThisModel(SQSModel):
+        test: int
+        when: datetime
+        counts: Dict[int, str] = {}
+
+    queue = localstack_queue[0]
+    queue.json_backend = json_backend
+    queue.register_model(ThisModel)
+
+    await ThisModel(test=1, when=datetime(2022, 1, 1), counts={1: "one"}).to_sqs()
+    await ThisModel.to_sqs_batch([ThisModel(test=i, when=datetime(2022, 1, 1)) for i in range(2, 5)])
+
+    received = []
+    while len(received) < 4:
+        received.extend(await queue.from_sqs(max_messages=10, wait_time_seconds=1))
+    assert sorted(model.test for model in received) == [1, 2, 3, 4]
+    assert all(model.when == datetime(2022, 1, 1) for model in received)
+    assert [model.counts for model in received if model.test == 1] == [{1: "one"}]
+    assert all(model.message_id and model.receipt_handle for model in received)
+
+
+def test_codecs():
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+    with pytest.raises(ValueError):
+        SQSQueue("https://example.com/queue", codec="yaml")
+
+    pytest.importorskip("msgpack")
+    codec = get_codec("msgpack")
+    envelope = {"model": "thismodel", "message": {"test": 1, "when": datetime(2022, 1, 1)}}
+    body = codec.encode(envelope)
+    assert body.isascii()
+    assert codec.decode(body) == {"model": "thismodel", "message": {"test": 1, "when": "2022-01-01T00:00:00"}}
+    for bad_body in ("not base64!", body[:-4]):
+        with pytest.raises(ValueError):
+            codec.decode(bad_body)
+
+
+def test_send_entry_codec_attribute():
+    pytest.importorskip("msgpack")
+
+    class JSONModel(SQSModel):
+        test: int
+
+    class MsgpackModel(SQSModel):
+        test: int
+
+    queue = SQSQueue("https://example.com/queue")
+    queue.register_model(JSONModel)
+    queue.register_model(MsgpackModel, codec="msgpack")
+    with pytest.raises(ValueError):
+        queue.register_model(SQSModel, codec="yaml")
+
+    assert CODEC_ATTRIBUTE not in JSONModel(test=1)._send_entry()["MessageAttributes"]
+    entry = MsgpackModel(test=1)._send_entry()
+    assert entry["MessageAttributes"][CODEC_ATTRIBUTE] == {"DataType": "String", "StringValue": "msgpack"}
+    assert get_codec("msgpack").decode(entry["MessageBody"])["message"] == {"test": 1}
+
+
+def test_register_codec():
+    class ReversedJSONCodec(Codec):
+        name = "reversed-json"
+
+        def encode(self, envelope):
+            return json.dumps(envelope)[::-1]
+
+        def decode(self, body):
+            return json.loads(body[::-1])
+
+    class ThisModel(SQSModel):
+        test: int
+
+    queue = SQSQueue("https://example.com/queue")
+    queue.register_codec(ReversedJSONCodec())
+    queue.codec = "reversed-json"
+    queue.register_model(ThisModel)
+
+    entry = ThisModel(test=1)._send_entry()
+    assert entry["MessageAttributes"][CODEC_ATTRIBUTE]["StringValue"] == "reversed-json"
+    assert json.loads(entry["MessageBody"][::-1])["message"] == {"test": 1}
+
+
+@pytest.mark.asyncio
+async def test_mixed_codec_queue(localstack_queue):
+    pytest.importorskip("msgpack")
+
+    class JSONModel(SQSModel):
+        test: int
+
+    class MsgpackModel(SQSModel):
+        test: int
+        values: List[int]
+
+    queue = localstack_queue[0]
+    queue.register_model(JSONModel)
+    queue.register_model(MsgpackModel, codec="msgpack")
+
+    await JSONModel(test=1).to_sqs()
+    await MsgpackModel(test=2, values=[1, 2, 3]).to_sqs()
+    await MsgpackModel.to_sqs_batch([MsgpackModel(test=3, values=[])])
+
+    received = []
+    while len(received) < 3:
+        received.extend(await queue.from_sqs(max_messages=10, wait_time_seconds=1))
+    by_test = {model.test: model for model in received}
+    assert isinstance(by_test[1], JSONModel)
+    assert isinstance(by_test[2], MsgpackModel)
+    assert by_test[2].values == [1, 2, 3]
+    assert by_test[3].values == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_codec_in_queue(localstack_queue):
+    from pydantic_sqs.exceptions import InvalidMessageInQueueError
+
+    queue, session, client_kwargs = localstack_queue
+    async with session.create_client("sqs", **client_kwargs) as client:
+        await client.send_message(
+            QueueUrl=queue.queue_url,
+            MessageBody="body",
+            MessageAttributes={CODEC_ATTRIBUTE: {"DataType": "String", "StringValue": "yaml"}},
+        )
+
+    with pytest.raises(InvalidMessageInQueueError):
+        await queue.from_sqs(wait_time_seconds=1)
+
+
+def test_schema_fingerprint():
+    from pydantic import validator
+    from pydantic_sqs.serialization import schema_fingerprint
+
+    class ThisModel(SQSModel):
+        test: int
+
+    fingerprint = schema_fingerprint(ThisModel)
+    assert fingerprint == schema_fingerprint(ThisModel)
+
+    class ThisModel(SQSModel):  # noqa: F811
+        test: str
+
+    assert schema_fingerprint(ThisModel) != fingerprint
+
+    class ThisModel(SQSModel):  # noqa: F811
+        test: int
+
+        @validator("test")
+        def positive(cls, value):
+            return value
+
+    assert schema_fingerprint(ThisModel) != fingerprint
+
+
+def test_model_decoder_construct():
+    from pydantic import BaseModel
+    from pydantic import conint
+
+    class Inner(BaseModel):
+        when: datetime
+
+    class ThisModel(SQSModel):
+        count: conint(ge=0)
+        names: List[str]
+        when: datetime
+        inner: Inner
+        default: str = "default"
+
+    decoder = ModelDecoder(ThisModel)
+    content = {"count": 1, "names": ["a"], "when": "2022-01-01T00:00:00", "inner": {"when": "2022-01-02T00:00:00"}}
+    model = decoder.construct(dict(content), message_id="id", receipt_handle="handle", attributes=None)
+    expected = decoder.decode(dict(content), message_id="id", receipt_handle="handle", attributes=None)
+    assert model == expected
+    assert model.when == datetime(2022, 1, 1)
+    assert model.inner.when == datetime(2022, 1, 2)
+    assert model.default == "default"
+    assert model.__fields_set__ == expected.__fields_set__
+    assert model.dict(exclude_unset=True) == expected.dict(exclude_unset=True)
+
+    with pytest.raises(ValidationError):
+        decoder.construct({"count": 1}, message_id="id", receipt_handle="handle", attributes=None)
+    with pytest.raises(ValidationError):
+        decoder.construct(dict(content, when="never"), message_id="id", receipt_handle="handle", attributes=None)
+
+
+@pytest.mark.asyncio
+async def test_trusted_round_trip(localstack_queue):
+    from pydantic_sqs.serialization import FINGERPRINT_ATTRIBUTE
+
+    class ThisModel(SQSModel):
+        test: int
+        when: datetime
+
+    class CountingDecoder(ModelDecoder):
+        validated = 0
+        constructed = 0
+
+        def decode(self, *args, **kwargs):
+            self.validated += 1
+            return super().decode(*args, **kwargs)
+
+        def construct(self, *args, **kwargs):
+            self.constructed += 1
+            return super().construct(*args, **kwargs)
+
+    queue, session, client_kwargs = localstack_queue
+    queue.trusted = True
+    queue.register_model(ThisModel)
+    decoder = queue._decoders[ThisModel] = CountingDecoder(ThisModel)
+
+    entry = ThisModel(test=1, when=datetime(2022, 1, 1))._send_entry()
+    assert entry["MessageAttributes"][FINGERPRINT_ATTRIBUTE]["StringValue"] == decoder.fingerprint
+
+    await ThisModel(test=1, when=datetime(2022, 1, 1)).to_sqs()
+    async with session.create_client("sqs", **client_kwargs) as client:
+        entry["MessageAttributes"][FINGERPRINT_ATTRIBUTE]["StringValue"] = "0" * 16
+        await client.send_message(QueueUrl=queue.queue_url, **entry)
+
+    received = []
+    while len(received) < 2:
+        received.extend(await queue.from_sqs(max_messages=10, wait_time_seconds=1, ignore_empty=True))
+    assert [(model.test, model.when) for model in received] == [(1, datetime(2022, 1, 1))] * 2
+    assert decoder.constructed == 1
+    assert decoder.validated == 1
+
+
+@pytest.mark.asyncio
+async def test_decode_offload(localstack_queue):
+    class ThisModel(SQSModel):
+        test: int
+        values: List[int]
+
+    class RecordingDecoder(ModelDecoder):
+        threads = []
+
+        def decode(self, content, *args, **kwargs):
+            self.threads.append((content["test"], threading.current_thread()))
+            return super().decode(content, *args, **kwargs)
+
+    queue, session, client_kwargs = localstack_queue
+    queue.decode_offload_threshold = 1024
+    queue.register_model(ThisModel)
+    decoder = queue._decoders[ThisModel] = RecordingDecoder(ThisModel)
+
+    await queue.send_batch([ThisModel(test=1, values=[1]), ThisModel(test=2, values=[2] * 1000)])
+    async with session.create_client("sqs", **client_kwargs) as client:
+        entry = ThisModel(test=3, values=[3] * 1000)._send_entry()
+        entry["MessageBody"] = entry["MessageBody"].replace("[3,", '["x",', 1).replace("[3, ", '["x", ', 1)
+        await client.send_message(QueueUrl=queue.queue_url, **entry)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="decode") as executor:
+        queue.decode_executor = executor
+        received = []
+        while len(decoder.threads) < 3:
+            received.extend(
+                await queue.from_sqs(max_messages=10, wait_time_seconds=1, ignore_empty=True, ignore_unknown=True)
+            )
+
+    assert sorted((model.test, len(model.values)) for model in received) == [(1, 1), (2, 1000)]
+    threads = dict(decoder.threads)
+    assert threads[1] is threading.main_thread()
+    assert threads[2].name.startswith("decode")
+    assert threads[3].name.startswith("decode")
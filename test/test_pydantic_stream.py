@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+from pydantic_sqs import SQSModel
+
+
+@pytest.mark.asyncio
+async def test_stream(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(15)])
+
+    received = []
+    async with queue.stream(wait_time_seconds=1) as stream:
+        async for message in stream:
+            received.append(message)
+            await message.delete_from_queue()
+            if len(received) == 15:
+                break
+
+    assert sorted(int(message.test) for message in received) == list(range(15))
+
+
+@pytest.mark.asyncio
+async def test_model_stream(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    class ThatModel(SQSModel):
+        name: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    queue.register_model(ThatModel)
+    await queue.send_batch([ThatModel(name="bar"), ThisModel(test="foo")])
+
+    async with ThisModel.stream(wait_time_seconds=1) as stream:
+        message = await asyncio.wait_for(stream.__anext__(), timeout=10)
+
+    assert isinstance(message, ThisModel)
+    assert message.test == "foo"
+
+
+@pytest.mark.asyncio
+async def test_stream_backpressure(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(10)])
+
+    async with queue.stream(max_buffer_messages=3, max_messages=2, wait_time_seconds=1) as stream:
+        first = await asyncio.wait_for(stream.__anext__(), timeout=10)
+        for _ in range(20):
+            if len(stream) == 3:
+                break
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        assert len(stream) == 3
+        assert first is not None
+
+
+@pytest.mark.asyncio
+async def test_stream_releases_buffer_on_close(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(3)])
+
+    async with queue.stream(visibility_timeout=60, wait_time_seconds=1) as stream:
+        first = await asyncio.wait_for(stream.__anext__(), timeout=10)
+        for _ in range(20):
+            if len(stream) == 2:
+                break
+            await asyncio.sleep(0.05)
+    await first.delete_from_queue()
+
+    received = []
+    for _ in range(10):
+        received.extend(await queue.from_sqs(max_messages=10, ignore_empty=True))
+        if len(received) == 2:
+            break
+    assert len(received) == 2
@@ -0,0 +1,195 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+from pydantic_sqs import exceptions
+from pydantic_sqs import SQSModel
+from pydantic_sqs import Worker
+
+
+class ProcessModel(SQSModel):
+    path: str
+    fail: bool = False
+
+
+def handle_in_process(message):
+    if message.fail:
+        raise ValueError("handler failed")
+    Path(message.path).write_text(str(os.getpid()))
+
+
+async def wait_for(condition, timeout=10):
+    for _ in range(int(timeout / 0.05)):
+        if condition():
+            return
+        await asyncio.sleep(0.05)
+    raise AssertionError("condition was not met in time")
+
+
+async def queue_depth(localstack_queue):
+    queue, session, client_kwargs = localstack_queue
+    async with session.create_client("sqs", **client_kwargs) as client:
+        response = await client.get_queue_attributes(
+            QueueUrl=queue.queue_url,
+            AttributeNames=["ApproximateNumberOfMessages", "ApproximateNumberOfMessagesNotVisible"],
+        )
+    return int(response["Attributes"]["ApproximateNumberOfMessages"]) + int(
+        response["Attributes"]["ApproximateNumberOfMessagesNotVisible"]
+    )
+
+
+def test_handler_not_registered(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    with pytest.raises(exceptions.NotRegisteredError):
+        localstack_queue[0].handler(ThisModel)
+
+
+@pytest.mark.asyncio
+async def test_worker_dispatches_by_model(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    class ThatModel(SQSModel):
+        name: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    queue.register_model(ThatModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle_this(message):
+        handled.append(message.test)
+
+    @queue.handler(ThatModel)
+    def handle_that(message):
+        handled.append(message.name)
+
+    await queue.send_batch([ThisModel(test="foo"), ThatModel(name="bar"), ThisModel(test="baz")])
+
+    worker = Worker(queue, pollers=2, max_in_flight=4, wait_time_seconds=1)
+    run = asyncio.ensure_future(worker.run())
+    await wait_for(lambda: len(handled) == 3)
+    worker.stop()
+    await run
+
+    assert sorted(handled) == ["bar", "baz", "foo"]
+    assert worker.in_flight == 0
+    assert await queue_depth(localstack_queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_leaves_failed_messages(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        handled.append(message.test)
+        if message.test == "fail":
+            raise ValueError("handler failed")
+
+    await queue.send_batch([ThisModel(test="ok"), ThisModel(test="fail")])
+
+    worker = Worker(queue, visibility_timeout=30, wait_time_seconds=1)
+    run = asyncio.ensure_future(worker.run())
+    await wait_for(lambda: len(handled) == 2)
+    worker.stop()
+    await run
+
+    assert await queue_depth(localstack_queue) == 1
+
+
+@pytest.mark.asyncio
+async def test_worker_bounds_in_flight(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    running = []
+    most_running = []
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        running.append(message)
+        most_running.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(message)
+        handled.append(message)
+
+    await queue.send_batch([ThisModel(test=str(index)) for index in range(8)])
+
+    worker = Worker(queue, pollers=3, max_in_flight=2, wait_time_seconds=1)
+    run = asyncio.ensure_future(worker.run())
+    await wait_for(lambda: len(handled) == 8)
+    worker.stop()
+    await run
+
+    assert max(most_running) <= 2
+
+
+@pytest.mark.asyncio
+async def test_consume_cancelled(localstack_queue):
+    class ThisModel(SQSModel):
+        test: str
+
+    queue = localstack_queue[0]
+    queue.register_model(ThisModel)
+    handled = []
+
+    @queue.handler(ThisModel)
+    async def handle(message):
+        handled.append(message)
+
+    await ThisModel(test="test").to_sqs()
+    consume = asyncio.ensure_future(queue.consume(wait_time_seconds=1))
+    await wait_for(lambda: len(handled) == 1)
+    consume.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consume
+
+
+def test_process_handler_must_be_plain(localstack_queue):
+    queue = localstack_queue[0]
+    queue.register_model(ProcessModel)
+
+    with pytest.raises(TypeError):
+
+        @queue.handler(ProcessModel, process=True)
+        async def handle(message):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_worker_process_handler(localstack_queue, tmp_path):
+    queue = localstack_queue[0]
+    queue.heartbeat_seconds = 30
+    queue.register_model(ProcessModel)
+    queue.handler(ProcessModel, process=True)(handle_in_process)
+    assert queue.handler_runs_in_process(ProcessModel)
+
+    paths = [tmp_path / str(index) for index in range(3)]
+    await queue.send_batch(
+        [ProcessModel(path=str(path)) for path in paths] + [ProcessModel(path=str(tmp_path / "fail"), fail=True)]
+    )
+
+    worker = Worker(queue, visibility_timeout=30, wait_time_seconds=1, processes=2)
+    run = asyncio.ensure_future(worker.run())
+    await wait_for(lambda: all(path.exists() for path in paths), timeout=30)
+    worker.stop()
+    await run
+
+    pids = {int(path.read_text()) for path in paths}
+    assert os.getpid() not in pids
+    assert worker._owned_pool is None
+    assert await queue_depth(localstack_queue) == 1
+    await queue.close()